@@ -0,0 +1,359 @@
+"""
+Precomputed aggregate cube over the feature table for FDR / position / season analyses.
+
+FormFixtures.ipynb builds its conversion_stats table one FDR at a time
+(merged_df[merged_df['FDR'] == fdr] in a loop), filters merged_df again for
+every box plot and histogram, and the EDA_Functions helpers scan the whole
+frame on each call: 60k rows x 128 columns read for a handful of group means.
+The cube aggregates the feature table once per build over
+
+    Season x Team x Opponent x Position Group x FDR x Venue x Starter
+
+(Position Group is the FPL position GK/DEF/MID/FWD from 'Position'; Starter
+is True for 'Y'/'Y*' in Start; rows without an FDR keep FDR missing) and
+stores, for each cell and each of METRICS:
+
+- n (rows with a value), sum, sum of squares, nonzero count, min and max,
+  from which rollup() gives means, standard deviations, totals and
+  zero/non-zero shares for any grouping of the dimensions. Missing values
+  are left out of every statistic and histogram of their metric, so each
+  metric is averaged over its own n rather than the cell's row count
+- a value histogram with one bucket per METRICS resolution (FBref expected
+  stats come to 0.1, counts and points are integers). The histograms act as
+  the quantile sketch: quantiles() and boxplot_stats() merge them instead of
+  sorting rows, and are exact while values stay on that grid (otherwise
+  within half a bucket)
+
+The cube is stored next to the feature table (cube_<key>.cells.parquet and
+cube_<key>.hist.parquet in feature_store/), keyed by the feature build key
+and CUBE_VERSION, so it is rebuilt exactly when the feature table is.
+
+Usage:
+    from aggregate_cube import load_cube
+    cube = load_cube()
+    cube.conversion('FDR')                                      # conversion_stats
+    cube.rollup(['FDR', 'Venue'], ['npxG', 'total_points'], where={'Position Group': 'FWD'})
+    ax.bxp(cube.boxplot_stats('npxG', 'FDR'), showmeans=True)   # box plot by FDR
+    cube.histogram('Goal Difference', by='FDR')
+
+    python FeatureExplore/aggregate_cube.py                     # build, print conversion by FDR
+    python FeatureExplore/aggregate_cube.py --by FDR "Position Group"
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FEATURE_STORE_DIR, materialize
+from points_simulator import fpl_position
+
+
+CUBE_VERSION = 2
+
+DIMENSIONS = ['Season', 'Team', 'Opponent', 'Position Group', 'FDR', 'Venue', 'Starter']
+
+# Metric -> histogram bucket width (the resolution FBref/FPL report it at)
+METRICS = {
+    'Goals': 1,
+    'Non-Penalty Goals': 1,
+    'Assists': 1,
+    'xG': 0.1,
+    'npxG': 0.1,
+    'xAG': 0.1,
+    'Goal Difference': 0.1,     # Non-Penalty Goals - npxG, as in FormFixtures
+    'total_points': 1,
+    'Minutes Played': 1,
+}
+
+STATS = ('n', 'sum', 'sumsq', 'nonzero', 'min', 'max')
+
+WHISKER = 1.5       # box plot whiskers at 1.5 IQR, as matplotlib
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def cube_frame(features):
+    """The dimension and metric columns of the feature table (one row per player match)."""
+    frame = pd.DataFrame({
+        'Season': features['Season'],
+        'Team': features['Team'],
+        'Opponent': features['Opponent'],
+        'Position Group': fpl_position(features['Position']).astype('category'),
+        'FDR': features['FDR'].astype('Int8'),
+        'Venue': features['Venue'],
+        'Starter': features['Start'].astype(str).str.startswith('Y'),
+    })
+    for metric in ('Goals', 'Assists', 'xG', 'npxG', 'xAG', 'total_points', 'Minutes Played'):
+        frame[metric] = features[metric].astype('float64')
+    frame['Non-Penalty Goals'] = frame['Goals'] - features['Penalties Scored']
+    frame['Goal Difference'] = (frame['Non-Penalty Goals'] - frame['npxG']).round(6)
+    return frame
+
+
+def build_cube(features):
+    """
+    Return (cells, histograms) for a feature table.
+
+    cells has one row per non-empty combination of DIMENSIONS: a cell id,
+    the dimensions, n and <metric>_<stat> for every metric and STATS.
+    histograms has one row per (cell, metric, bucket value) with its count;
+    rows where a metric is missing are in neither for that metric.
+    """
+    frame = cube_frame(features)
+    grouped = frame.groupby(DIMENSIONS, observed=True, dropna=False, sort=True)
+    cell = grouped.ngroup().to_numpy()
+
+    values = frame[list(METRICS)]
+    by_cell = pd.DataFrame({'n': np.ones(len(frame), dtype='int64')}, index=frame.index)
+    for metric in METRICS:
+        present = values[metric].notna()
+        by_cell[f'{metric}_n'] = present.astype('int64')
+        by_cell[f'{metric}_sum'] = values[metric].fillna(0)
+        by_cell[f'{metric}_sumsq'] = values[metric].fillna(0) ** 2
+        by_cell[f'{metric}_nonzero'] = (present & (values[metric] != 0)).astype('int64')
+    cells = by_cell.groupby(cell).sum()
+    extremes = values.groupby(cell).agg(['min', 'max'])
+    for metric in METRICS:
+        cells[f'{metric}_min'] = extremes[(metric, 'min')]
+        cells[f'{metric}_max'] = extremes[(metric, 'max')]
+
+    keys = grouped.size().index.to_frame(index=False)
+    cells = pd.concat([keys, cells.reset_index(drop=True)], axis=1)
+    cells.insert(0, 'cell', np.arange(len(cells), dtype='int32'))
+    columns = ['cell'] + DIMENSIONS + ['n'] + [f'{m}_{s}' for m in METRICS for s in STATS]
+    cells = cells[columns]
+
+    histograms = []
+    for metric, width in METRICS.items():
+        present = values[metric].notna().to_numpy()
+        bucket = np.round(values[metric].to_numpy()[present] / width).astype('int64')
+        counts = pd.DataFrame({'cell': cell[present], 'bucket': bucket}).value_counts(sort=False).reset_index()
+        histograms.append(pd.DataFrame({
+            'cell': counts['cell'].astype('int32'),
+            'metric': metric,
+            'value': (counts['bucket'] * width).round(6),
+            'count': counts['count'].astype('int32'),
+        }))
+    histograms = pd.concat(histograms, ignore_index=True)
+    histograms['metric'] = histograms['metric'].astype(pd.CategoricalDtype(list(METRICS)))
+    return cells, histograms
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def _as_list(by):
+    if by is None:
+        return []
+    return [by] if isinstance(by, str) else list(by)
+
+
+def _histogram_quantiles(values, counts, q):
+    """Quantiles of the data a sorted histogram describes (linear interpolation, as pandas)."""
+    cumulative = np.cumsum(counts)
+    position = (cumulative[-1] - 1) * np.asarray(q, dtype='float64')
+    lower = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+    upper = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    return lower + (upper - lower) * (position - np.floor(position))
+
+
+class AggregateCube:
+    """A built cube: rollups, histograms, quantiles and box plot stats over any grouping."""
+
+    def __init__(self, cells, histograms):
+        self.cells = cells
+        self.histograms = histograms
+
+    def select(self, where=None):
+        """Cells matching where ({dimension: value or list of values})."""
+        cells = self.cells
+        for dimension, wanted in (where or {}).items():
+            if isinstance(wanted, (list, tuple, set)):
+                cells = cells[cells[dimension].isin(list(wanted))]
+            else:
+                cells = cells[cells[dimension] == wanted]
+        return cells
+
+    def rollup(self, by=None, metrics=None, where=None):
+        """
+        n and, per metric, n (rows with a value), mean, std, sum, share of
+        nonzero rows, min and max, for each group of the by dimensions (the
+        whole selection when by is None).
+        """
+        by = _as_list(by)
+        metrics = list(metrics or METRICS)
+        cells = self.select(where)
+        additive = ['n'] + [f'{m}_{s}' for m in metrics for s in ('n', 'sum', 'sumsq', 'nonzero')]
+        if by:
+            grouped = cells.groupby(by, observed=True, dropna=False)
+            totals = grouped[additive].sum()
+            lows = grouped[[f'{m}_min' for m in metrics]].min()
+            highs = grouped[[f'{m}_max' for m in metrics]].max()
+        else:
+            totals = cells[additive].sum().to_frame('all').T
+            lows = cells[[f'{m}_min' for m in metrics]].min().to_frame('all').T
+            highs = cells[[f'{m}_max' for m in metrics]].max().to_frame('all').T
+
+        result = pd.DataFrame({'n': totals['n']})
+        for metric in metrics:
+            n, total, squares = totals[f'{metric}_n'], totals[f'{metric}_sum'], totals[f'{metric}_sumsq']
+            result[f'{metric}_n'] = n
+            result[f'{metric}_mean'] = total / n
+            result[f'{metric}_std'] = np.sqrt(((squares - total ** 2 / n) / (n - 1)).clip(lower=0))
+            result[f'{metric}_sum'] = total
+            result[f'{metric}_nonzero'] = totals[f'{metric}_nonzero'] / n
+            result[f'{metric}_min'] = lows[f'{metric}_min']
+            result[f'{metric}_max'] = highs[f'{metric}_max']
+        return result
+
+    def histogram(self, metric, by=None, where=None):
+        """Row counts per metric value, one row per group of by (columns are values)."""
+        by = _as_list(by)
+        cells = self.select(where)
+        hist = self.histograms[self.histograms['metric'] == metric]
+        hist = hist[hist['cell'].isin(cells['cell'])]
+        if by:
+            hist = hist.merge(cells[['cell'] + by], on='cell')
+            table = hist.pivot_table(index=by, columns='value', values='count', aggfunc='sum',
+                                     fill_value=0, observed=True, dropna=False)
+        else:
+            table = hist.groupby('value')['count'].sum().to_frame('all').T
+        return table.astype('int64')
+
+    def quantiles(self, metric, q=(0.25, 0.5, 0.75), by=None, where=None):
+        """Quantiles of metric for each group of by, from the merged histograms."""
+        table = self.histogram(metric, by, where)
+        values = table.columns.to_numpy(dtype='float64')
+        rows = []
+        for counts in table.to_numpy():
+            present = counts > 0
+            rows.append(_histogram_quantiles(values[present], counts[present], q) if present.any()
+                        else np.full(len(q), np.nan))
+        return pd.DataFrame(rows, index=table.index, columns=list(q))
+
+    def boxplot_stats(self, metric, by=None, where=None):
+        """
+        One stats dict per group of by, in the form matplotlib's Axes.bxp draws
+        (label, mean, med, q1, q3, whislo, whishi, fliers). Fliers are the
+        distinct outlying values rather than every outlying row.
+        """
+        table = self.histogram(metric, by, where)
+        values = table.columns.to_numpy(dtype='float64')
+        stats = []
+        for label, counts in zip(table.index, table.to_numpy()):
+            present = counts > 0
+            if not present.any():
+                continue
+            v, c = values[present], counts[present]
+            q1, med, q3 = _histogram_quantiles(v, c, (0.25, 0.5, 0.75))
+            low, high = q1 - WHISKER * (q3 - q1), q3 + WHISKER * (q3 - q1)
+            inside = (v >= low) & (v <= high)
+            stats.append({
+                'label': label if not isinstance(label, tuple) else ', '.join(map(str, label)),
+                'mean': float((v * c).sum() / c.sum()),
+                'med': med, 'q1': q1, 'q3': q3,
+                'whislo': v[inside].min() if inside.any() else q1,
+                'whishi': v[inside].max() if inside.any() else q3,
+                'fliers': v[~inside],
+            })
+        return stats
+
+    def conversion(self, by='FDR', where=None):
+        """The FormFixtures conversion_stats table (non-penalty goals vs npxG) for each group of by."""
+        stats = self.rollup(by, ['Non-Penalty Goals', 'npxG'], where)
+        table = pd.DataFrame({
+            'N': stats['n'],
+            'Avg_NP_Goals': stats['Non-Penalty Goals_mean'],
+            'Avg_npxG': stats['npxG_mean'],
+        })
+        table['Overperformance'] = table['Avg_NP_Goals'] - table['Avg_npxG']
+        table['Overperformance_%'] = (table['Overperformance'] / table['Avg_npxG'] * 100).where(table['Avg_npxG'] > 0, 0)
+        table['Conversion_Rate'] = (stats['Non-Penalty Goals_sum'] / stats['npxG_sum']).where(stats['npxG_sum'] > 0, 0)
+        return table
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+def cube_paths(store_dir, key):
+    stem = os.path.join(store_dir, f'cube_{key}_v{CUBE_VERSION}')
+    return f'{stem}.cells.parquet', f'{stem}.hist.parquet'
+
+
+def _current_feature_build(store_dir, check_inputs):
+    """(feature key, feature table path, kept build keys), building the table if needed."""
+    if check_inputs:
+        materialize(store_dir)
+    manifest_path = os.path.join(store_dir, 'manifest.json')
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('current') is None:
+        materialize(store_dir)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    key = manifest['current']
+    return key, os.path.join(store_dir, f'features_{key}.parquet'), {b['key'] for b in manifest.get('builds', [])}
+
+
+def materialize_cube(store_dir=FEATURE_STORE_DIR, rebuild=False, check_inputs=True):
+    """Build the cube for the current feature table if missing. Returns (cells path, hist path, built)."""
+    key, features_path, kept = _current_feature_build(store_dir, check_inputs)
+    cells_path, hist_path = cube_paths(store_dir, key)
+    built = rebuild or not (os.path.exists(cells_path) and os.path.exists(hist_path))
+    if built:
+        cells, histograms = build_cube(pd.read_parquet(features_path))
+        for frame, path in ((cells, cells_path), (histograms, hist_path)):
+            frame.to_parquet(f'{path}.tmp', index=False)
+            os.replace(f'{path}.tmp', path)
+        # Cubes of feature builds feature_store no longer keeps
+        for path in glob.glob(os.path.join(store_dir, 'cube_*.parquet')):
+            name = os.path.basename(path)
+            if not any(name.startswith(f'cube_{k}_v{CUBE_VERSION}.') for k in kept | {key}):
+                os.remove(path)
+    return cells_path, hist_path, built
+
+
+def load_cube(store_dir=FEATURE_STORE_DIR, check_inputs=True):
+    """Load the cube for the current feature table, building either first if needed."""
+    cells_path, hist_path, _ = materialize_cube(store_dir, check_inputs=check_inputs)
+    return AggregateCube(pd.read_parquet(cells_path), pd.read_parquet(hist_path))
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Build the aggregate cube and print conversion by group.')
+    parser.add_argument('--by', nargs='+', default=['FDR'], choices=DIMENSIONS, help='Dimensions to group by (default: FDR)')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the cube even if it exists')
+    parser.add_argument('--store-dir', default=FEATURE_STORE_DIR, help=f'Feature store directory (default: {FEATURE_STORE_DIR})')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    cells_path, hist_path, built = materialize_cube(args.store_dir, rebuild=args.rebuild)
+    cube = AggregateCube(pd.read_parquet(cells_path), pd.read_parquet(hist_path))
+    print("=" * 70)
+    print(f"AGGREGATE CUBE {'BUILT' if built else 'UP TO DATE'} ({time.time() - start:.1f}s)")
+    print("=" * 70)
+    print(f"  Cells: {len(cube.cells):,} ({int(cube.cells['n'].sum()):,} player matches), "
+          f"histogram buckets: {len(cube.histograms):,}")
+    print(f"  Files: {cells_path}, {hist_path}")
+
+    print(f"\nCONVERSION: NON-PENALTY GOALS vs npxG BY {', '.join(args.by).upper()}")
+    print("-" * 70)
+    print(cube.conversion(args.by).round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Resumable batch runner for player scrape jobs.
+
+regenerate_defenders.main() keeps progress in memory, so a crash part-way
+through means starting again. This runner splits a player manifest (see
+player_manifest.py) into (player, season) units and records each one in a
+durable job journal as soon as it finishes:
+
+    .batch_jobs/<job>/
+        manifest.csv       copy of the manifest the job was started with
+        journal.jsonl      one JSON record per unit attempt, fsynced per line
+        units/<code>/<season>.pkl   scraped dataframe of a finished unit
+
+Re-running the same job skips every unit already marked done, so it resumes
+from the last completed unit; --retry-failed runs only the units whose last
+attempt failed. Once all seasons of a player are done they are concatenated
+(as compile_dat does) and written to the player's output file. Assembly is
+journaled per player too: a player that fails to assemble (a page missing
+from the cache under --offline, a summary page without its table) is marked
+failed without stopping the others, and players already written from the
+same units are not written again on resume.
+
+Units run in a pool of worker processes. Each worker fetches through the
+shared HTML cache and keeps to rate / workers requests, so the job as a whole
+stays under the FBref limit.
+
+Usage (from the repo root):
+    python FeatureExplore/batch_runner.py --job defenders                # DEFENDERS_TO_REGENERATE
+    python FeatureExplore/batch_runner.py --job att --manifest att.csv --processes 3
+    python FeatureExplore/batch_runner.py --job defenders --retry-failed
+    python FeatureExplore/batch_runner.py --job defenders --status
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from entity_registry import get_player_registry
+from fbref_scrape import get_active_years, get_data_final, get_premgames, matchlog_url, player_summary_url
+from fbref_tables import MATCHLOG_CATEGORIES
+from fetch_scheduler import DEFAULT_RATE, FetchScheduler
+from html_cache import CACHE_DIR, configure_cache, get_cache
+from instrumentation import stage
+from player_manifest import from_player_dicts, load_manifest, save_manifest
+
+
+JOBS_DIR = '.batch_jobs'
+DEFAULT_PROCESSES = 2
+
+
+# ============================================================================
+# JOURNAL
+# ============================================================================
+
+def unit_key(code, season):
+    return f'{code}/{season}'
+
+
+def player_key(code):
+    return f'{code}/player'
+
+
+class JobJournal:
+    """Append-only JSON-lines record of unit attempts; the last record per unit wins."""
+
+    def __init__(self, job_dir):
+        self.job_dir = job_dir
+        self.path = os.path.join(job_dir, 'journal.jsonl')
+        os.makedirs(job_dir, exist_ok=True)
+        self.state = self._load()
+
+    def _load(self):
+        state = {}
+        if not os.path.exists(self.path):
+            return state
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write leaves at most one partial trailing line
+                    continue
+                state[record['unit']] = record
+        return state
+
+    def record(self, unit, status, **fields):
+        """Append a record and fsync it before returning."""
+        record = {'unit': unit, 'status': status, 'time': datetime.now().isoformat(timespec='seconds'), **fields}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.state[unit] = record
+        return record
+
+    def status(self, unit):
+        record = self.state.get(unit)
+        return record['status'] if record else 'pending'
+
+    def counts(self, kind='unit'):
+        """Last-status counts of the scrape units (kind='unit') or the player assemblies (kind='player')."""
+        counts = {}
+        for record in self.state.values():
+            if record.get('kind', 'unit') == kind:
+                counts[record['status']] = counts.get(record['status'], 0) + 1
+        return counts
+
+
+def part_path(job_dir, code, season):
+    return os.path.join(job_dir, 'units', code, f'{season}.pkl')
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+_worker_scheduler = None
+
+
+def _init_worker(cache_dir, offline, rate):
+    """Per-process setup: open the shared cache and a scheduler holding this worker's rate budget."""
+    global _worker_scheduler
+    cache = configure_cache(cache_dir, offline=offline)
+    # One scheduler (and token bucket) for the life of the process, so the burst token and any
+    # Retry-After pause carry over from one unit to the next
+    _worker_scheduler = FetchScheduler(rate=rate, workers=1, cache=cache)
+
+
+def run_unit(job_dir, player, season):
+    """Scrape one (player, season) unit and store it as a pickle. Runs in a worker process."""
+    cache = get_cache()
+    if not cache.offline:
+        # Prefetch the season's category pages under this worker's share of the rate
+        for category in MATCHLOG_CATEGORIES:
+            _worker_scheduler.submit(matchlog_url(player['code'], season, category, player['slug']))
+        _worker_scheduler.run()
+
+    df = get_data_final(player['code'], season, player['slug'], player['fpl_name'])
+
+    path = part_path(job_dir, player['code'], season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    return len(df)
+
+
+# ============================================================================
+# JOB
+# ============================================================================
+
+def plan_units(players):
+    """List (player, season) units for every manifest entry."""
+    units = []
+    for player in players:
+        for season in get_active_years(player['fpl_name']):
+            units.append((player, season))
+    return units
+
+
+def assemble_player(job_dir, player, seasons):
+    """Concatenate a player's finished units and write the output file."""
+    parts = [pd.read_pickle(part_path(job_dir, player['code'], season)) for season in seasons]
+    # Seasons scraped before any column names were known come back without columns
+    parts = [part for part in parts if len(part.columns)]
+    if not parts:
+        return None
+    finaldf = pd.concat(parts, join="inner", ignore_index=True)
+
+    if player['checkgames']:
+        games_played = get_premgames(player['code'], player['slug'])
+        if games_played != finaldf.shape[0]:
+            print(f"  Warning: {player['slug']} - Expected {games_played} games, got {finaldf.shape[0]} rows", flush=True)
+
+    folder = os.path.dirname(player['output'])
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with stage('player.write', rows=len(finaldf)):
+        finaldf.to_csv(f"{player['output']}.tmp", index=False)
+        os.replace(f"{player['output']}.tmp", player['output'])
+    return finaldf
+
+
+def run_job(job_dir, players, processes=DEFAULT_PROCESSES, rate=DEFAULT_RATE,
+            cache_dir=CACHE_DIR, offline=False, retry_failed=False):
+    """Run every outstanding unit of a job, then write the players whose units are all done."""
+    journal = JobJournal(job_dir)
+    units = plan_units(players)
+
+    def wanted(player, season):
+        status = journal.status(unit_key(player['code'], season))
+        if retry_failed:
+            return status == 'failed'
+        # A done unit whose part file went missing has to be run again
+        return status != 'done' or not os.path.exists(part_path(job_dir, player['code'], season))
+
+    todo = [(player, season) for player, season in units if wanted(player, season)]
+    print(f"Units: {len(units)} total, {len(units) - len(todo)} skipped, {len(todo)} to run", flush=True)
+    # Players with a unit re-scraped in this run are assembled again
+    rerun = set()
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(cache_dir, offline, rate / processes)) as pool:
+        futures = {pool.submit(run_unit, job_dir, player, season): (player, season) for player, season in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            player, season = futures[future]
+            key = unit_key(player['code'], season)
+            try:
+                rows = future.result()
+            except Exception as e:
+                journal.record(key, 'failed', player=player['slug'], season=season, error=str(e)[:200])
+                print(f"  [{done}/{len(todo)}] {player['slug']} {season}: FAILED - {str(e)}", flush=True)
+            else:
+                journal.record(key, 'done', player=player['slug'], season=season, rows=rows)
+                rerun.add(player['code'])
+                print(f"  [{done}/{len(todo)}] {player['slug']} {season}: {rows} rows", flush=True)
+
+    def assembled(player, seasons):
+        record = journal.state.get(player_key(player['code']))
+        return (record is not None and record['status'] == 'done' and player['code'] not in rerun
+                and record.get('seasons') == seasons and record.get('output') == player['output']
+                and (not record.get('rows') or os.path.exists(player['output'])))
+
+    # Write every player whose seasons are now all done and whose file is not already written from them
+    configure_cache(cache_dir, offline=offline)
+    ready, incomplete = [], []
+    for player in players:
+        seasons = [season for p, season in units if p is player]
+        if not all(journal.status(unit_key(player['code'], season)) == 'done' for season in seasons):
+            incomplete.append(player['slug'])
+        elif not assembled(player, seasons):
+            ready.append((player, seasons))
+    print(f"Players: {len(players)} total, {len(players) - len(ready) - len(incomplete)} already written, "
+          f"{len(ready)} to write", flush=True)
+
+    if not offline:
+        # get_premgames reads each player's summary page; fetch those under the job's rate limit too
+        scheduler = FetchScheduler(rate=rate, workers=1, cache=get_cache())
+        for player, _ in ready:
+            if player['checkgames']:
+                scheduler.submit(player_summary_url(player['code'], player['slug']))
+        scheduler.run()
+
+    written = []
+    for player, seasons in ready:
+        key = player_key(player['code'])
+        try:
+            finaldf = assemble_player(job_dir, player, seasons)
+        except Exception as e:
+            journal.record(key, 'failed', kind='player', player=player['slug'], error=str(e)[:200])
+            print(f"  {player['slug']}: assembly FAILED - {str(e)}", flush=True)
+            incomplete.append(player['slug'])
+            continue
+        rows = 0 if finaldf is None else len(finaldf)
+        journal.record(key, 'done', kind='player', player=player['slug'], seasons=seasons,
+                       output=player['output'], rows=rows)
+        if finaldf is not None:
+            written.append(player['slug'])
+    return written, incomplete, journal
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Resumable, checkpointed player scrape job.')
+    parser.add_argument('--job', required=True, help=f'Job name; state is kept in {JOBS_DIR}/<job>')
+    parser.add_argument('--manifest', help='Player manifest CSV (default: the job\'s saved manifest, '
+                                           'or DEFENDERS_TO_REGENERATE for a new job)')
+    parser.add_argument('--retry-failed', action='store_true', help='Only re-run units whose last attempt failed')
+    parser.add_argument('--status', action='store_true', help='Print the job journal summary and exit')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                        help=f'Worker processes (default: {DEFAULT_PROCESSES})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE * 60,
+                        help=f'Maximum FBref requests per minute across all workers (default: {DEFAULT_RATE * 60:g})')
+    parser.add_argument('--offline', action='store_true', help='Only serve pages from the HTML cache')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f'HTML cache directory (default: {CACHE_DIR})')
+    return parser.parse_args(argv)
+
+
+def job_manifest(job_dir, manifest_path=None):
+    """
+    Load the manifest for a job, saving a copy in the job directory on first
+    use and recording its FBref codes in the entity registry.
+    """
+    saved = os.path.join(job_dir, 'manifest.csv')
+    if manifest_path:
+        players = load_manifest(manifest_path)
+    elif os.path.exists(saved):
+        players = load_manifest(saved)
+    else:
+        from regenerate_defenders import DEFENDERS_TO_REGENERATE
+        players = from_player_dicts(DEFENDERS_TO_REGENERATE, os.path.join('Player_Data', 'Defenders'))
+    save_manifest(players, saved)
+    get_player_registry().register_manifest(players)
+    return players
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    job_dir = os.path.join(JOBS_DIR, args.job)
+
+    if args.status:
+        journal = JobJournal(job_dir)
+        print(f"Job {args.job}: " + ", ".join(f"{status}: {n}" for status, n in sorted(journal.counts().items())))
+        print("Players: " + ", ".join(f"{status}: {n}" for status, n in sorted(journal.counts('player').items())))
+        return
+
+    players = job_manifest(job_dir, args.manifest)
+
+    print("=" * 70, flush=True)
+    print(f"BATCH JOB: {args.job}", flush=True)
+    print("=" * 70, flush=True)
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
+    print(f"Players: {len(players)}", flush=True)
+    print(f"Workers: {args.processes} processes at {args.rate:g} requests/min in total", flush=True)
+    print("=" * 70, flush=True)
+
+    start = time.time()
+    written, incomplete, journal = run_job(job_dir, players, processes=args.processes, rate=args.rate / 60,
+                                           cache_dir=args.cache_dir, offline=args.offline,
+                                           retry_failed=args.retry_failed)
+
+    print("\n" + "=" * 70)
+    print("BATCH JOB COMPLETE")
+    print("=" * 70)
+    print(f"Elapsed: {time.time() - start:.1f}s")
+    print(f"Players written: {len(written)}/{len(players)}")
+    print("Units: " + ", ".join(f"{status}: {n}" for status, n in sorted(journal.counts().items())))
+    print("Players: " + ", ".join(f"{status}: {n}" for status, n in sorted(journal.counts('player').items())))
+    if incomplete:
+        print("\nIncomplete players (re-run with --retry-failed):")
+        for slug in incomplete:
+            print(f"  - {slug}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,618 @@
+"""
+Offline benchmark suite for the scrape -> parse -> compile -> merge path.
+
+Nothing measured how long each stage takes, and every stage starts from
+live fbref.com. This suite records a fixed set of pages once and serves
+them from a local stand-in server (http.server on 127.0.0.1, gzip and ETag
+like the real site), so every run times the same work:
+
+- get_url_final: match-log pages fetched and cut to their <tbody> through
+  the real HTTP client and a cold HTML cache
+- squad_pages / summary_pages: get_team_data and get_premgames, same setup
+- parse: matchlog_frame (parse_table, the parser behind get_dat) over the
+  six category tables of every player-season
+- get_data_final: whole player-seasons from a warm cache, including the FPL
+  gameweek merge (fpl_index over recorded gw.csv files)
+- compile: compile_players for both roles from a cold fragment cache
+- merge: feature_store.build_features, the FormFixtures merge
+
+Fixtures are reconstructed from the repo's own data: each selected
+Player_Data file becomes its six match-log pages, a player summary page and
+one FPL gw.csv per season, and team_finaldat.csv becomes the squad pages
+and an observed FDR table. Pages carry only the markup the parsers read, so
+they are smaller than live pages and fetch/parse times are lower bounds.
+
+Each stage runs once untimed under tracemalloc (warm-up and peak Python
+memory) and then --repeat timed runs; the median is reported with
+throughput per unit (pages/s, player-seasons/s, rows/s). Results are
+appended to .benchmarks/results.jsonl with the git commit, and each stage
+is compared with the last run of the same fixtures on another commit.
+
+Usage (from the repo root):
+    python FeatureExplore/benchmarks.py --record --players 20    # (re)record fixtures
+    python FeatureExplore/benchmarks.py                           # run every stage
+    python FeatureExplore/benchmarks.py --stages parse get_data_final --repeat 5
+    python FeatureExplore/benchmarks.py --history
+"""
+
+import argparse
+import gc
+import gzip
+import hashlib
+import html
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+import fbref_scrape
+import fpl_index
+import html_cache
+from dataset_store import PLAYER_DIRS, TEAM_FILE, season_labels
+from entity_registry import TEAMS, team_ids
+from fbref_tables import MATCHLOG_CATEGORIES, MATCHLOG_COLUMNS, SCHEDULE_COLUMNS, matchlog_frame
+from fpl_fixtures import FDR_COLUMNS, FIRST_OBSERVED_SEASON
+from fpl_index import fbref_season
+from html_cache import configure_cache, fetch_html
+from schema_registry import read_header
+
+
+BENCH_DIR = '.benchmarks'
+FIXTURE_DIR = os.path.join(BENCH_DIR, 'fixtures')
+WORK_DIR = os.path.join(BENCH_DIR, 'work')
+RESULTS_FILE = os.path.join(BENCH_DIR, 'results.jsonl')
+
+DEFAULT_PLAYERS = 20            # per role
+DEFAULT_REPEAT = 3
+REGRESSION_THRESHOLD = 0.10     # slower by more than this fraction is flagged
+PREDICTED_FDR_INPUT = 'FDR /fixtures_2017-18_predicted.csv'
+MATCHLOG_STATS = {name for columns in MATCHLOG_COLUMNS.values() for name, _ in columns}
+
+
+# ============================================================================
+# FIXTURE RECORDING
+# ============================================================================
+
+def _cell(stat, value):
+    # Row headers are <th>, as on FBref (get_premgames looks for th[data-stat=year_id])
+    if stat in ('date', 'year_id'):
+        return f'<th scope="row" class="left" data-stat="{stat}"><a href="#">{html.escape(value)}</a></th>'
+    return f'<td class="right" data-stat="{stat}">{html.escape(value)}</td>'
+
+
+def render_table(rows, columns, table_class='stats_table sortable min_width'):
+    """
+    An FBref stats table: one <tr> per row of a string-valued frame, with a
+    repeated header row (which the parsers skip) every 20 rows.
+    """
+    head = ''.join(f'<th data-stat="{stat}">{html.escape(name)}</th>' for name, stat in columns)
+    body = []
+    for i, values in enumerate(rows[[name for name, _ in columns]].itertuples(index=False)):
+        if i and i % 20 == 0:
+            body.append(f'<tr class="thead">{head}</tr>')
+        body.append('<tr>' + ''.join(_cell(stat, value) for (_, stat), value in zip(columns, values)) + '</tr>')
+    return (f'<table class="{table_class}"><thead><tr>{head}</tr></thead>'
+            f'<tbody>{"".join(body)}</tbody></table>')
+
+
+def render_page(title, table):
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'</head><body><div id="wrap"><div id="content"><h1>{html.escape(title)}</h1>{table}</div></div>'
+            f'</body></html>')
+
+
+def _read_strings(path):
+    """A player or team CSV with every value as the string written in the file."""
+    has_index, _ = read_header(path)
+    return pd.read_csv(path, index_col=0 if has_index else None, dtype=str, keep_default_na=False)
+
+
+def _url_path(url):
+    return unquote(urlsplit(url).path)
+
+
+def select_players(per_role=DEFAULT_PLAYERS):
+    """Player files spread evenly through each role's folder: [(role, path), ...]."""
+    selected = []
+    for role, folder in sorted(PLAYER_DIRS.items()):
+        files = sorted(f for f in os.listdir(folder) if f.endswith('_finaldat.csv'))
+        step = max(1, len(files) // per_role)
+        selected += [(role, os.path.join(folder, f)) for f in files[::step][:per_role]]
+    return selected
+
+
+class FixtureWriter:
+    """Stores rendered pages content-addressed and keeps the URL path index."""
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self.pages = {}
+
+    def add(self, url, page):
+        body = page.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        path = os.path.join(self.fixture_dir, 'pages', f'{digest}.html.gz')
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(gzip.compress(body))
+        self.pages[_url_path(url)] = {'object': digest, 'size': len(body)}
+
+
+def record_fixtures(per_role=DEFAULT_PLAYERS, fixture_dir=FIXTURE_DIR, team_path=TEAM_FILE,
+                    predicted_path=PREDICTED_FDR_INPUT):
+    """Rebuild fixture_dir from Player_Data, team_finaldat.csv and the FDR predictions."""
+    if os.path.exists(fixture_dir):
+        shutil.rmtree(fixture_dir)
+    os.makedirs(os.path.join(fixture_dir, 'pages'))
+    writer = FixtureWriter(fixture_dir)
+
+    players = []
+    for role, path in select_players(per_role):
+        stem = os.path.basename(path)[:-len('_finaldat.csv')]
+        # Match-log and FPL lookups only need a stable code and name per player
+        player = {'role': role, 'code': hashlib.sha256(stem.encode()).hexdigest()[:8], 'slug': stem,
+                  'fpl_name': stem, 'seasons': []}
+        copy = os.path.join(fixture_dir, PLAYER_DIRS[role], os.path.basename(path))
+        os.makedirs(os.path.dirname(copy), exist_ok=True)
+        shutil.copyfile(path, copy)
+
+        df = _read_strings(path)
+        df = df[df['Date'] != '']
+        fpl_columns = [c for c in df.columns if c not in MATCHLOG_STATS and c != 'kickoff_date']
+        summary = []
+        for season, rows in df.groupby(season_labels(df['Date']), sort=True):
+            year = fbref_season(season)
+            player['seasons'].append(year)
+            matchlog = rows.assign(Matchweek='Matchweek ' + rows['Matchweek'])
+            for category in MATCHLOG_CATEGORIES:
+                columns = MATCHLOG_COLUMNS[category]
+                url = fbref_scrape.matchlog_url(player['code'], year, category, stem)
+                writer.add(url, render_page(f'{stem} Match Logs {year}',
+                                            render_table(matchlog.reindex(columns=[n for n, _ in columns],
+                                                                          fill_value=''), columns)))
+            gw_dir = os.path.join(fixture_dir, 'fpl', season, 'players', f'{stem}_{len(players) + 1}')
+            os.makedirs(gw_dir)
+            rows[fpl_columns].to_csv(os.path.join(gw_dir, 'gw.csv'), index=False)
+            summary.append({'Season': year, 'Competition': '1. Premier League', 'Games': str(len(rows)),
+                            'Country': 'eng ENG'})
+        summary_columns = [('Season', 'year_id'), ('Competition', 'comp_level'), ('Games', 'games'),
+                           ('Country', 'country')]
+        writer.add(fbref_scrape.player_summary_url(player['code'], stem),
+                   render_page(stem, render_table(pd.DataFrame(summary), summary_columns)))
+        players.append(player)
+
+    # Squad schedule pages and an observed FDR table from team_finaldat.csv
+    teams = _read_strings(team_path)
+    teams = teams[teams['Date'] != '']
+    teams = teams.assign(Season=season_labels(teams['Date']), team_id=team_ids(teams['Team']),
+                         opponent_id=team_ids(teams['Opponent']))
+    squads = []
+    for (team_id, season), rows in teams.groupby(['team_id', 'Season'], sort=True):
+        team = TEAMS[team_id - 1]
+        year = fbref_season(season)
+        squads.append({'code': team['code'], 'slug': team['slug'], 'season': year})
+        rows = rows.assign(Matchweek='Matchweek ' + rows['Matchweek'])
+        writer.add(fbref_scrape.squad_schedule_url(team['code'], year, team['slug']),
+                   render_page(f"{team['fbref']} Scores and Fixtures {year}",
+                               render_table(rows.reindex(columns=[n for n, _ in SCHEDULE_COLUMNS], fill_value=''),
+                                            SCHEDULE_COLUMNS)))
+    shutil.copyfile(team_path, os.path.join(fixture_dir, 'team_finaldat.csv'))
+    if predicted_path and os.path.exists(predicted_path):
+        shutil.copyfile(predicted_path, os.path.join(fixture_dir, 'fdr_predicted.csv'))
+
+    # Observed FDR rows are synthetic (from the opponent id) but have the real table's shape
+    observed = teams[teams['Season'] >= FIRST_OBSERVED_SEASON]
+    observed = pd.DataFrame({
+        'Season': observed['Season'], 'Gameweek': pd.to_numeric(observed['Matchweek'], errors='coerce'),
+        'Date': pd.to_datetime(observed['Date']), 'Team': observed['Team'], 'Opponent': observed['Opponent'],
+        'Venue': observed['Venue'], 'is_home': observed['Venue'] == 'Home',
+        'FDR': (2 + observed['opponent_id'] % 4).astype('int8'),
+    })[FDR_COLUMNS]
+    observed.to_parquet(os.path.join(fixture_dir, 'observed_fdr.parquet'), index=False)
+
+    manifest = {'players': players, 'squads': squads, 'recorded_at': datetime.now().isoformat(timespec='seconds')}
+    with open(os.path.join(fixture_dir, 'pages.json'), 'w') as f:
+        json.dump(writer.pages, f)
+    with open(os.path.join(fixture_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest, writer.pages
+
+
+def fixture_key(fixture_dir=FIXTURE_DIR):
+    """Content hash of the page index and manifest; results are only compared within one key."""
+    digest = hashlib.sha256()
+    for name in ('pages.json', 'manifest.json'):
+        with open(os.path.join(fixture_dir, name), 'rb') as f:
+            content = f.read()
+        if name == 'manifest.json':
+            manifest = json.loads(content)
+            manifest.pop('recorded_at', None)
+            content = json.dumps(manifest, sort_keys=True).encode()
+        digest.update(content)
+    return digest.hexdigest()[:12]
+
+
+# ============================================================================
+# LOCAL STAND-IN SERVER
+# ============================================================================
+
+class FixtureServer:
+    """
+    Serves recorded pages on 127.0.0.1 in a background thread.
+
+    Pages go out gzip-encoded when the client accepts it, with an ETag, and
+    If-None-Match gets a 304, so the HTTP client and cache take the same
+    paths they take against fbref.com. Unknown paths are a 404.
+    """
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        with open(os.path.join(fixture_dir, 'pages.json')) as f:
+            self.pages = json.load(f)
+        self.requests = 0
+        self.httpd = None
+        self.url = None
+
+    def body(self, entry):
+        with open(os.path.join(self.fixture_dir, 'pages', f"{entry['object']}.html.gz"), 'rb') as f:
+            return f.read()
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out as separate writes; with Nagle on, keep-alive
+            # requests stall on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.requests += 1
+                entry = server.pages.get(unquote(urlsplit(self.path).path))
+                if entry is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                etag = f'"{entry["object"][:16]}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.body(entry)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('ETag', etag)
+                if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    self.send_header('Content-Encoding', 'gzip')
+                else:
+                    body = gzip.decompress(body)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ============================================================================
+# STAGES
+# ============================================================================
+
+class BenchContext:
+    """Fixture manifest plus state shared between stages of one run (paths are absolute)."""
+
+    def __init__(self, fixture_dir, work_dir, workers=None):
+        self.fixture_dir = os.path.abspath(fixture_dir)
+        self.work_dir = os.path.abspath(work_dir)
+        self.workers = workers
+        with open(os.path.join(self.fixture_dir, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        self.players = self.manifest['players']
+        self.player_seasons = [(p, year) for p in self.players for year in p['seasons']]
+        self.warm_cache = os.path.join(self.work_dir, 'fbref_cache_warm')
+        self.tables = None
+
+    def cold_cache(self):
+        root = os.path.join(self.work_dir, 'fbref_cache_cold')
+        shutil.rmtree(root, ignore_errors=True)
+        configure_cache(root=root)
+
+    def warm(self):
+        """Fill the warm cache with every page (untimed), then serve it offline."""
+        configure_cache(root=self.warm_cache)
+        for player, year in self.player_seasons:
+            for category in MATCHLOG_CATEGORIES:
+                fetch_html(fbref_scrape.matchlog_url(player['code'], year, category, player['slug']))
+        configure_cache(root=self.warm_cache, offline=True)
+
+    def matchlog_urls(self):
+        return [fbref_scrape.matchlog_url(player['code'], year, category, player['slug'])
+                for player, year in self.player_seasons for category in MATCHLOG_CATEGORIES]
+
+
+def setup_get_url_final(ctx):
+    ctx.cold_cache()
+
+
+def run_get_url_final(ctx):
+    for player, year in ctx.player_seasons:
+        for category in MATCHLOG_CATEGORIES:
+            fbref_scrape.get_url_final(player['code'], year, category, player['slug'])
+    return {'pages': len(ctx.player_seasons) * len(MATCHLOG_CATEGORIES), 'player_seasons': len(ctx.player_seasons)}
+
+
+def run_squad_pages(ctx):
+    rows = sum(len(fbref_scrape.get_team_data(squad['code'], squad['season'], squad['slug']))
+               for squad in ctx.manifest['squads'])
+    return {'pages': len(ctx.manifest['squads']), 'rows': rows}
+
+
+def run_summary_pages(ctx):
+    for player in ctx.players:
+        fbref_scrape.get_premgames(player['code'], player['slug'])
+    return {'pages': len(ctx.players)}
+
+
+def setup_parse(ctx):
+    if ctx.tables is None:
+        ctx.warm()
+        ctx.tables = [{category: BeautifulSoup(fetch_html(fbref_scrape.matchlog_url(
+            player['code'], year, category, player['slug'])), 'lxml').find('tbody') for category in MATCHLOG_CATEGORIES}
+            for player, year in ctx.player_seasons]
+
+
+def run_parse(ctx):
+    rows = sum(len(matchlog_frame(pages)) for pages in ctx.tables)
+    return {'rows': rows, 'player_seasons': len(ctx.tables)}
+
+
+def setup_get_data_final(ctx):
+    ctx.warm()
+    if not isinstance(fpl_index._default_index, fpl_index.FplIndex) or \
+            fpl_index._default_index.data_dir != os.path.join(ctx.fixture_dir, 'fpl'):
+        index_dir = os.path.join(ctx.work_dir, 'fpl_index')
+        shutil.rmtree(index_dir, ignore_errors=True)
+        fpl_index._default_index = fpl_index.FplIndex(data_dir=os.path.join(ctx.fixture_dir, 'fpl'),
+                                                      cache_dir=index_dir)
+        fpl_index._default_index.build_gameweeks()
+
+
+def run_get_data_final(ctx):
+    rows = sum(len(fbref_scrape.get_data_final(player['code'], year, player['slug'], player['fpl_name']))
+               for player, year in ctx.player_seasons)
+    return {'rows': rows, 'player_seasons': len(ctx.player_seasons)}
+
+
+def setup_compile(ctx):
+    from compile_defender_data import COMPILE_CACHE_DIR, OUTPUTS
+
+    # compile_players works relative to the current directory, which is the work directory
+    shutil.rmtree(COMPILE_CACHE_DIR, ignore_errors=True)
+    for output in OUTPUTS.values():
+        for path in (f'{output}.csv', f'{output}.parquet'):
+            if os.path.exists(path):
+                os.remove(path)
+    if not os.path.exists('Player_Data'):
+        os.symlink(os.path.join(ctx.fixture_dir, 'Player_Data'), 'Player_Data')
+
+
+def run_compile(ctx):
+    from compile_defender_data import compile_players
+
+    summaries = [compile_players(role, workers=ctx.workers, dataset=False) for role in ('def', 'att')]
+    return {'rows': sum(s['rows'] for s in summaries), 'players': sum(s['files'] for s in summaries)}
+
+
+def setup_merge(ctx):
+    from compile_defender_data import OUTPUTS
+
+    if not all(os.path.exists(f'{output}.parquet') for output in OUTPUTS.values()):
+        setup_compile(ctx)
+        run_compile(ctx)
+
+
+def run_merge(ctx):
+    from feature_store import build_features
+
+    predicted = os.path.join(ctx.fixture_dir, 'fdr_predicted.csv')
+    features = build_features(['def_finaldat.parquet', 'att_finaldat.parquet'],
+                              team_path=os.path.join(ctx.fixture_dir, 'team_finaldat.csv'),
+                              predicted_path=predicted if os.path.exists(predicted) else None,
+                              observed=pd.read_parquet(os.path.join(ctx.fixture_dir, 'observed_fdr.parquet')))
+    return {'rows': len(features)}
+
+
+# Stage name -> (untimed setup before every run, timed run returning unit counts)
+STAGES = {
+    'get_url_final': (setup_get_url_final, run_get_url_final),
+    'squad_pages': (setup_get_url_final, run_squad_pages),
+    'summary_pages': (setup_get_url_final, run_summary_pages),
+    'parse': (setup_parse, run_parse),
+    'get_data_final': (setup_get_data_final, run_get_data_final),
+    'compile': (setup_compile, run_compile),
+    'merge': (setup_merge, run_merge),
+}
+
+
+def measure(ctx, stage, repeat=DEFAULT_REPEAT):
+    """One traced warm-up run (peak memory), then repeat timed runs of a stage."""
+    setup, run = STAGES[stage]
+    setup(ctx)
+    gc.collect()
+    tracemalloc.start()
+    run(ctx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        setup(ctx)
+        gc.collect()
+        start = time.perf_counter()
+        counts = run(ctx)
+        times.append(time.perf_counter() - start)
+    seconds = statistics.median(times)
+    rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        'stage': stage, 'seconds': round(seconds, 4), 'best': round(min(times), 4), 'repeat': repeat,
+        'counts': counts, 'throughput': {f'{unit}_per_s': round(n / seconds, 1) for unit, n in counts.items()},
+        'peak_mb': round(peak / 1e6, 1), 'max_rss_mb': round(rss / 1024, 1),
+    }
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+def git_commit():
+    """(short commit, has uncommitted changes) of the working tree, or (None, None) outside git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                                text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit.stdout.strip(), bool(status.stdout.strip())
+
+
+def load_results(path=RESULTS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_results(results, path=RESULTS_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        for result in results:
+            f.write(json.dumps(result) + '\n')
+
+
+def baseline(history, result):
+    """The latest earlier result for the same stage and fixtures from another commit (else any run)."""
+    same = [r for r in history if r['stage'] == result['stage'] and r['fixtures'] == result['fixtures']]
+    other = [r for r in same if r['commit'] != result['commit']]
+    return (other or same or [None])[-1]
+
+
+def print_history(history, stages=None, last=10):
+    """Median seconds and main throughput of the last runs per stage."""
+    for stage in stages or STAGES:
+        runs = [r for r in history if r['stage'] == stage][-last:]
+        if not runs:
+            continue
+        print(f"\n{stage}")
+        for r in runs:
+            unit, rate = next(iter(r['throughput'].items()))
+            print(f"  {r['timestamp']}  {r['commit'] or '-':>9}{'*' if r['dirty'] else ' '}  "
+                  f"{r['seconds']:>8.3f}s  {rate:>10,.1f} {unit}  peak {r['peak_mb']:.1f} MB  [{r['fixtures']}]")
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Offline benchmarks of the scrape, parse, compile and merge stages.')
+    parser.add_argument('--record', action='store_true', help='(Re)record the fixtures before running')
+    parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS,
+                        help=f'Players per role when recording (default: {DEFAULT_PLAYERS})')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES), help='Stages to run')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Timed runs per stage (default: {DEFAULT_REPEAT})')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for compile (default: all cores)')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f'Flag stages slower than the baseline by this fraction (default: {REGRESSION_THRESHOLD})')
+    parser.add_argument('--no-save', action='store_true', help=f'Do not append the results to {RESULTS_FILE}')
+    parser.add_argument('--history', action='store_true', help='Print recorded results and exit')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    history = load_results()
+    if args.history:
+        print_history(history, args.stages)
+        return
+
+    if args.record or not os.path.exists(os.path.join(FIXTURE_DIR, 'manifest.json')):
+        start = time.time()
+        manifest, pages = record_fixtures(args.players)
+        print(f"✓ Recorded {len(pages):,} pages for {len(manifest['players'])} players and "
+              f"{len(manifest['squads'])} squad-seasons -> {FIXTURE_DIR} ({time.time() - start:.1f}s)")
+
+    commit, dirty = git_commit()
+    key = fixture_key()
+    ctx = BenchContext(FIXTURE_DIR, WORK_DIR, workers=args.workers)
+    print("=" * 70)
+    print(f"BENCHMARKS @ {commit or 'no commit'}{' (uncommitted changes)' if dirty else ''}: "
+          f"{len(ctx.players)} players, {len(ctx.player_seasons)} player-seasons, fixtures {key}")
+    print("=" * 70)
+
+    results = []
+    timestamp = datetime.now().isoformat(timespec='seconds')
+    cwd = os.getcwd()
+    os.makedirs(ctx.work_dir, exist_ok=True)
+    # Stages point the shared FBref URL, HTML cache and FPL index at the fixtures; put them back afterwards
+    original_url = fbref_scrape.FBREF_URL
+    original_cache, original_index = html_cache.get_cache(), fpl_index._default_index
+    try:
+        with FixtureServer(ctx.fixture_dir) as server:
+            fbref_scrape.FBREF_URL = server.url
+            # Stages that write relative paths (compile outputs, registries) write into the work directory
+            os.chdir(ctx.work_dir)
+            for stage in args.stages:
+                result = measure(ctx, stage, args.repeat)
+                result.update({'timestamp': timestamp, 'commit': commit, 'dirty': dirty, 'fixtures': key,
+                               'python': platform.python_version()})
+                results.append(result)
+                rates = ', '.join(f"{rate:,.1f} {unit}" for unit, rate in result['throughput'].items())
+                line = f"  {stage:15s} {result['seconds']:8.3f}s  {rates}  (peak {result['peak_mb']:.1f} MB)"
+                previous = baseline(history, result)
+                if previous is not None:
+                    change = result['seconds'] / previous['seconds'] - 1
+                    flag = '  REGRESSION' if change > args.threshold else ''
+                    line += f"  {change:+.0%} vs {previous['commit']}{flag}"
+                print(line, flush=True)
+    finally:
+        os.chdir(cwd)
+        fbref_scrape.FBREF_URL = original_url
+        html_cache._default_cache = original_cache
+        fpl_index._default_index = original_index
+
+    print(f"\nMax RSS: {max(r['max_rss_mb'] for r in results):.0f} MB")
+    if not args.no_save:
+        save_results(results)
+        print(f"✓ Appended {len(results)} results to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,283 @@
 """
-Script to compile all individual defender CSV files into def_finaldat.csv
+Script to compile individual player CSV files into def_finaldat.csv / att_finaldat.csv
 
-This script reads all defender files from Player_Data/Defenders/ and
-concatenates them into a single def_finaldat.csv file.
+This script reads all defender files from Player_Data/Defenders/ (and, with
+--role att, the attacker/midfielder files directly in Player_Data/) and
+compiles them into a single def_finaldat.csv (att_finaldat.csv) file, plus a
+def_finaldat.parquet copy and the partitioned dataset (see dataset_store.py).
+
+Instead of reading every file into a list and doing one big pd.concat (peak
+memory ~2x the output), each input file is turned into a CSV body and an
+Arrow fragment in .compile_cache/<role>/ by a pool of worker processes:
+
+- columns projected onto the current schema version (schema_registry.py)
+- compact dtypes applied (player_schema.py)
+- 'Player ID' (the player's numeric int32 id from entity_registry.py),
+  'player_stem' (the file name stem, e.g. 'saka') and 'season' ('2023-24') added
+
+The outputs are then streamed together one fragment at a time. Fragments are
+keyed by each input's mtime/size and content hash, so after a single player
+refresh only that player's fragment is rebuilt, and a run with no changed
+inputs does not rewrite the outputs at all. A fragment is also rebuilt when
+its player's id or FRAGMENT_VERSION (the layout of the added columns) changes.
+
+Usage (from the repo root):
+    python FeatureExplore/compile_defender_data.py              # def_finaldat
+    python FeatureExplore/compile_defender_data.py --role att
+    python FeatureExplore/compile_defender_data.py --role all --workers 4
 """
 
-import pandas as pd
+import argparse
+import hashlib
+import json
 import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def compile_defender_data():
-    """Compile all defender CSV files into a single dataframe"""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 
-    # Path to defender files
-    defender_path = 'Player_Data/Defenders'
+from dataset_store import DATASET_DIR, PLAYER_DIRS, season_labels, write_players_file
+from entity_registry import get_player_registry
+from instrumentation import stage
+from player_schema import CATEGORY, DATE, DATETIME_UTC, apply_schema, memory_mb
+from schema_registry import CURRENT_VERSION, SCHEMA_VERSIONS, read_header
 
-    # List to store all dataframes
-    defender_dataframes = []
 
-    print("Reading defender files...")
+COMPILE_CACHE_DIR = '.compile_cache'
+# Bump when the columns added to each fragment change, so cached fragments are rebuilt
+FRAGMENT_VERSION = 2
+OUTPUTS = {'att': 'att_finaldat', 'def': 'def_finaldat'}
+ROW_GROUP_ROWS = 32768
+OUTPUT_COLUMNS = SCHEMA_VERSIONS[CURRENT_VERSION]['columns'] + ['Player ID', 'player_stem', 'season']
+OUTPUT_DTYPES = {**SCHEMA_VERSIONS[CURRENT_VERSION]['dtypes'], 'Player ID': 'int32'}
 
-    # Read all CSV files from Defenders folder
-    if os.path.exists(defender_path):
-        for file in sorted(os.listdir(defender_path)):
-            if file.endswith('.csv'):
-                file_path = os.path.join(defender_path, file)
-                df = pd.read_csv(file_path)
-                defender_dataframes.append(df)
 
-        print(f"Found {len(defender_dataframes)} defender files")
+def player_stem(path):
+    """File name stem used as the registry key: 'Player_Data/saka_finaldat.csv' -> 'saka'."""
+    stem = os.path.basename(path)[:-len('.csv')]
+    return stem[:-len('_finaldat')] if stem.endswith('_finaldat') else stem
 
-        # Concatenate all dataframes
-        final_df = pd.concat(defender_dataframes, ignore_index=True)
 
-        # Save to CSV
-        output_path = 'def_finaldat.csv'
-        final_df.to_csv(output_path, index=False)
+def arrow_schema(columns=OUTPUT_COLUMNS, dtypes=OUTPUT_DTYPES):
+    """Fixed Arrow schema for the compiled frame, so every fragment writes the same types."""
+    fields = []
+    for column in columns:
+        dtype = dtypes.get(column, CATEGORY)
+        if dtype == DATE:
+            arrow_type = pa.timestamp('us')
+        elif dtype == DATETIME_UTC:
+            arrow_type = pa.timestamp('us', tz='UTC')
+        elif dtype == CATEGORY:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            arrow_type = pa.from_numpy_dtype(dtype)
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
 
-        print(f"\n✓ Successfully compiled defender data!")
-        print(f"  Total defenders: {len(defender_dataframes)}")
-        print(f"  Total rows: {len(final_df):,}")
-        print(f"  Columns: {len(final_df.columns)}")
-        print(f"  Output: {output_path}")
 
-        # Display summary
-        print(f"\nDataset summary:")
-        print(f"  Date range: {final_df['Date'].min()} to {final_df['Date'].max()}")
-        print(f"  Unique players: {final_df['Player ID'].nunique() if 'Player ID' in final_df.columns else 'N/A'}")
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ============================================================================
+# FRAGMENTS
+# ============================================================================
+
+def fragment_paths(cache_dir, stem):
+    return os.path.join(cache_dir, f'{stem}.csv'), os.path.join(cache_dir, f'{stem}.arrow')
+
+
+def build_fragment(path, cache_dir, player_id):
+    """Read one player file and write its CSV body and Arrow fragment. Runs in a worker."""
+    stem = os.path.basename(path)[:-len('.csv')]
+    with stage('compile.fragment', bytes=os.path.getsize(path)) as counters:
+        has_index, _ = read_header(path)
+        raw = pd.read_csv(path, index_col=0 if has_index else None)
+        df = apply_schema(raw.reindex(columns=SCHEMA_VERSIONS[CURRENT_VERSION]['columns']))
+        df = df.assign(**{'Player ID': pd.Series(player_id, index=df.index, dtype='int32'),
+                          'player_stem': player_stem(path), 'season': season_labels(df['Date'])})
+
+        csv_path, arrow_path = fragment_paths(cache_dir, stem)
+        df.to_csv(f'{csv_path}.tmp', index=False, header=False)
+        os.replace(f'{csv_path}.tmp', csv_path)
+        # Uncompressed Arrow IPC reads back almost for free when the outputs are reassembled
+        table = pa.Table.from_pandas(df, preserve_index=False).cast(arrow_schema())
+        feather.write_feather(table, f'{arrow_path}.tmp', compression='uncompressed')
+        os.replace(f'{arrow_path}.tmp', arrow_path)
+        counters['rows'] = len(df)
+
+    return {'rows': len(df), 'min_date': str(df['Date'].min().date()) if len(df) else None,
+            'max_date': str(df['Date'].max().date()) if len(df) else None,
+            'memory_before': memory_mb(raw), 'memory_after': memory_mb(df)}
+
+
+def _build_one(args):
+    return args[0], build_fragment(*args)
+
+
+# ============================================================================
+# COMPILE
+# ============================================================================
 
-        return final_df
+def compile_players(role='def', formats=('csv', 'parquet'), workers=None, dataset=True,
+                    cache_root=COMPILE_CACHE_DIR):
+    """
+    Compile one role's player files, rebuilding only fragments whose input changed.
 
-    else:
-        print(f"Error: Path {defender_path} does not exist")
+    Returns a summary dict (files, rebuilt, rows, dates, outputs).
+    """
+    folder = PLAYER_DIRS[role]
+    if not os.path.exists(folder):
+        print(f"Error: Path {folder} does not exist")
         return None
+    cache_dir = os.path.join(cache_root, role)
+    os.makedirs(cache_dir, exist_ok=True)
+    state_path = os.path.join(cache_dir, 'state.json')
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+
+    inputs = [os.path.join(folder, file) for file in sorted(os.listdir(folder)) if file.endswith('.csv')]
+    # Registered here, before the workers start, so only this process writes the registry
+    player_ids = dict(zip(inputs, get_player_registry().ids([player_stem(path) for path in inputs]).tolist()))
+
+    # Decide which inputs changed: same mtime and size -> unchanged without reading;
+    # otherwise compare content hashes
+    changed = []
+    new_state = {}
+    for path in inputs:
+        stat = os.stat(path)
+        entry = state.get(path)
+        if entry and (entry.get('fragment_version') != FRAGMENT_VERSION or entry.get('player_id') != player_ids[path]):
+            entry = None
+        fragments_exist = all(os.path.exists(p) for p in fragment_paths(cache_dir, os.path.basename(path)[:-4]))
+        if entry and fragments_exist and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            new_state[path] = entry
+            continue
+        digest = _sha256_file(path)
+        if entry and fragments_exist and entry['sha256'] == digest:
+            new_state[path] = {**entry, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+            continue
+        new_state[path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest,
+                           'fragment_version': FRAGMENT_VERSION, 'player_id': player_ids[path]}
+        changed.append(path)
+
+    # Fragments of files that no longer exist
+    for path in set(state) - set(new_state):
+        for fragment in fragment_paths(cache_dir, os.path.basename(path)[:-4]):
+            if os.path.exists(fragment):
+                os.remove(fragment)
+
+    print(f"Reading {role} files: {len(inputs)} found, {len(changed)} changed", flush=True)
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = [(path, cache_dir, player_ids[path]) for path in changed]
+            for path, stats in pool.map(_build_one, jobs, chunksize=8):
+                new_state[path].update(stats)
+
+    output = OUTPUTS[role]
+    outputs = [f'{output}.{fmt}' for fmt in formats]
+    if changed or set(state) != set(new_state) or not all(os.path.exists(p) for p in outputs):
+        stems = [os.path.basename(path)[:-4] for path in inputs]
+        if 'csv' in formats:
+            # Header once, then each fragment's bytes; nothing is parsed again
+            with stage('compile.write', format='csv') as counters:
+                with open(f'{output}.csv.tmp', 'wb') as out:
+                    out.write(pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(index=False).encode('utf-8'))
+                    for stem in stems:
+                        with open(fragment_paths(cache_dir, stem)[0], 'rb') as f:
+                            shutil.copyfileobj(f, out)
+                    counters['bytes'] = out.tell()
+                os.replace(f'{output}.csv.tmp', f'{output}.csv')
+        if 'parquet' in formats:
+            # At most ROW_GROUP_ROWS rows in memory at a time
+            with stage('compile.write', format='parquet') as counters:
+                rows = 0
+                with pq.ParquetWriter(f'{output}.parquet.tmp', arrow_schema()) as writer:
+                    pending, pending_rows = [], 0
+                    for stem in stems:
+                        table = feather.read_table(fragment_paths(cache_dir, stem)[1])
+                        pending.append(table)
+                        pending_rows += table.num_rows
+                        rows += table.num_rows
+                        if pending_rows >= ROW_GROUP_ROWS:
+                            writer.write_table(pa.concat_tables(pending).unify_dictionaries(), ROW_GROUP_ROWS)
+                            pending, pending_rows = [], 0
+                    if pending:
+                        writer.write_table(pa.concat_tables(pending).unify_dictionaries(), ROW_GROUP_ROWS)
+                os.replace(f'{output}.parquet.tmp', f'{output}.parquet')
+                counters.update(rows=rows, bytes=os.path.getsize(f'{output}.parquet'))
+            if dataset:
+                write_players_file(f'{output}.parquet', role)
+
+    with open(f'{state_path}.tmp', 'w') as f:
+        json.dump(new_state, f)
+    os.replace(f'{state_path}.tmp', state_path)
+
+    entries = list(new_state.values())
+    dates = [e['min_date'] for e in entries if e.get('min_date')] + [e['max_date'] for e in entries if e.get('max_date')]
+    return {'role': role, 'files': len(inputs), 'rebuilt': len(changed),
+            'rows': sum(e.get('rows', 0) for e in entries),
+            'memory_before': sum(e.get('memory_before', 0) for e in entries),
+            'memory_after': sum(e.get('memory_after', 0) for e in entries),
+            'date_range': (min(dates), max(dates)) if dates else (None, None), 'outputs': outputs}
+
+
+def compile_defender_data(**kwargs):
+    """Compile all defender CSV files into def_finaldat.csv"""
+    return compile_players('def', **kwargs)
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Compile player CSV files into att/def_finaldat.')
+    parser.add_argument('--role', choices=['def', 'att', 'all'], default='def', help='Which files to compile')
+    parser.add_argument('--format', nargs='+', choices=['csv', 'parquet'], default=['csv', 'parquet'],
+                        dest='formats', help='Output formats (default: csv parquet)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--no-dataset', action='store_true',
+                        help=f'Do not update the partitioned dataset in {DATASET_DIR}/')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    roles = ['def', 'att'] if args.role == 'all' else [args.role]
+    for role in roles:
+        start = time.time()
+        summary = compile_players(role, formats=args.formats, workers=args.workers,
+                                  dataset=not args.no_dataset)
+        if summary is None:
+            continue
+
+        print(f"\n✓ Successfully compiled {role} data! ({time.time() - start:.1f}s)")
+        print(f"  Total players: {summary['files']} ({summary['rebuilt']} rebuilt)")
+        print(f"  Total rows: {summary['rows']:,}")
+        print(f"  Columns: {len(OUTPUT_COLUMNS)}")
+        print(f"  Memory: {summary['memory_before']:.1f} MB -> {summary['memory_after']:.1f} MB with compact dtypes")
+        print(f"  Output: {', '.join(summary['outputs'])}")
+        if 'parquet' in args.formats and not args.no_dataset:
+            print(f"  Dataset: {DATASET_DIR}/players/role={role}")
+
+        # Display summary
+        print(f"\nDataset summary:")
+        print(f"  Date range: {summary['date_range'][0]} to {summary['date_range'][1]}")
+        print(f"  Unique players: {summary['files']}")
+        print()
 
 if __name__ == "__main__":
-    df = compile_defender_data()
+    main()
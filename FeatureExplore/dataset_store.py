@@ -0,0 +1,162 @@
+"""
+Partitioned Parquet copy of the compiled player and team data.
+
+att_finaldat.csv, def_finaldat.csv and team_finaldat.csv are ~112 text
+columns that every notebook parses in full with pd.read_csv. The compile step
+also writes them here as a hive-partitioned Parquet dataset, in the compact
+dtypes of player_schema.py:
+
+    finaldat_dataset/
+        players/role=att/season=2023-24/<part>.parquet
+        players/role=def/season=2023-24/<part>.parquet
+        teams/season=2023-24/<part>.parquet
+
+Loaders read only the requested columns and only the matching partitions, and
+can push row filters down to Parquet (e.g. Position in FW/LW/RW/AM, Start == Y).
+Seasons use the FPL 'YYYY-YY' label that FormFixtures' get_season produces.
+
+Usage (from the repo root):
+    python FeatureExplore/dataset_store.py          # rebuild from Player_Data and team_finaldat.csv
+
+    from dataset_store import load_players
+    att = load_players(columns=['Date', 'Player ID', 'xG', 'total_points'], roles=['att'],
+                       seasons=['2022-23', '2023-24'], filters=[('Start', '==', 'Y')])
+"""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from player_schema import PLAYER_SCHEMA, TEAM_SCHEMA, apply_schema
+from schema_registry import read_header
+
+
+DATASET_DIR = 'finaldat_dataset'
+PLAYER_DIRS = {'att': 'Player_Data', 'def': os.path.join('Player_Data', 'Defenders')}
+TEAM_FILE = 'team_finaldat.csv'
+
+
+def season_labels(dates):
+    """Vectorized season label ('2023-24') for a Series of dates; seasons start in August."""
+    dates = pd.to_datetime(dates)
+    start = dates.dt.year - (dates.dt.month < 8).astype(int)
+    return start.astype(str) + '-' + ((start + 1) % 100).astype(str).str.zfill(2)
+
+
+def _typed(df, schema):
+    """Drop saved index columns and convert to the compact schema dtypes."""
+    df = df.drop(columns=[c for c in df.columns if str(c).startswith('Unnamed')]).copy()
+    return apply_schema(df, schema)
+
+
+def _write(df, path, partition_cols):
+    # Sorting keeps each partition's rows together, so it is written as a few
+    # large row groups rather than one per interleaved batch
+    df = df.sort_values(partition_cols + ['Date'], kind='stable')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Only the partitions present in df are replaced; other seasons/roles are kept
+    pq.write_to_dataset(table, path, partition_cols=partition_cols,
+                        existing_data_behavior='delete_matching')
+
+
+# ============================================================================
+# WRITE
+# ============================================================================
+
+def write_players(df, role, root=DATASET_DIR):
+    """Write compiled player rows for one role ('att' or 'def')."""
+    df = _typed(df, PLAYER_SCHEMA)
+    df = df.assign(season=season_labels(df['Date']), role=role)
+    _write(df, os.path.join(root, 'players'), ['role', 'season'])
+    return df
+
+
+def write_players_file(parquet_path, role, root=DATASET_DIR):
+    """
+    Partition a compiled Parquet file (which already has a 'season' column)
+    into the dataset, streaming record batches instead of loading it whole.
+    """
+    source = ds.dataset(parquet_path)
+    projection = {name: ds.field(name) for name in source.schema.names}
+    projection['role'] = pc.scalar(role)
+    ds.write_dataset(source.scanner(columns=projection), os.path.join(root, 'players'),
+                     format='parquet', partitioning=['role', 'season'], partitioning_flavor='hive',
+                     existing_data_behavior='delete_matching')
+
+
+def write_teams(df, root=DATASET_DIR):
+    """Write compiled team rows (team_finaldat.csv)."""
+    df = _typed(df, TEAM_SCHEMA)
+    df = df.assign(season=season_labels(df['Date']))
+    _write(df, os.path.join(root, 'teams'), ['season'])
+    return df
+
+
+def read_player_folder(folder):
+    """Concatenate every *_finaldat.csv directly inside a Player_Data folder (with or without a saved index)."""
+    frames = []
+    for file in sorted(os.listdir(folder)):
+        if file.endswith('.csv'):
+            path = os.path.join(folder, file)
+            has_index, _ = read_header(path)
+            frames.append(pd.read_csv(path, index_col=0 if has_index else None))
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_dataset(root=DATASET_DIR):
+    """Rebuild the whole dataset from Player_Data and team_finaldat.csv."""
+    # Player rows go through the compile step, so they get the same columns
+    # ('Player ID', 'player_stem') and Arrow types as the partitions it writes
+    from compile_defender_data import OUTPUTS, compile_players
+
+    for role in PLAYER_DIRS:
+        summary = compile_players(role, formats=('parquet',), dataset=False)
+        if summary is None:
+            continue
+        write_players_file(f'{OUTPUTS[role]}.parquet', role, root)
+        print(f"  players/role={role}: {summary['rows']:,} rows, {summary['files']} players", flush=True)
+    if os.path.exists(TEAM_FILE):
+        df = write_teams(pd.read_csv(TEAM_FILE, index_col=0, thousands=','), root)
+        print(f"  teams: {len(df):,} rows, {df['season'].nunique()} seasons", flush=True)
+
+
+# ============================================================================
+# LOAD
+# ============================================================================
+
+def _read(path, columns, partition_filters, filters):
+    filters = [f for f in partition_filters if f[2] is not None] + list(filters or [])
+    df = pd.read_parquet(path, engine='pyarrow', columns=columns, filters=filters or None)
+    # Partition keys come back as categoricals; hand back plain strings
+    for key in ('role', 'season'):
+        if key in df.columns:
+            df[key] = df[key].astype(str)
+    return df
+
+
+def load_players(columns=None, roles=None, seasons=None, filters=None, root=DATASET_DIR):
+    """
+    Load player rows from the dataset.
+
+    columns: subset of columns to read (None for all)
+    roles: e.g. ['att'] or ['att', 'def']
+    seasons: e.g. ['2022-23', '2023-24']
+    filters: extra pyarrow filters, e.g. [('Position', 'in', ['FW', 'LW'])]
+    """
+    return _read(os.path.join(root, 'players'), columns,
+                 [('role', 'in', roles), ('season', 'in', seasons)], filters)
+
+
+def load_teams(columns=None, seasons=None, teams=None, filters=None, root=DATASET_DIR):
+    """Load team rows, optionally restricted to some seasons and teams."""
+    return _read(os.path.join(root, 'teams'), columns,
+                 [('season', 'in', seasons), ('Team', 'in', teams)], filters)
+
+
+if __name__ == "__main__":
+    print(f"Writing {DATASET_DIR}/ ...")
+    build_dataset()
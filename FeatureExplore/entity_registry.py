@@ -0,0 +1,342 @@
+"""
+Canonical team and player entities with compact integer ids for joins.
+
+The same team went by up to five names across the repo: the FBref name in
+team_finaldat.csv and the player files ('Manchester Utd'), the Team_Scrape
+URL slug ('Cardiff-City'), the FDR model name (team_name_mapping in
+FDR_Imputation_Model.ipynb: 'Man Utd', 'Nottingham'), the FPL name
+(team_name_harmonization in FormFixtures: "Nott'm Forest") and the FBref
+squad code. Every merge joined on those strings, so a name missing from one
+of the dicts dropped rows without a word.
+
+TEAMS is the single list of squads. Each one has a fixed team_id (1-based
+position in the list; new squads are appended, never inserted) and every
+alias above maps to it. team_ids converts a column of any of those names to
+int16 ids and raises on a name it does not know (or warns and leaves <NA>
+with errors='warn'), so merges join on integer keys and an unknown alias is
+reported instead of lost. fpl_team_ids maps each season's FPL team ids
+(teams.csv) to the same team_id.
+
+Players are kept in .entity_registry/players.csv, keyed by player_stem (the
+Player_Data file stem, e.g. 'saka') and holding the FBref player code and
+FPL name once a manifest has supplied them. Their int32 player_id is
+derived from the stem (the first 31 bits of its SHA-256), not from the
+order players were registered in, so every clone and every rebuild of the
+(gitignored) registry gives a player the same id. The rare hash collision
+is resolved by probing in sorted stem order, with a warning. fpl_elements
+resolves the FPL element id of each registered player per season through
+fpl_index.
+
+Usage:
+    from entity_registry import get_player_registry, team_ids, team_names
+    df['team_id'] = team_ids(df['Team'])                   # any alias -> int16
+    df['Team'] = team_names(df['team_id'])                 # FPL names
+    df['Player ID'] = get_player_registry().ids(df['player_stem'])   # as in the compiled files
+
+    python FeatureExplore/entity_registry.py                        # summary
+    python FeatureExplore/entity_registry.py --manifest att.csv     # record FBref codes
+"""
+
+import argparse
+import hashlib
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+REGISTRY_DIR = '.entity_registry'
+TEAM_CONVENTIONS = ('fbref', 'fpl', 'model', 'slug', 'code')
+
+# Premier League squads since 2017-18. fbref: name in team_finaldat.csv and
+# the player data; fpl: FPL teams.csv name; model: name the FDR model was
+# trained with; slug/filename: Team_Scrape URL name and Team_Data file.
+TEAMS = [
+    {'code': '18bb7c10', 'slug': 'Arsenal', 'fbref': 'Arsenal', 'fpl': 'Arsenal', 'model': 'Arsenal', 'filename': 'arsenal_teamdat.csv'},
+    {'code': '8602292d', 'slug': 'Aston Villa', 'fbref': 'Aston Villa', 'fpl': 'Aston Villa', 'model': 'Aston Villa', 'filename': 'astonvilla_teamdat.csv'},
+    {'code': '4ba7cbea', 'slug': 'Bournemouth', 'fbref': 'Bournemouth', 'fpl': 'Bournemouth', 'model': 'Bournemouth', 'filename': 'bournemouth_teamdat.csv'},
+    {'code': 'cd051869', 'slug': 'Brentford', 'fbref': 'Brentford', 'fpl': 'Brentford', 'model': 'Brentford', 'filename': 'brentford_teamdat.csv'},
+    {'code': 'd07537b9', 'slug': 'Brighton and Hove Albion', 'fbref': 'Brighton', 'fpl': 'Brighton', 'model': 'Brighton', 'filename': 'bha_teamdat.csv'},
+    {'code': '943e8050', 'slug': 'Burnley', 'fbref': 'Burnley', 'fpl': 'Burnley', 'model': 'Burnley', 'filename': 'burnley_teamdat.csv'},
+    {'code': '75fae011', 'slug': 'Cardiff-City', 'fbref': 'Cardiff City', 'fpl': 'Cardiff', 'model': 'Cardiff', 'filename': 'cardiff_teamdat.csv'},
+    {'code': 'cff3d9bb', 'slug': 'Chelsea', 'fbref': 'Chelsea', 'fpl': 'Chelsea', 'model': 'Chelsea', 'filename': 'chelsea_teamdat.csv'},
+    {'code': '47c64c55', 'slug': 'Crystal Palace', 'fbref': 'Crystal Palace', 'fpl': 'Crystal Palace', 'model': 'Crystal Palace', 'filename': 'cpa_teamdat.csv'},
+    {'code': 'd3fd31cc', 'slug': 'Everton', 'fbref': 'Everton', 'fpl': 'Everton', 'model': 'Everton', 'filename': 'everton_teamdat.csv'},
+    {'code': 'fd962109', 'slug': 'Fulham', 'fbref': 'Fulham', 'fpl': 'Fulham', 'model': 'Fulham', 'filename': 'fulham_teamdat.csv'},
+    {'code': 'f5922ca5', 'slug': 'Huddersfield Town', 'fbref': 'Huddersfield', 'fpl': 'Huddersfield', 'model': 'Huddersfield', 'filename': 'huddersfield_teamdat.csv'},
+    {'code': '5bfb9659', 'slug': 'Leeds United', 'fbref': 'Leeds United', 'fpl': 'Leeds', 'model': 'Leeds United', 'filename': 'leeds_teamdat.csv'},
+    {'code': 'a2d435b3', 'slug': 'Leicester City', 'fbref': 'Leicester City', 'fpl': 'Leicester', 'model': 'Leicester', 'filename': 'leicester_teamdat.csv'},
+    {'code': '822bd0ba', 'slug': 'Liverpool', 'fbref': 'Liverpool', 'fpl': 'Liverpool', 'model': 'Liverpool', 'filename': 'liverpool_teamdat.csv'},
+    {'code': 'e297cd13', 'slug': 'Luton Town', 'fbref': 'Luton Town', 'fpl': 'Luton', 'model': 'Luton Town', 'filename': 'luton_teamdat.csv'},
+    {'code': 'b8fd03ef', 'slug': 'Manchester City', 'fbref': 'Manchester City', 'fpl': 'Man City', 'model': 'Man City', 'filename': 'mancity_teamdat.csv'},
+    {'code': '19538871', 'slug': 'Manchester United', 'fbref': 'Manchester Utd', 'fpl': 'Man Utd', 'model': 'Man Utd', 'filename': 'manunited_teamdat.csv'},
+    {'code': 'b2b47a98', 'slug': 'Newcastle United', 'fbref': 'Newcastle Utd', 'fpl': 'Newcastle', 'model': 'Newcastle', 'filename': 'newcastle_teamdat.csv'},
+    {'code': '1c781004', 'slug': 'Norwich City', 'fbref': 'Norwich City', 'fpl': 'Norwich', 'model': 'Norwich City', 'filename': 'norwich_teamdat.csv'},
+    {'code': 'e4a775cb', 'slug': 'Nottingham Forest', 'fbref': "Nott'ham Forest", 'fpl': "Nott'm Forest", 'model': 'Nottingham', 'filename': 'nfo_teamdat.csv'},
+    {'code': '1df6b87e', 'slug': 'Sheffield United', 'fbref': 'Sheffield Utd', 'fpl': 'Sheffield Utd', 'model': 'Sheffield', 'filename': 'sheffield_teamdat.csv'},
+    {'code': '33c895d4', 'slug': 'Southampton', 'fbref': 'Southampton', 'fpl': 'Southampton', 'model': 'Southampton', 'filename': 'southampton_teamdat.csv'},
+    {'code': '17892952', 'slug': 'Stoke City', 'fbref': 'Stoke City', 'fpl': 'Stoke', 'model': 'Stoke', 'filename': 'stoke_teamdat.csv'},
+    {'code': 'fb10988f', 'slug': 'Swansea City', 'fbref': 'Swansea City', 'fpl': 'Swansea', 'model': 'Swansea', 'filename': 'swansea_teamdat.csv'},
+    {'code': '361ca564', 'slug': 'Tottenham Hotspur', 'fbref': 'Tottenham', 'fpl': 'Spurs', 'model': 'Spurs', 'filename': 'spurs_teamdat.csv'},
+    {'code': '2abfe087', 'slug': 'Watford', 'fbref': 'Watford', 'fpl': 'Watford', 'model': 'Watford', 'filename': 'watford_teamdat.csv'},
+    {'code': '60c6b05f', 'slug': 'West Bromwich Albion', 'fbref': 'West Brom', 'fpl': 'West Brom', 'model': 'West Brom', 'filename': 'westbrom_teamdat.csv'},
+    {'code': '7c21e445', 'slug': 'West Ham United', 'fbref': 'West Ham', 'fpl': 'West Ham', 'model': 'West Ham', 'filename': 'westham_teamdat.csv'},
+    {'code': '8cec06e1', 'slug': 'Wolverhampton Wanderers', 'fbref': 'Wolves', 'fpl': 'Wolves', 'model': 'Wolves', 'filename': 'wolves_teamdat.csv'},
+]
+
+# Other spellings (alias -> squad code) not already in TEAMS
+TEAM_ALIASES = {
+    'Man United': '19538871',
+    'Nottm Forest': 'e4a775cb',
+    'Wolverhampton': '8cec06e1',
+}
+
+
+def _alias_key(name):
+    return ' '.join(str(name).replace('-', ' ').casefold().split())
+
+
+def _build_aliases():
+    ids = {team['code']: team_id for team_id, team in enumerate(TEAMS, start=1)}
+    aliases = {}
+    for team_id, team in enumerate(TEAMS, start=1):
+        names = [team[convention] for convention in TEAM_CONVENTIONS]
+        names += [alias for alias, code in TEAM_ALIASES.items() if code == team['code']]
+        for name in names:
+            key = _alias_key(name)
+            if aliases.setdefault(key, team_id) != team_id:
+                raise ValueError(f"Team alias {name!r} is used by two teams")
+    for alias, code in TEAM_ALIASES.items():
+        if code not in ids:
+            raise ValueError(f"TEAM_ALIASES entry {alias!r} names an unknown squad code {code}")
+    return aliases
+
+
+_ALIASES = _build_aliases()
+
+
+# ============================================================================
+# TEAMS
+# ============================================================================
+
+def team_table():
+    """One row per team: team_id (int16) and its name in every convention."""
+    table = pd.DataFrame(TEAMS)
+    table.insert(0, 'team_id', np.arange(1, len(TEAMS) + 1, dtype='int16'))
+    return table
+
+
+def team_ids(names, errors='raise'):
+    """
+    int16 team_id for each name in a Series (any alias, any convention).
+
+    Only the distinct names are looked up. Unknown names raise ValueError;
+    with errors='warn' they give <NA> (Int16) and a warning listing them.
+    """
+    names = pd.Series(names)
+    codes, uniques = pd.factorize(names.astype(object))
+    looked_up = np.array([_ALIASES.get(_alias_key(name), 0) for name in uniques], dtype='int16')
+    unknown = sorted({str(name) for name, team_id in zip(uniques, looked_up) if team_id == 0})
+    if unknown:
+        message = f"Unknown team names: {unknown}; add them to TEAMS or TEAM_ALIASES in entity_registry.py"
+        if errors == 'raise':
+            raise ValueError(message)
+        warnings.warn(message)
+    ids = np.where(codes >= 0, looked_up[np.maximum(codes, 0)], 0).astype('int16')
+    if unknown or (codes < 0).any():
+        return pd.Series(pd.array(ids, dtype='Int16'), index=names.index).mask(ids == 0)
+    return pd.Series(ids, index=names.index)
+
+
+def team_names(ids, convention='fpl'):
+    """Team name (in one of TEAM_CONVENTIONS) for each team_id; <NA> stays missing."""
+    ids = pd.Series(ids)
+    labels = np.array([team[convention] for team in TEAMS] + [None], dtype=object)
+    codes = ids.fillna(0).astype('int64').to_numpy() - 1
+    return pd.Series(labels[codes], index=ids.index, dtype='str')
+
+
+def fpl_team_ids(teams_df):
+    """
+    Map each season's FPL team ids to team_id.
+
+    teams_df has Season, id and name columns (fpl_fixtures.load_fixtures);
+    returns Season, fpl_id, team_id. FPL names missing from TEAMS are warned
+    about and dropped.
+    """
+    table = teams_df[['Season', 'id']].rename(columns={'id': 'fpl_id'})
+    table = table.assign(team_id=team_ids(teams_df['name'], errors='warn'))
+    return table.dropna(subset=['team_id']).astype({'team_id': 'int16'}).reset_index(drop=True)
+
+
+# ============================================================================
+# PLAYERS
+# ============================================================================
+
+MAX_PLAYER_ID = 2 ** 31 - 1
+
+
+def stable_player_id(stem):
+    """int32 id in [1, 2**31 - 1] from a player_stem, the same on every machine."""
+    digest = int.from_bytes(hashlib.sha256(str(stem).encode('utf-8')).digest()[:4], 'big')
+    return digest % MAX_PLAYER_ID + 1
+
+
+def assign_player_ids(stems):
+    """
+    {stem: player_id} for a set of stems. Only depends on the set: stems are
+    taken in sorted order and one whose hash is already used takes the next
+    free id (with a warning, since that id depends on the other stems).
+    """
+    used = set()
+    ids = {}
+    for stem in sorted(set(stems)):
+        player_id = stable_player_id(stem)
+        while player_id in used:
+            warnings.warn(f"player_id {player_id} of '{stem}' collides with another stem; probing")
+            player_id = player_id % MAX_PLAYER_ID + 1
+        used.add(player_id)
+        ids[stem] = player_id
+    return ids
+
+
+class PlayerRegistry:
+    """player_stem -> player_id table (ids derived from the stem), with FBref codes and FPL names."""
+
+    COLUMNS = ['player_id', 'player_stem', 'code', 'fpl_name']
+
+    def __init__(self, registry_dir=REGISTRY_DIR):
+        self.path = os.path.join(registry_dir, 'players.csv')
+        self._players = None
+
+    def load(self):
+        if self._players is None:
+            if os.path.exists(self.path):
+                players = pd.read_csv(self.path, dtype={'player_id': 'int32', 'player_stem': str,
+                                                        'Player ID': str, 'code': str, 'fpl_name': str})
+                # Registries written before the key column was renamed from 'Player ID'
+                renamed = 'Player ID' in players.columns
+                players = players.rename(columns={'Player ID': 'player_stem'})
+                derived = players['player_stem'].map(assign_player_ids(players['player_stem'])).astype('int32')
+                self._players = players.assign(player_id=derived)
+                if not derived.equals(players['player_id']):
+                    # Written with ids in registration order
+                    warnings.warn(f"Re-derived the player_ids in {self.path} from the stems; "
+                                  f"rebuild tables that stored the old ids")
+                    self.save()
+                elif renamed:
+                    self.save()
+            else:
+                self._players = pd.DataFrame({column: pd.Series(dtype='int32' if column == 'player_id' else str)
+                                              for column in self.COLUMNS})
+        return self._players
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._players.to_csv(f'{self.path}.tmp', index=False)
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def register(self, stems, codes=None, fpl_names=None):
+        """Add new stems (and fill in missing codes / FPL names); ids come from assign_player_ids."""
+        players = self.load()
+        stems = [str(stem) for stem in stems]
+        new = pd.DataFrame({'player_stem': stems,
+                            'code': list(codes) if codes is not None else [None] * len(stems),
+                            'fpl_name': list(fpl_names) if fpl_names is not None else [None] * len(stems)},
+                           dtype='str')
+        new = new.drop_duplicates('player_stem')
+        known = players['player_stem'].isin(new['player_stem'])
+        changed = False
+        if known.any():
+            details = new.set_index('player_stem')
+            for column in ('code', 'fpl_name'):
+                filled = players.loc[known, 'player_stem'].map(details[column])
+                missing = players.loc[known, column].isna() & filled.notna()
+                if missing.any():
+                    players.loc[missing[missing].index, column] = filled[missing]
+                    changed = True
+        new = new[~new['player_stem'].isin(players['player_stem'])]
+        if len(new):
+            new.insert(0, 'player_id', 0)
+            players = pd.concat([players, new], ignore_index=True)
+            ids = assign_player_ids(players['player_stem'])
+            players['player_id'] = players['player_stem'].map(ids).astype('int32')
+            changed = True
+        self._players = players
+        if changed:
+            self.save()
+        return players
+
+    def register_manifest(self, manifest):
+        """Record FBref codes and FPL names from player manifest dicts (player_manifest.load_manifest)."""
+        stems = [os.path.basename(player['output']).replace('_finaldat.csv', '') for player in manifest]
+        return self.register(stems, [player['code'] for player in manifest],
+                             [player['fpl_name'] for player in manifest])
+
+    def ids(self, stems, register=True):
+        """int32 player_id for each player_stem in a Series, registering new ones."""
+        stems = pd.Series(stems)
+        codes, uniques = pd.factorize(stems.astype(str))
+        if register:
+            self.register(uniques)
+        lookup = self.load().set_index('player_stem')['player_id']
+        looked_up = pd.Series(uniques).map(lookup)
+        if looked_up.isna().any():
+            raise ValueError(f"Unregistered players: {sorted(uniques[looked_up.isna().to_numpy()])[:10]}")
+        return pd.Series(looked_up.to_numpy(dtype='int32')[codes], index=stems.index)
+
+    def fpl_elements(self, seasons=None):
+        """FPL element id of every registered player with an FPL name: player_id, season, element."""
+        from fpl_index import get_fpl_index
+
+        index = get_fpl_index()
+        rows = []
+        named = self.load().dropna(subset=['fpl_name'])
+        for season in seasons or index.seasons():
+            for player_id, fpl_name in zip(named['player_id'], named['fpl_name']):
+                match = index.match(season, fpl_name)
+                if match is not None and not pd.isna(match['element']):
+                    rows.append({'player_id': player_id, 'season': season, 'element': int(match['element'])})
+        return pd.DataFrame(rows, columns=['player_id', 'season', 'element'])
+
+
+_registry = None
+
+
+def get_player_registry():
+    """Return the process-wide PlayerRegistry."""
+    global _registry
+    if _registry is None:
+        _registry = PlayerRegistry()
+    return _registry
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Show the entity registry or record a player manifest in it.')
+    parser.add_argument('--manifest', action='append', default=[], help='Player manifest CSV to register (repeatable)')
+    args = parser.parse_args(argv)
+
+    registry = get_player_registry()
+    if args.manifest:
+        from player_manifest import load_manifest
+        for path in args.manifest:
+            registry.register_manifest(load_manifest(path))
+            print(f"✓ Registered {path}")
+
+    players = registry.load()
+    print("=" * 70)
+    print("ENTITY REGISTRY")
+    print("=" * 70)
+    print(f"  Teams: {len(TEAMS)} ({len(_ALIASES)} aliases)")
+    print(f"  Players: {len(players)} ({players['code'].notna().sum()} with FBref codes, "
+          f"{players['fpl_name'].notna().sum()} with FPL names) -> {registry.path}")
+
+
+if __name__ == "__main__":
+    main()
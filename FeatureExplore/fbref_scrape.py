@@ -0,0 +1,289 @@
+"""
+Page fetch and data assembly helpers shared by the FBref scrape scripts.
+
+Every page goes through html_cache.fetch_html, so re-running a scrape only
+hits the network for pages that are missing or expired from the cache, and
+every network request uses the pooled client in http_client.
+"""
+
+from bs4 import BeautifulSoup
+import pandas as pd
+
+from entity_registry import TEAMS
+from fbref_tables import MATCHLOG_CATEGORIES, SCHEDULE_COLUMNS, matchlog_frame, parse_table, table_frame
+from fetch_scheduler import FetchScheduler
+from fpl_index import fbref_season, fpl_season, get_fpl_index
+from html_cache import fetch_html, get_cache
+from instrumentation import stage
+from player_schema import apply_schema
+
+
+# Site root of every page URL (benchmarks.py points it at a local stand-in server)
+FBREF_URL = 'https://fbref.com'
+
+SEASON_LIST = ('2023-2024', '2022-2023', '2021-2022', '2020-2021', '2019-2020', '2018-2019', '2017-2018')
+
+# Squads scraped in Team_Scrape.ipynb (from entity_registry.TEAMS): FBref squad
+# code, URL slug, name used in the 'Team' column of team_finaldat.csv, and the
+# Team_Data file
+SQUADS = [{'code': team['code'], 'slug': team['slug'], 'team': team['fbref'], 'filename': team['filename']}
+          for team in TEAMS]
+
+
+# ============================================================================
+# URLS
+# ============================================================================
+
+def matchlog_url(code, year_range, category, player):
+    """Player match-log page for one season and stats category ('' = summary)."""
+    base_url = FBREF_URL + '/en/players/{}/matchlogs/{}/c9/{}/{}-Match-Logs'
+    return base_url.format(code, year_range, category, player)
+
+
+def squad_schedule_url(code, year_range, team):
+    """Squad 'Scores & Fixtures' page for one Premier League season."""
+    base_url = FBREF_URL + '/en/squads/{}/{}/matchlogs/c9/schedule/{}-Scores-and-Fixtures-Premier-League'
+    return base_url.format(code, year_range, team)
+
+
+def squad_stats_url(code, year_range, team):
+    """Squad season stats page (Standard Stats table, one row per player)."""
+    return f'{FBREF_URL}/en/squads/{code}/{year_range}/{team}-Stats'
+
+
+def player_summary_url(code, player):
+    """Player overview page (career summary table)."""
+    return f'{FBREF_URL}/en/players/{code}/{player}'
+
+
+def league_stats_url(year):
+    """Premier League season stats page (final table)."""
+    return f'{FBREF_URL}/en/comps/9/{year}/{year}-Premier-League-Stats'
+
+
+# ============================================================================
+# PAGE GETTERS
+# ============================================================================
+
+def get_tbody(url):
+    """Fetch a page and return its first <tbody> (None if the page has no table)."""
+    with stage('page.fetch'):
+        html = fetch_html(url)
+    with stage('html.parse', bytes=len(html)):
+        soup = BeautifulSoup(html, 'lxml')
+        html_filtered = soup.find('tbody')
+    return(html_filtered)
+
+
+def get_url_final(code, year_range, category, player):
+    """Get HTML from FBref for a specific player, season, and category."""
+    return get_tbody(matchlog_url(code, year_range, category, player))
+
+
+def get_squad_url_final(code, year_range, team):
+    """Get HTML from FBref for a squad's fixtures in a given season (Team_Scrape.ipynb)."""
+    return get_tbody(squad_schedule_url(code, year_range, team))
+
+
+def get_premgames(code, player):
+    """Get total Premier League games played by a player."""
+    html = fetch_html(player_summary_url(code, player))
+    soup = BeautifulSoup(html, 'lxml')
+    summary = soup.find('table', class_='stats_table sortable min_width')
+    table = summary.find('tbody')
+
+    comp = table.find_all('td', attrs={'data-stat': 'comp_level'})
+    comp_text = [cell.get_text() for cell in comp]
+    games = table.find_all('td', attrs={'data-stat': 'games'})
+    games_text = [cell.get_text() for cell in games]
+    season = table.find_all('th', attrs={'data-stat': 'year_id'})
+    season_text  = [cell.get_text() for cell in season]
+
+    country = table.find_all('td', attrs={'data-stat': 'country'})
+    country_text = [cell.get_text() for cell in country]
+
+    df = pd.DataFrame({
+        'Season': season_text,
+        'Competition': comp_text,
+        'Games Played': games_text,
+        'Country': country_text
+    })
+
+    total_games = df[(df['Competition'] == '1. Premier League') & (df['Season'].isin(SEASON_LIST)) & (df['Country'] == 'eng ENG')]['Games Played']
+    total_games = pd.to_numeric(total_games)
+    prem_games = total_games.sum()
+    return(prem_games)
+
+
+def get_league_table(years=SEASON_LIST):
+    """Get the final Premier League table for each season (GeneralScrape.ipynb)."""
+    # Fetch every season through the rate-limited scheduler instead of sleeping between years
+    scheduler = FetchScheduler()
+    scheduler.submit_all(league_stats_url(year) for year in years)
+    scheduler.run()
+
+    finalpos = []
+    teamname = []
+    season = []
+
+    for year in years:
+        columns = parse_table(get_tbody(league_stats_url(year)))
+        finalpos.extend(columns['rank'])
+        teamname.extend(name.strip() for name in columns['team'])
+        season.extend([year] * len(columns['rank']))
+
+    leaguetable = pd.DataFrame({'Team': teamname, 'Position': finalpos, 'Season': season})
+    return(leaguetable)
+
+
+# ============================================================================
+# PLAYER DATA (from GeneralScrape.ipynb)
+# ============================================================================
+
+# Initialize column names for empty dataframes
+test = pd.DataFrame()  # This will be populated after first successful scrape
+column_names = None
+
+
+def get_data_final(code, year_range, player, fpl_name):
+    """
+    Scrape and compile all match data for a player in a given season.
+    Returns dataframe with 112 columns (correct schema).
+    """
+    global column_names
+
+    data_summary = get_url_final(code, year_range, '', player)
+
+    # If no data exists for this year, return empty dataframe
+    if not data_summary:
+        if column_names is not None:
+            empty = pd.DataFrame(columns = column_names)
+            return(empty)
+        else:
+            # First call and no data - return truly empty df
+            return pd.DataFrame()
+
+    # Fetch the remaining category pages and parse every table in one pass each
+    pages = {'': data_summary}
+    for category in MATCHLOG_CATEGORIES[1:]:
+        pages[category] = get_url_final(code, year_range, category, player)
+    finaldf = build_player_season(pages, year_range, fpl_name)
+
+    # Store column names for future empty dataframes
+    if column_names is None:
+        column_names = finaldf.columns
+
+    return finaldf
+
+
+def build_player_season(pages, year_range, fpl_name):
+    """
+    Typed player-season frame from its six category <tbody>s, merged with the
+    player's FPL gameweeks (the part of get_data_final after the fetches).
+    """
+    with stage('table.parse') as counters:
+        df = matchlog_frame(pages)
+
+        # Replace empty strings with zero
+        for column in df.columns:
+            df[column] = df[column].replace('',0)
+        counters['rows'] = len(df)
+
+    # Set compact data types (see player_schema.py)
+    df = apply_schema(df)
+
+    # Convert date column
+    df['Date'] = df['Date'].dt.date
+
+    with stage('fpl.merge') as counters:
+        # Merge with FPL data (indexed lookup, see fpl_index.py)
+        fpldf = get_fpl_index().gameweeks(fpl_season(year_range), fpl_name)
+
+        # Drop duplicate columns
+        fpldf = fpldf.drop(['assists', 'expected_assists', 'expected_goal_involvements', 'expected_goals', 'fixture',
+                            'goals_conceded', 'goals_scored', 'penalties_missed', 'penalties_saved', 'red_cards',
+                            'team_a_score', 'team_h_score', 'was_home', 'yellow_cards', 'element', 'opponent_team',
+                            'starts', 'expected_goals_conceded'], axis=1, errors='ignore')
+
+        # Convert kickoff time
+        fpldf['kickoff_time'] = pd.to_datetime(fpldf['kickoff_time'])
+        fpldf['kickoff_date'] = fpldf['kickoff_time'].dt.date
+
+        # Merge dataframes
+        finaldf = pd.merge(df, fpldf, left_on='Date', right_on='kickoff_date', how='inner')
+        counters['rows'] = len(finaldf)
+
+    # Type the FPL columns too; Date goes back from merge key to datetime
+    return apply_schema(finaldf)
+
+
+def get_active_years(fpl_name):
+    """Return the FBref seasons ('2023-2024', ...) in which a player has FPL data."""
+    return [fbref_season(year) for year in get_fpl_index().active_seasons(fpl_name)]
+
+
+def player_urls(code, player, fpl_name, checkgames):
+    """
+    List every page compile_dat will request for a player, as (url, key) pairs
+    where key is (player, season, category). The summary page used by
+    get_premgames is included so it counts against the same rate budget.
+    """
+    urls = []
+    for year in get_active_years(fpl_name):
+        for category in MATCHLOG_CATEGORIES:
+            urls.append((matchlog_url(code, year, category, player), (player, year, category)))
+    if checkgames:
+        urls.append((player_summary_url(code, player), (player, None, 'summary')))
+    return urls
+
+
+def compile_dat(code, player, fpl_name, checkgames, scheduler=None, prefetch=True):
+    """
+    Compile all seasons of data for a given player.
+    Returns dataframe with 112 columns (correct schema).
+
+    The player's pages are first fetched through `scheduler` (a one-worker
+    FetchScheduler at DEFAULT_RATE if None), so the caller's rate limit
+    applies. Pass prefetch=False when the caller has already fetched them.
+    """
+    # Find seasons where player was active
+    active_years = get_active_years(fpl_name)
+
+    # Fetch every page through the rate-limited scheduler instead of sleeping between seasons
+    if prefetch and not get_cache().offline:
+        scheduler = scheduler or FetchScheduler(workers=1)
+        scheduler.submit_all(player_urls(code, player, fpl_name, checkgames))
+        scheduler.run()
+
+    # Scrape data for each active season
+    dataframes = {}
+    for year in active_years:
+        dataframes[year] = get_data_final(code, year, player, fpl_name)
+
+    # Concatenate all seasons
+    with stage('player.concat') as counters:
+        finaldf = pd.concat(dataframes.values(), join = "inner", ignore_index = True)
+        counters['rows'] = len(finaldf)
+
+    # Optionally verify game count
+    if checkgames:
+        games_played = get_premgames(code, player)
+        if games_played == finaldf.shape[0]:
+            return finaldf
+        else:
+            print(f'Warning: {player} - Expected {games_played} games, got {finaldf.shape[0]} rows')
+            return finaldf
+    else:
+        return finaldf
+
+
+# ============================================================================
+# TEAM DATA (from Team_Scrape.ipynb)
+# ============================================================================
+
+def get_team_data(code, year_range, team):
+    """Scrape a squad's Premier League fixtures for one season."""
+    data_summary = get_squad_url_final(code, year_range, team)
+    if data_summary is None:
+        return pd.DataFrame(columns=[name for name, _ in SCHEDULE_COLUMNS])
+    return table_frame(data_summary, SCHEDULE_COLUMNS)
@@ -0,0 +1,242 @@
+"""
+Single-pass table extraction for FBref match-log and schedule pages.
+
+The original helpers (get_dat, get_date, get_matchweek) walk every <tr> of a
+<tbody> once per requested column, so building one player-season costs
+columns x rows x cells BeautifulSoup lookups. parse_table walks the rows once
+and collects every data-stat column at the same time; the old helpers are kept
+as thin wrappers over it so notebook code keeps working.
+"""
+
+import pandas as pd
+
+
+# ============================================================================
+# COLUMN MAPS (output column name -> FBref data-stat), in output order
+# ============================================================================
+
+MATCHLOG_COLUMNS = {
+    # Summary data
+    '': [
+        ('Date', 'date'),
+        ('Day', 'dayofweek'),
+        ('Matchweek', 'round'),
+        ('Venue', 'venue'),
+        ('Result', 'result'),
+        ('Team', 'team'),
+        ('Opponent', 'opponent'),
+        ('Start', 'game_started'),
+        ('Position', 'position'),
+        ('Minutes Played', 'minutes'),
+        ('Goals', 'goals'),
+        ('Assists', 'assists'),
+        ('Penalties Scored', 'pens_made'),
+        ('Penalties Attempted', 'pens_att'),
+        ('Shots', 'shots'),
+        ('Shots on Target', 'shots_on_target'),
+        ('Yellow Cards', 'cards_yellow'),
+        ('Red Cards', 'cards_red'),
+        ('Touches', 'touches'),
+        ('Tackles', 'tackles'),
+        ('Interceptions', 'interceptions'),
+        ('Blocks', 'blocks'),
+        ('xG', 'xg'),
+        ('npxG', 'npxg'),
+        ('xAG', 'xg_assist'),
+        ('Shot Creating Actions', 'sca'),
+        ('Goal Creating Actions', 'gca'),
+        ('Passes Completed', 'passes_completed'),
+        ('Passes Attempted', 'passes'),
+        ('Progressive Passes', 'progressive_passes'),
+        ('Carries', 'carries'),
+        ('Progressive Carries', 'progressive_carries'),
+        ('Take-ons Attempted', 'take_ons'),
+        ('Successful Take-ons', 'take_ons_won'),
+    ],
+    # Passing data
+    'passing': [
+        ('Passing Distance', 'passes_total_distance'),
+        ('Progressive Passing Distance', 'passes_progressive_distance'),
+        ('Short Passes Completed', 'passes_completed_short'),
+        ('Short Passes Attempted', 'passes_short'),
+        ('Medium Passes Completed', 'passes_completed_medium'),
+        ('Medium Passes Attempted', 'passes_medium'),
+        ('Long Passes Completed', 'passes_completed_long'),
+        ('Long Passes Attempted', 'passes_long'),
+        ('Expected Assists', 'pass_xa'),
+        ('Key Passes', 'assisted_shots'),
+        ('Passes into Final Third', 'passes_into_final_third'),
+        ('Passes into Penalty Area', 'passes_into_penalty_area'),
+        ('Crosses into Penalty Area', 'crosses_into_penalty_area'),
+    ],
+    # Passing types data
+    'passing_types': [
+        ('Live Pass', 'passes_live'),
+        ('Dead Pass', 'passes_dead'),
+        ('Free Kick Pass', 'passes_free_kicks'),
+        ('Through Balls', 'through_balls'),
+        ('Switches', 'passes_switches'),
+        ('Crosses', 'crosses'),
+        ('Throw Ins Taken', 'throw_ins'),
+        ('Corners Taken', 'corner_kicks'),
+        ('Passes Offside', 'passes_offsides'),
+    ],
+    # GCA data
+    'gca': [
+        ('Live SCA', 'sca_passes_live'),
+        ('Deadball SCA', 'sca_passes_dead'),
+        ('Take-on SCA', 'sca_take_ons'),
+        ('Shot SCA', 'sca_shots'),
+        ('Foul SCA', 'sca_fouled'),
+        ('Defense SCA', 'sca_defense'),
+        ('Live GCA', 'gca_passes_live'),
+        ('Deadball GCA', 'gca_passes_dead'),
+        ('Take-on GCA', 'gca_take_ons'),
+        ('Shot GCA', 'gca_shots'),
+        ('Foul GCA', 'gca_fouled'),
+        ('Defense GCA', 'gca_defense'),
+    ],
+    # Defensive data
+    'defense': [
+        ('Tackles Won', 'tackles_won'),
+        ('Defensive Third Tackles', 'tackles_def_3rd'),
+        ('Middle Third Tackles', 'tackles_mid_3rd'),
+        ('Attacking Third Tackles', 'tackles_att_3rd'),
+        ('Dribblers Tackled', 'challenge_tackles'),
+        ('Dribblers Tackled Attempts', 'challenges'),
+        ('Challenges Lost', 'challenges_lost'),
+        ('Shots Blocked', 'blocked_shots'),
+        ('Passes Blocked', 'blocked_passes'),
+        ('Clearances', 'clearances'),
+        ('Defensive Errors', 'errors'),
+    ],
+    # Possession data
+    'possession': [
+        ('Defensive Penalty Area Touches', 'touches_def_pen_area'),
+        ('Defensive Third Touches', 'touches_def_3rd'),
+        ('Middle Third Touches', 'touches_mid_3rd'),
+        ('Attacking Third Touches', 'touches_att_3rd'),
+        ('Penalty Area Touches', 'touches_att_pen_area'),
+        ('Carry Distance', 'carries_distance'),
+        ('Progressive Carry Distance', 'carries_progressive_distance'),
+        ('Final Third Carries', 'carries_into_final_third'),
+        ('Carries into Penalty Area', 'carries_into_penalty_area'),
+        ('Miscontrols', 'miscontrols'),
+        ('Dispossessed', 'dispossessed'),
+        ('Passes Received', 'passes_received'),
+        ('Progressive Passes Received', 'progressive_passes_received'),
+    ],
+}
+
+# Category order used by get_data_final (summary page first)
+MATCHLOG_CATEGORIES = tuple(MATCHLOG_COLUMNS)
+
+# Squad "Scores & Fixtures" page (Team_Scrape.ipynb)
+SCHEDULE_COLUMNS = [
+    ('Date', 'date'),
+    ('Time', 'start_time'),
+    ('Matchweek', 'round'),
+    ('Day', 'dayofweek'),
+    ('Venue', 'venue'),
+    ('Result', 'result'),
+    ('Goals Scored', 'goals_for'),
+    ('Goals Conceded', 'goals_against'),
+    ('Opponent', 'opponent'),
+    ('xG', 'xg_for'),
+    ('xGA', 'xg_against'),
+    ('Possession', 'possession'),
+    ('Attendance', 'attendance'),
+    ('Captain', 'captain'),
+    ('Formation', 'formation'),
+    ('Opposition Formation', 'opp_formation'),
+    ('Referee', 'referee'),
+]
+
+
+# ============================================================================
+# SINGLE-PASS PARSER
+# ============================================================================
+
+def parse_table(dat):
+    """
+    Walk a <tbody> once and return {data-stat: [cell text, ...]}.
+
+    Like get_dat, only rows without attributes are kept (FBref marks spacer and
+    repeated header rows with a class). Both <th> and <td> cells are collected,
+    so 'date' (a <th>) comes back alongside the <td> stats. A cell missing from
+    a row is recorded as '' so every column has one entry per kept row.
+    """
+    columns = {}
+    n_rows = 0
+    for row in dat.find_all('tr'):
+        if row.attrs:
+            continue
+        for cell in row.children:
+            if cell.name != 'th' and cell.name != 'td':
+                continue
+            stat = cell.get('data-stat')
+            if stat is None:
+                continue
+            coldat = columns.get(stat)
+            if coldat is None:
+                coldat = columns[stat] = [''] * n_rows
+            coldat.append(cell.get_text())
+        n_rows += 1
+        for coldat in columns.values():
+            if len(coldat) < n_rows:
+                coldat.append('')
+    return columns
+
+
+def clean_matchweek(values):
+    """Strip the 'Matchweek ' prefix from FBref round labels."""
+    return [value.replace('Matchweek ', '') for value in values]
+
+
+def table_frame(dat, columns, parsed=None):
+    """
+    Build a string-valued DataFrame from a <tbody> using a column map.
+
+    columns is a list of (output name, data-stat) pairs such as
+    MATCHLOG_COLUMNS['passing']. Pass parsed to reuse an existing parse_table
+    result instead of walking the table again.
+    """
+    if parsed is None:
+        parsed = parse_table(dat)
+    frame = {}
+    for name, stat in columns:
+        coldat = parsed[stat]
+        if stat == 'round':
+            coldat = clean_matchweek(coldat)
+        frame[name] = coldat
+    return pd.DataFrame(frame)
+
+
+def matchlog_frame(pages):
+    """
+    Combine the six match-log category pages of one player-season.
+
+    pages maps each category in MATCHLOG_CATEGORIES to its <tbody>. Columns come
+    back in the same order get_data_final has always produced.
+    """
+    frames = [table_frame(pages[category], MATCHLOG_COLUMNS[category]) for category in MATCHLOG_CATEGORIES]
+    return pd.concat(frames, axis=1)
+
+
+# ============================================================================
+# COMPATIBILITY WRAPPERS (same behaviour as the notebook helpers)
+# ============================================================================
+
+def get_dat(dat, col):
+    """Extract column data from table rows."""
+    return parse_table(dat)[col]
+
+
+def get_date(dat, col):
+    """Extract date column from table headers."""
+    return parse_table(dat)[col]
+
+
+def get_matchweek(dat, col):
+    """Extract and clean matchweek column."""
+    return clean_matchweek(parse_table(dat)[col])
@@ -0,0 +1,188 @@
+"""
+Batch FDR imputation for seasons without official FPL difficulty ratings.
+
+The FDR model (ordinal LogisticIT on the opponent's home/away rolling form,
+trained in FDR /FDR_Imputation_Model.ipynb) was only ever applied inside the
+notebook: unpickle the model, loop over 2017-18 team matches one row at a
+time, and write fixtures_2017-18_predicted.csv.
+
+FdrPredictor loads the model, scaler and metadata once (get_predictor keeps
+one per process) and scores any number of matches in one scaler.transform
+and one model.predict call. Opponent form comes from rolling_form, and is
+attached with fpl_fixtures.opponent_form, the same code the notebook
+trains on:
+
+    predictor = get_predictor()
+    long = predictor.predict_matches(read_team_csv(), seasons=['2017-18'])
+    fixtures = fixtures_format(long)      # event, team_h, team_a, team_h_difficulty, team_a_difficulty
+
+The calibrated model files carry 'thresholds' in their metadata; with
+calibrated=True the expected FDR (class probabilities x labels) is cut at
+those thresholds instead of taking the model's argmax.
+
+Usage (from the repo root):
+    python FeatureExplore/fdr_predictor.py --season 2017-18
+    python FeatureExplore/fdr_predictor.py --season 2017-18 --calibrated --output fdr_2017-18.csv
+"""
+
+import argparse
+import os
+
+import joblib
+import numpy as np
+
+from dataset_store import season_labels
+from entity_registry import team_ids, team_names
+from fpl_fixtures import opponent_form
+from player_schema import read_team_csv
+from rolling_form import TEAM_METRICS, team_form
+
+
+FDR_DIR = 'FDR '
+MODEL_FILES = {
+    False: ('fdr_model.pkl', 'fdr_scaler.pkl', 'fdr_model_meta.pkl'),
+    True: ('fdr_model_calibrated.pkl', 'fdr_scaler_calibrated.pkl', 'fdr_model_meta_calibrated.pkl'),
+}
+
+# Rolling window per approach, as trained in FDR_Imputation_Model.ipynb
+APPROACH_WINDOWS = {'baseline': 5, 'homeaway': 6}
+
+
+# ============================================================================
+# PREDICTOR
+# ============================================================================
+
+class FdrPredictor:
+    """A loaded FDR model, scaler and metadata, scoring matches in batches."""
+
+    def __init__(self, model, scaler, meta):
+        self.model = model
+        self.scaler = scaler
+        self.meta = meta
+        self.feature_cols = list(meta['feature_cols'])
+        self.context = meta.get('approach') == 'homeaway'
+        self.window = APPROACH_WINDOWS[meta.get('approach', 'homeaway')]
+        self.thresholds = meta.get('thresholds')
+
+    @classmethod
+    def load(cls, model_dir=FDR_DIR, calibrated=False):
+        """Unpickle the model files (needs mord installed)."""
+        model_file, scaler_file, meta_file = MODEL_FILES[calibrated]
+        return cls(joblib.load(os.path.join(model_dir, model_file)),
+                   joblib.load(os.path.join(model_dir, scaler_file)),
+                   joblib.load(os.path.join(model_dir, meta_file)))
+
+    @property
+    def metrics(self):
+        """Rolling metric names behind the opp_rolling_* feature columns."""
+        return [c[len('opp_'):] for c in self.feature_cols if c.startswith('opp_')]
+
+    def team_matches(self, team_df):
+        """
+        Long table of team matches (Season, Gameweek, Date, Team, Opponent,
+        Venue, is_home) in model team names, plus the teams' rolling form.
+        """
+        team_df = team_df.assign(Season=season_labels(team_df['Date']),
+                                 Team_FPL=team_names(team_ids(team_df['Team']), 'model'),
+                                 Opponent=team_names(team_ids(team_df['Opponent']), 'model'),
+                                 Venue=team_df['Venue'].astype(str))
+        rolling = team_form(team_df, windows=(self.window,), venue=self.context)
+        prefixes = ('home_', 'away_') if self.context else ('',)
+        rolling = rolling.rename(columns={f'{p}rolling{self.window}_{name}': f'{p}rolling_{name}'
+                                          for p in prefixes for name in TEAM_METRICS})
+        matches = rolling[['Season', 'Matchweek', 'Date', 'Team_FPL', 'Opponent', 'Venue']].rename(
+            columns={'Matchweek': 'Gameweek', 'Team_FPL': 'Team'})
+        return matches.assign(is_home=matches['Venue'] == 'Home'), rolling
+
+    def features(self, matches, rolling):
+        """Attach the opponent's form to each match and build the model's feature columns."""
+        form = opponent_form(matches, rolling, self.metrics, context=self.context)
+        return form.assign(is_away=(~form['is_home']).astype(int))
+
+    def predict(self, features):
+        """Predicted FDR for every row of a feature frame, in one vectorized call."""
+        X = self.scaler.transform(features[self.feature_cols])
+        if self.thresholds is None:
+            return np.asarray(self.model.predict(X)).astype(int)
+        classes = np.asarray(self.model.classes_)
+        expected = self.model.predict_proba(X) @ classes
+        return classes[np.searchsorted(self.thresholds, expected)].astype(int)
+
+    def predict_matches(self, team_df, seasons=None):
+        """Predicted FDR for every team match (in the given seasons) with opponent form."""
+        matches, rolling = self.team_matches(team_df)
+        if seasons is not None:
+            matches = matches[matches['Season'].isin(seasons)]
+        features = self.features(matches, rolling)
+        return features.assign(predicted_FDR=self.predict(features) if len(features) else [])
+
+
+def fixtures_format(predictions):
+    """
+    One row per fixture (event, team_h, team_a, team_h_difficulty,
+    team_a_difficulty) from the per-team predictions, like FPL fixtures.csv.
+    A fixture whose away side has no prediction reuses the home prediction.
+    """
+    home = predictions[predictions['Venue'] == 'Home']
+    away = predictions[predictions['Venue'] == 'Away'][['Gameweek', 'Team', 'Opponent', 'predicted_FDR']]
+    away = away.drop_duplicates(['Gameweek', 'Team', 'Opponent'])
+    fixtures = home.merge(away.rename(columns={'Team': 'Opponent', 'Opponent': 'Team',
+                                               'predicted_FDR': 'team_a_difficulty'}),
+                          on=['Gameweek', 'Team', 'Opponent'], how='left')
+    fixtures = fixtures.drop_duplicates(['Gameweek', 'Team', 'Opponent'])
+    fixtures['team_a_difficulty'] = fixtures['team_a_difficulty'].fillna(fixtures['predicted_FDR']).astype(int)
+    fixtures = fixtures.rename(columns={'Gameweek': 'event', 'Team': 'team_h', 'Opponent': 'team_a',
+                                        'predicted_FDR': 'team_h_difficulty'})
+    fixtures['event'] = fixtures['event'].astype(int)
+    columns = ['event', 'team_h', 'team_a', 'team_h_difficulty', 'team_a_difficulty']
+    return fixtures[columns].sort_values('event', kind='stable').reset_index(drop=True)
+
+
+_predictors = {}
+
+
+def get_predictor(model_dir=FDR_DIR, calibrated=False):
+    """Return a loaded FdrPredictor, unpickling the model files once per process."""
+    key = (model_dir, calibrated)
+    if key not in _predictors:
+        _predictors[key] = FdrPredictor.load(model_dir, calibrated)
+    return _predictors[key]
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Predict FDR for every fixture of a season.')
+    parser.add_argument('--season', required=True, help="FPL season label, e.g. '2017-18'")
+    parser.add_argument('--team-data', default='team_finaldat.csv', help='Team match data (default: team_finaldat.csv)')
+    parser.add_argument('--model-dir', default=FDR_DIR, help=f"Directory with the model files (default: '{FDR_DIR}')")
+    parser.add_argument('--calibrated', action='store_true', help='Use the threshold-calibrated model')
+    parser.add_argument('--output', default=None,
+                        help="Output CSV (default: '<model-dir>/fixtures_<season>_predicted.csv')")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    predictor = get_predictor(args.model_dir, args.calibrated)
+    predictions = predictor.predict_matches(read_team_csv(args.team_data), seasons=[args.season])
+    if predictions.empty:
+        print(f"No {args.season} matches with opponent form in {args.team_data}")
+        return
+
+    fixtures = fixtures_format(predictions)
+    output = args.output or os.path.join(args.model_dir, f'fixtures_{args.season}_predicted.csv')
+    fixtures.to_csv(output, index=False)
+
+    print(f"✓ Predicted FDR for {len(predictions)} team matches ({predictor.meta['model_type']}, "
+          f"{'calibrated' if args.calibrated else 'uncalibrated'})")
+    print(f"✓ Generated {len(fixtures)} fixtures for {args.season}")
+    print(f"✓ Saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Materialized player-match feature table (player + team context + FDR).
+
+FormFixtures.ipynb rebuilt merged_df on every run: concatenate def/att
+finaldat, merge team_finaldat, drop the duplicated _team columns, harmonize
+team names, match the 2017-18 predicted FDR to dates row by row, merge the
+observed FDR and derive Season with a row-wise apply. build_features does the
+same steps with vectorized merges on entity_registry integer ids and writes
+the result as one Parquet file in feature_store/.
+
+Each build is keyed by the content hash of its inputs (the compiled player
+files, team_finaldat.csv, the 2017-18 FDR predictions, the observed FDR
+table) and FEATURE_VERSION, the version of the build logic. load_features
+only rebuilds when that key changes: unchanged inputs are recognized by
+mtime/size without re-hashing, so loading the cached table is a single
+Parquet read. The last KEEP_BUILDS builds are kept next to manifest.json.
+
+Usage:
+    from feature_store import load_features
+    merged_df = load_features()
+
+    python FeatureExplore/feature_store.py             # build if inputs changed
+    python FeatureExplore/feature_store.py --rebuild
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+
+import pandas as pd
+
+from dataset_store import season_labels
+from entity_registry import team_ids, team_names
+from fpl_fixtures import FPL_DATA_DIR, load_observed_fdr
+from instrumentation import stage
+from player_schema import CATEGORY, PLAYER_SCHEMA, TEAM_SCHEMA, apply_schema, memory_mb, read_team_csv
+
+
+FEATURE_STORE_DIR = 'feature_store'
+FEATURE_VERSION = 4
+KEEP_BUILDS = 3
+
+PLAYER_INPUTS = ('def_finaldat', 'att_finaldat')
+TEAM_INPUT = 'team_finaldat.csv'
+PREDICTED_FDR_INPUT = 'FDR /fixtures_2017-18_predicted.csv'
+PREDICTED_SEASON = '2017-18'
+
+# Team columns already present in the player data
+DUPLICATE_TEAM_COLUMNS = ['Matchweek_team', 'Day_team', 'Venue_team', 'Opponent_team', 'Result_team']
+
+FEATURE_SCHEMA = {
+    **PLAYER_SCHEMA,
+    **{column: dtype for column, dtype in TEAM_SCHEMA.items() if column not in PLAYER_SCHEMA},
+    'xG_team': 'float32',
+    'Player ID': 'int32',
+    'player_stem': CATEGORY,
+    'team_id': 'int16',
+    'opponent_id': 'int16',
+    'FDR': 'int8',
+    'Season': CATEGORY,
+}
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def player_input_paths():
+    """Compiled player files, preferring Parquet over CSV."""
+    paths = []
+    for name in PLAYER_INPUTS:
+        for path in (f'{name}.parquet', f'{name}.csv'):
+            if os.path.exists(path):
+                paths.append(path)
+                break
+        else:
+            raise FileNotFoundError(f"{name}.parquet/.csv not found; run "
+                                    f"python FeatureExplore/compile_defender_data.py --role all")
+    return paths
+
+
+def read_players(paths):
+    """Concatenate the compiled player files (def first, as in FormFixtures)."""
+    frames = []
+    for path in paths:
+        df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+        frames.append(df.drop(columns=[c for c in df.columns if str(c).startswith('Unnamed')]))
+    return pd.concat(frames, axis=0, ignore_index=True)
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def input_hashes(paths, state):
+    """sha256 per input file, reusing state entries whose mtime and size are unchanged."""
+    hashes = {}
+    for path in paths:
+        stat = os.stat(path)
+        entry = state.get(path)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            hashes[path] = entry
+        else:
+            hashes[path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': _sha256_file(path)}
+    return hashes
+
+
+def _frame_hash(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _team_keys(df, errors='raise'):
+    """df with team_id / opponent_id (entity_registry) for its Team and Opponent names."""
+    return df.assign(team_id=team_ids(df['Team'], errors), opponent_id=team_ids(df['Opponent'], errors))
+
+
+def predicted_fdr(team_df, predictions):
+    """
+    Date every predicted 2017-18 fixture from team_finaldat.
+
+    As in FormFixtures, a team's row takes team_h_difficulty from the fixture
+    where it was the home side against that opponent, and team_a_difficulty
+    from the reverse fixture only when no such home fixture exists.
+    """
+    matches = team_df.loc[team_df['Season'] == PREDICTED_SEASON, ['Date', 'team_id', 'opponent_id']]
+    fixtures = predictions.assign(home_id=team_ids(predictions['team_h']), away_id=team_ids(predictions['team_a']))
+    fixtures = fixtures.drop_duplicates(['home_id', 'away_id'])
+    as_home = fixtures.rename(columns={'home_id': 'team_id', 'away_id': 'opponent_id', 'team_h_difficulty': 'home_FDR'})
+    as_away = fixtures.rename(columns={'away_id': 'team_id', 'home_id': 'opponent_id', 'team_a_difficulty': 'away_FDR'})
+    keys = ['team_id', 'opponent_id']
+    matches = matches.merge(as_home[keys + ['home_FDR']], on=keys, how='left')
+    matches = matches.merge(as_away[keys + ['away_FDR']], on=keys, how='left')
+    matches['FDR'] = matches['home_FDR'].fillna(matches['away_FDR'])
+    return matches.dropna(subset=['FDR'])[['Date', 'team_id', 'opponent_id', 'FDR']]
+
+
+def build_features(player_paths, team_path=TEAM_INPUT, predicted_path=PREDICTED_FDR_INPUT, observed=None):
+    """
+    Return the merged player-match feature table.
+
+    Every merge joins on Date plus entity_registry ids ('Player ID', the
+    int32 player id of the compiled files, team_id and opponent_id), which
+    are kept as columns; Team and Opponent are the FPL names of those ids.
+    """
+    with stage('features.read') as counters:
+        players = _team_keys(read_players(player_paths))
+        team_df = read_team_csv(team_path)
+        team_df = team_df.drop(columns=[c for c in team_df.columns if str(c).startswith('Unnamed')])
+        team_df = _team_keys(team_df)
+        players['Date'] = players['Date'].astype('datetime64[ns]')
+        team_df['Date'] = team_df['Date'].astype('datetime64[ns]')
+        counters.update(rows=len(players), team_rows=len(team_df))
+
+    # Team context for each player match
+    with stage('features.team_merge') as counters:
+        merged = players.merge(team_df.drop(columns=['Team', 'opponent_id']), on=['Date', 'team_id'], how='left',
+                               suffixes=('', '_team'))
+        merged = merged.drop(columns=DUPLICATE_TEAM_COLUMNS + ['season'], errors='ignore')
+        merged['Team'] = team_names(merged['team_id'])
+        merged['Opponent'] = team_names(merged['opponent_id'])
+        merged['Season'] = season_labels(merged['Date'])
+        counters['rows'] = len(merged)
+
+    # FDR: predictions for 2017-18, observed FPL difficulty afterwards
+    with stage('features.fdr_merge') as counters:
+        team_df['Season'] = season_labels(team_df['Date'])
+        fdr_sources = []
+        if predicted_path and os.path.exists(predicted_path):
+            fdr_sources.append(predicted_fdr(team_df, pd.read_csv(predicted_path)))
+        if observed is None:
+            observed = load_observed_fdr()
+        if len(observed):
+            observed = _team_keys(observed, errors='warn').dropna(subset=['team_id', 'opponent_id'])
+            fdr_sources.append(observed[['Date', 'team_id', 'opponent_id', 'FDR']])
+        else:
+            warnings.warn(f"No observed FDR: no fixtures found under {FPL_DATA_DIR} (is the vaastav "
+                          f"Fantasy-Premier-League checkout missing?); FDR is set only where "
+                          f"{predicted_path} has predictions")
+        keys = ['Date', 'team_id', 'opponent_id']
+        if fdr_sources:
+            all_fdr = pd.concat(fdr_sources, ignore_index=True).astype({'team_id': 'int16', 'opponent_id': 'int16'})
+            all_fdr['Date'] = pd.to_datetime(all_fdr['Date']).dt.normalize().astype(merged['Date'].dtype)
+            all_fdr = all_fdr.drop_duplicates(subset=keys)
+            merged = merged.merge(all_fdr, on=keys, how='left')
+        else:
+            merged['FDR'] = float('nan')
+        counters['rows'] = len(merged)
+
+    return apply_schema(merged, FEATURE_SCHEMA)
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+def _load_manifest(store_dir):
+    path = os.path.join(store_dir, 'manifest.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'current': None, 'builds': [], 'inputs': {}}
+
+
+def current_key(store_dir=FEATURE_STORE_DIR, observed=None):
+    """Return (build key, input entries, observed FDR) for the inputs as they are now."""
+    manifest = _load_manifest(store_dir)
+    files = player_input_paths() + [p for p in (TEAM_INPUT, PREDICTED_FDR_INPUT) if os.path.exists(p)]
+    inputs = input_hashes(files, manifest.get('inputs', {}))
+    if observed is None:
+        observed = load_observed_fdr()
+    parts = [f'version={FEATURE_VERSION}'] + [f"{path}={inputs[path]['sha256']}" for path in files]
+    parts.append(f'observed_fdr={_frame_hash(observed)}')
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:16], inputs, observed
+
+
+def materialize(store_dir=FEATURE_STORE_DIR, rebuild=False):
+    """Build the feature table if its inputs changed. Returns (path, built)."""
+    manifest = _load_manifest(store_dir)
+    key, inputs, observed = current_key(store_dir)
+    path = os.path.join(store_dir, f'features_{key}.parquet')
+    built = rebuild or manifest.get('current') != key or not os.path.exists(path)
+    if built:
+        start = time.time()
+        features = build_features([p for p in inputs if os.path.basename(p).startswith(PLAYER_INPUTS)],
+                                  observed=observed)
+        os.makedirs(store_dir, exist_ok=True)
+        with stage('features.write', rows=len(features)) as counters:
+            features.to_parquet(f'{path}.tmp', index=False)
+            os.replace(f'{path}.tmp', path)
+            counters['bytes'] = os.path.getsize(path)
+        builds = [b for b in manifest.get('builds', []) if b['key'] != key]
+        builds.insert(0, {'key': key, 'file': os.path.basename(path), 'version': FEATURE_VERSION,
+                          'rows': len(features), 'columns': len(features.columns),
+                          'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                          'build_seconds': round(time.time() - start, 1),
+                          'memory_mb': round(memory_mb(features), 1)})
+        for old in builds[KEEP_BUILDS:]:
+            old_path = os.path.join(store_dir, old['file'])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        manifest['builds'] = builds[:KEEP_BUILDS]
+    manifest['current'] = key
+    manifest['inputs'] = inputs
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, 'manifest.json.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(store_dir, 'manifest.json.tmp'), os.path.join(store_dir, 'manifest.json'))
+    return path, built
+
+
+def load_features(columns=None, store_dir=FEATURE_STORE_DIR, check_inputs=True):
+    """
+    Load the feature table, rebuilding it first if its inputs changed.
+
+    With check_inputs=False the current build is read without looking at the
+    inputs at all.
+    """
+    if check_inputs:
+        path, _ = materialize(store_dir)
+    else:
+        manifest = _load_manifest(store_dir)
+        if manifest.get('current') is None:
+            path, _ = materialize(store_dir)
+        else:
+            path = os.path.join(store_dir, f"features_{manifest['current']}.parquet")
+    return pd.read_parquet(path, columns=columns)
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Build the merged player-match feature table.')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild even if the inputs are unchanged')
+    parser.add_argument('--store-dir', default=FEATURE_STORE_DIR, help=f'Output directory (default: {FEATURE_STORE_DIR})')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    path, built = materialize(args.store_dir, rebuild=args.rebuild)
+    build = _load_manifest(args.store_dir)['builds'][0]
+    print("=" * 70)
+    print(f"FEATURE TABLE {'BUILT' if built else 'UP TO DATE'} ({time.time() - start:.1f}s)")
+    print("=" * 70)
+    print(f"  File: {path}")
+    print(f"  Shape: {build['rows']:,} rows x {build['columns']} columns ({build['memory_mb']} MB in memory)")
+    print(f"  Built: {build['built_at']} (feature version {build['version']})")
+
+
+if __name__ == "__main__":
+    main()
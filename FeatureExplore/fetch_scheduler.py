@@ -0,0 +1,200 @@
+"""
+Rate-limited concurrent fetcher that warms the HTML cache.
+
+compile_dat used to fetch six category pages per season one after another and
+then sleep for 60 seconds, with the get_premgames request on top of that. The
+scheduler instead takes a queue of every pending URL and keeps a few worker
+threads busy while a global token bucket holds the request rate at the
+allowed level:
+
+- TokenBucket limits requests per second across all workers
+- a semaphore per host caps concurrent connections to the same site
+- 429 and 5xx responses are retried with exponential backoff (Retry-After is
+  honoured and also pauses the whole bucket)
+- pages already fresh in the cache are skipped without spending a token
+
+Requests go through the shared pooled HttpClient with conditional headers,
+and successful pages (or 304 revalidations) are written to the HTML cache, so
+the parse step afterwards never touches the network. Point it at a local
+http.server to test.
+"""
+
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from html_cache import get_cache
+from http_client import DEFAULT_TIMEOUT, conditional_headers, http_get
+
+
+# FBref asks bots to stay under 20 requests per minute; stay well below it
+DEFAULT_RATE = 10 / 60          # requests per second
+DEFAULT_BURST = 1
+DEFAULT_WORKERS = 4
+DEFAULT_PER_HOST = 2
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 5.0           # seconds, doubled on each retry
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` saved up."""
+
+    def __init__(self, rate, capacity=DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now > self.updated:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.updated - now, 0) + (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (used when the server says slow down)."""
+        with self.lock:
+            self.tokens = 0
+            self.updated = max(self.updated, time.monotonic() + seconds)
+
+
+def retry_delay(attempt, backoff=DEFAULT_BACKOFF, retry_after=None):
+    """Seconds to wait before retry number `attempt` (1-based)."""
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.1)
+
+
+class FetchScheduler:
+    """Queue of URLs fetched by a thread pool under a global rate limit."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, workers=DEFAULT_WORKERS,
+                 per_host=DEFAULT_PER_HOST, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT, cache=None, get=None):
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = workers
+        self.per_host = per_host
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.get = get or http_get
+        self.pending = queue.Queue()
+        self.results = {}
+        self.host_slots = {}
+        self.lock = threading.Lock()
+        self.requests_made = 0
+
+    def submit(self, url, key=None):
+        """Queue a URL. `key` (e.g. (player, season, category)) is kept with the result."""
+        self.pending.put((url, key))
+
+    def submit_all(self, urls):
+        """Queue (url, key) pairs or bare URLs."""
+        for item in urls:
+            if isinstance(item, str):
+                self.submit(item)
+            else:
+                self.submit(*item)
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = self.host_slots[host] = threading.BoundedSemaphore(self.per_host)
+        return slot
+
+    def _fetch(self, url, key):
+        cache = self.cache or get_cache()
+        entry = cache.entry(url)
+        stored = entry is not None and cache.read(entry) is not None
+        if stored and cache.is_fresh(entry):
+            return {'url': url, 'key': key, 'status': 'cached', 'attempts': 0, 'bytes': 0}
+        # Revalidate only when the stored page can be served on a 304; otherwise fetch it in full
+        if not stored:
+            entry = None
+        headers = conditional_headers(entry)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self.bucket.acquire()
+            try:
+                with self._host_slot(url):
+                    response = self.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                status, retry_after, error = None, None, str(e)
+            else:
+                status, retry_after, error = response.status_code, response.headers.get('Retry-After'), None
+            finally:
+                with self.lock:
+                    self.requests_made += 1
+
+            if status in (200, 304):
+                if cache.put_response(url, response, entry) is None:
+                    # A 304 with no stored page to refresh leaves nothing in the cache
+                    return {'url': url, 'key': key, 'status': status, 'attempts': attempt, 'bytes': 0,
+                            'error': f'HTTP {status} without a cached page'}
+                return {'url': url, 'key': key, 'status': status, 'attempts': attempt,
+                        'bytes': len(response.content)}
+
+            if (status is None or status in RETRY_STATUSES) and attempt <= self.max_retries:
+                delay = retry_delay(attempt, self.backoff, retry_after)
+                if status == 429:
+                    self.bucket.pause(delay)
+                time.sleep(delay)
+                continue
+
+            return {'url': url, 'key': key, 'status': status, 'attempts': attempt, 'bytes': 0,
+                    'error': error or f'HTTP {status}'}
+
+    def _worker(self):
+        while True:
+            try:
+                url, key = self.pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = self._fetch(url, key)
+            except Exception as e:
+                result = {'url': url, 'key': key, 'status': None, 'attempts': 0, 'bytes': 0, 'error': str(e)}
+            with self.lock:
+                self.results[url] = result
+            self.pending.task_done()
+
+    def run(self):
+        """Fetch everything in the queue and return {url: result}."""
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.results
+
+    def summary(self):
+        """Counts of fetched, revalidated, cached and failed URLs."""
+        fetched = sum(1 for r in self.results.values() if r['status'] == 200 and 'error' not in r)
+        revalidated = sum(1 for r in self.results.values() if r['status'] == 304 and 'error' not in r)
+        cached = sum(1 for r in self.results.values() if r['status'] == 'cached')
+        failed = [r for r in self.results.values() if 'error' in r]
+        return {'fetched': fetched, 'revalidated': revalidated, 'cached': cached, 'failed': len(failed),
+                'requests': self.requests_made, 'failures': failed}
@@ -0,0 +1,194 @@
+"""
+Observed FPL fixture difficulty (FDR) in long format, shared by the notebooks.
+
+FormFixtures.ipynb ("Create observed FDR lookup") and FDR_Imputation_Model.ipynb
+(create_training_data_*) each loaded every season's fixtures.csv and teams.csv
+and then walked the fixtures with iterrows, mapping team ids through a dict
+and calling pd.to_datetime once per row.
+
+observed_fdr builds the same lookup with two merges and a concat: one row
+per team per fixture,
+
+    Season, Gameweek, Date, Team, Opponent, Venue, is_home, FDR
+
+where Date is the naive (UTC) kickoff time. load_observed_fdr caches the
+result in .fpl_index/observed_fdr.parquet and rebuilds it only when a
+season's fixtures.csv or teams.csv changes. opponent_form attaches each
+opponent's latest rolling team metrics with merge_asof, replacing the
+per-fixture filter-and-sort in create_training_data_*.
+
+Usage (notebooks add FeatureExplore to sys.path):
+    from fpl_fixtures import load_observed_fdr
+    observed_fdr_df = load_observed_fdr()
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from entity_registry import team_ids
+from fpl_index import FPL_DATA_DIR, INDEX_DIR, SEASON_DIR_PATTERN
+
+
+FIRST_OBSERVED_SEASON = '2018-19'
+FDR_COLUMNS = ['Season', 'Gameweek', 'Date', 'Team', 'Opponent', 'Venue', 'is_home', 'FDR']
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def _season_dirs(data_dir, first_season):
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(entry.name for entry in os.scandir(data_dir)
+                  if entry.is_dir() and SEASON_DIR_PATTERN.match(entry.name) and entry.name >= first_season)
+
+
+def load_teams(season_dir):
+    """Team id -> name for one season, from teams.csv or (older seasons) raw.json."""
+    teams_file = os.path.join(season_dir, 'teams.csv')
+    if os.path.exists(teams_file):
+        return pd.read_csv(teams_file, usecols=['id', 'name'])
+    raw_file = os.path.join(season_dir, 'raw.json')
+    if os.path.exists(raw_file):
+        with open(raw_file) as f:
+            teams = json.load(f).get('teams', [])
+        return pd.DataFrame([{'id': t['id'], 'name': t['name']} for t in teams], columns=['id', 'name'])
+    return pd.DataFrame(columns=['id', 'name'])
+
+
+def load_fixtures(data_dir=FPL_DATA_DIR, first_season=FIRST_OBSERVED_SEASON):
+    """
+    Every season's fixtures.csv with a Season column, plus the matching teams
+    (Season, id, name). Each file is read once.
+    """
+    fixtures, teams = [], []
+    for season in _season_dirs(data_dir, first_season):
+        season_dir = os.path.join(data_dir, season)
+        fixtures_file = os.path.join(season_dir, 'fixtures.csv')
+        if os.path.exists(fixtures_file):
+            fixtures.append(pd.read_csv(fixtures_file).assign(Season=season))
+        teams.append(load_teams(season_dir).assign(Season=season))
+    fixtures_df = pd.concat(fixtures, ignore_index=True) if fixtures else pd.DataFrame()
+    teams_df = pd.concat(teams, ignore_index=True) if teams else pd.DataFrame(columns=['id', 'name', 'Season'])
+    return fixtures_df, teams_df
+
+
+# ============================================================================
+# LONG FORMAT
+# ============================================================================
+
+def observed_fdr(fixtures_df, teams_df):
+    """
+    One row per team per fixture with that team's FDR for the fixture.
+
+    Fixtures whose teams are not in the season's team list, with no kickoff
+    time, or without a difficulty for that side are dropped, as in the
+    notebook loops. Rows keep fixture order, home side first.
+    """
+    if fixtures_df.empty:
+        return pd.DataFrame(columns=FDR_COLUMNS)
+    names = teams_df[['Season', 'id', 'name']]
+    fixtures = fixtures_df.reset_index(drop=True).rename_axis('fixture').reset_index()
+    fixtures = fixtures.merge(names.rename(columns={'id': 'team_h', 'name': 'team_h_name'}),
+                              on=['Season', 'team_h'], how='inner')
+    fixtures = fixtures.merge(names.rename(columns={'id': 'team_a', 'name': 'team_a_name'}),
+                              on=['Season', 'team_a'], how='inner')
+    fixtures['Date'] = pd.to_datetime(fixtures['kickoff_time'], utc=True).dt.tz_localize(None)
+    fixtures = fixtures[fixtures['Date'].notna()]
+
+    sides = []
+    for is_home, team, opponent, difficulty in ((True, 'team_h_name', 'team_a_name', 'team_h_difficulty'),
+                                                (False, 'team_a_name', 'team_h_name', 'team_a_difficulty')):
+        side = fixtures[['fixture', 'Season', 'event', 'Date', team, opponent, difficulty]]
+        side.columns = ['fixture', 'Season', 'Gameweek', 'Date', 'Team', 'Opponent', 'FDR']
+        sides.append(side.assign(Venue='Home' if is_home else 'Away', is_home=is_home))
+
+    long = pd.concat(sides, ignore_index=True).dropna(subset=['FDR'])
+    long = long.sort_values(['fixture', 'is_home'], ascending=[True, False], kind='stable')
+    long['FDR'] = long['FDR'].astype('int8')
+    return long[FDR_COLUMNS].reset_index(drop=True)
+
+
+def _signature(data_dir, first_season):
+    """mtime and size of every input file, so the cache follows the checkout."""
+    parts = []
+    for season in _season_dirs(data_dir, first_season):
+        for file in ('fixtures.csv', 'teams.csv', 'raw.json'):
+            path = os.path.join(data_dir, season, file)
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f'{season}/{file}={stat.st_mtime_ns}:{stat.st_size}')
+    return ','.join(parts)
+
+
+def load_observed_fdr(data_dir=FPL_DATA_DIR, first_season=FIRST_OBSERVED_SEASON, cache_dir=INDEX_DIR,
+                      rebuild=False):
+    """Return the observed FDR table, from the cache when the FPL inputs are unchanged."""
+    path = os.path.join(cache_dir, 'observed_fdr.parquet')
+    signature_path = os.path.join(cache_dir, 'observed_fdr.signature')
+    signature = _signature(data_dir, first_season)
+    if not rebuild and os.path.exists(path) and os.path.exists(signature_path):
+        with open(signature_path) as f:
+            if f.read() == signature:
+                return pd.read_parquet(path)
+
+    long = observed_fdr(*load_fixtures(data_dir, first_season))
+    os.makedirs(cache_dir, exist_ok=True)
+    long.to_parquet(path, index=False)
+    with open(signature_path, 'w') as f:
+        f.write(signature)
+    return long
+
+
+# ============================================================================
+# OPPONENT FORM
+# ============================================================================
+
+def opponent_form(long, rolling, columns, team_column='Team_FPL', context=False):
+    """
+    Attach the opponent's latest rolling metrics (same season, Date <= kickoff)
+    to each row of the long FDR table, as opp_<column>.
+
+    columns are the metric names without prefix (e.g. 'rolling_xG'). With
+    context=True the opponent's venue-specific form is used: a home fixture
+    takes the opponent's away_<column>, an away fixture its home_<column>.
+    Opponents are matched on entity_registry team ids, so FPL names
+    ("Nott'm Forest") find form computed under FBref or model names
+    ('Nottingham'); opponents missing from the registry are warned about.
+    Rows without opponent form are dropped.
+    """
+    rolling = rolling.assign(Date=rolling['Date'].astype('datetime64[ns]'),
+                             opponent_id=team_ids(rolling[team_column])).sort_values('Date')
+    long = long.assign(Date=long['Date'].astype('datetime64[ns]'),
+                       opponent_id=team_ids(long['Opponent'], errors='warn'))
+    long = long.dropna(subset=['opponent_id']).astype({'opponent_id': 'int16'})
+    keys = rolling[['Season', 'opponent_id', 'Date']]
+    attached = []
+    for is_home in (True, False):
+        prefix = ('away_' if is_home else 'home_') if context else ''
+        form = pd.concat([keys, rolling[[prefix + c for c in columns]].set_axis(
+            ['opp_' + c for c in columns], axis=1)], axis=1)
+        side = long[long['is_home'] == is_home].reset_index().sort_values('Date')
+        side = pd.merge_asof(side, form, on='Date', by=['Season', 'opponent_id'], direction='backward')
+        attached.append(side)
+
+    out = pd.concat(attached).sort_values('index').drop(columns=['index', 'opponent_id'])
+    return out.dropna(subset=['opp_' + c for c in columns]).reset_index(drop=True)
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main():
+    """Main execution function."""
+    long = load_observed_fdr(rebuild=True)
+    print(f"✓ Created observed FDR lookup: {len(long)} records "
+          f"({long['Season'].nunique()} seasons) -> {os.path.join(INDEX_DIR, 'observed_fdr.parquet')}")
+
+
+if __name__ == "__main__":
+    main()
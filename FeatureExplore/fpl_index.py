@@ -0,0 +1,301 @@
+"""
+Prebuilt index over the vaastav Fantasy-Premier-League checkout.
+
+get_active_years and get_data_final used to os.listdir every season's
+players/ folder (~600 entries) and pick the first folder containing
+fpl_name, once per player per season. Substrings like 'Moreno' or 'Manga'
+match several folders, and which one came first depended on the filesystem.
+
+FplIndex scans the checkout once and maps (season, normalized name, element
+id) to each player's gw.csv. The scan is cached in .fpl_index/ and redone
+only when a season's players/ folder changes. Lookups still take the same
+fpl_name substrings, but ambiguous matches are resolved deterministically:
+exact name first, then whole-word matches, then the alphabetically first
+folder, with a warning.
+
+build_gameweeks() also writes every season's gw.csv rows into one Parquet
+table sorted by (season, folder). The FPL side of the get_data_final merge
+then becomes a slice of that table instead of a file read per player-season.
+The table records the mtime and size of every gw.csv it was built from and
+is rebuilt on first use when any of them changes (new gameweeks are appended
+to existing files, which leaves the players/ folder mtimes untouched).
+
+Usage (from the repo root):
+    python FeatureExplore/fpl_index.py               # build the index
+    python FeatureExplore/fpl_index.py --gameweeks   # and the consolidated gameweek table
+"""
+
+import argparse
+import os
+import re
+import unicodedata
+import warnings
+
+import pandas as pd
+
+
+FPL_DATA_DIR = 'Fantasy-Premier-League/data'
+INDEX_DIR = '.fpl_index'
+
+# Seasons get_active_years has always searched (FPL 'YYYY-YY' format)
+FPL_SEASONS = ('2023-24', '2022-23', '2021-22', '2020-21', '2019-20', '2018-19', '2017-18')
+
+SEASON_DIR_PATTERN = re.compile(r'^\d{4}-\d{2}$')
+
+
+def normalize_name(name):
+    """Lowercase, strip accents and collapse separators: 'Martin_Ødegaard' -> 'martin odegaard'."""
+    name = unicodedata.normalize('NFKD', str(name).replace('Ø', 'O').replace('ø', 'o'))
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(re.split(r'[^0-9a-z]+', name.lower())).strip()
+
+
+def parse_folder(folder):
+    """Split a vaastav player folder ('Bukayo_Saka_7') into (normalized name, element id or None)."""
+    parts = folder.rsplit('_', 1)
+    if len(parts) == 2 and parts[1].isdigit():
+        return normalize_name(parts[0]), int(parts[1])
+    return normalize_name(folder), None
+
+
+def fbref_season(season):
+    """Convert an FPL folder name ('2024-25') to the FBref season ('2024-2025')."""
+    return season[:5] + '20' + season[5:]
+
+
+def fpl_season(year_range):
+    """Convert an FBref season ('2024-2025') to the FPL folder name ('2024-25')."""
+    return f'{year_range[:4]}-{year_range[-2:]}'
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class FplIndex:
+    """In-memory (season, name, element) -> gw.csv index with an on-disk cache."""
+
+    def __init__(self, data_dir=FPL_DATA_DIR, cache_dir=INDEX_DIR):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, 'players.csv')
+        self.gameweeks_path = os.path.join(cache_dir, 'gameweeks.parquet')
+        self._players = None
+        self._by_season = None
+        self._gameweeks = None
+        self._slices = None
+
+    # ---------------------------------------------------------------- scanning
+
+    def _signature(self):
+        """mtime of every season's players/ folder; any change invalidates the cache."""
+        signature = {}
+        if not os.path.isdir(self.data_dir):
+            return signature
+        for entry in os.scandir(self.data_dir):
+            players = os.path.join(entry.path, 'players')
+            if SEASON_DIR_PATTERN.match(entry.name) and os.path.isdir(players):
+                signature[entry.name] = os.stat(players).st_mtime_ns
+        return signature
+
+    def scan(self):
+        """One os.scandir pass per season over the checkout."""
+        rows = []
+        for season in sorted(self._signature()):
+            players = os.path.join(self.data_dir, season, 'players')
+            for entry in os.scandir(players):
+                if entry.is_dir():
+                    name, element = parse_folder(entry.name)
+                    rows.append({'season': season, 'folder': entry.name, 'name': name, 'element': element,
+                                 'path': os.path.join(players, entry.name, 'gw.csv')})
+        return pd.DataFrame(rows, columns=['season', 'folder', 'name', 'element', 'path'])
+
+    def load(self, rebuild=False):
+        """Load the cached index, rescanning if the checkout changed."""
+        if self._players is not None and not rebuild:
+            return self._players
+        signature = ','.join(f'{season}={mtime}' for season, mtime in sorted(self._signature().items()))
+        signature_path = os.path.join(self.cache_dir, 'signature.txt')
+        cached = None
+        if not rebuild and os.path.exists(self.index_path) and os.path.exists(signature_path):
+            with open(signature_path) as f:
+                if f.read() == signature:
+                    cached = pd.read_csv(self.index_path, dtype={'element': 'Int64'})
+        if cached is None:
+            cached = self.scan()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cached.to_csv(self.index_path, index=False)
+            with open(signature_path, 'w') as f:
+                f.write(signature)
+        self._players = cached
+        self._by_season = {season: group.sort_values('folder') for season, group in cached.groupby('season')}
+        return self._players
+
+    # ----------------------------------------------------------------- lookups
+
+    def seasons(self):
+        self.load()
+        return sorted(self._by_season)
+
+    def match(self, season, fpl_name):
+        """
+        Return the index row (a Series) for fpl_name in a season, or None.
+
+        fpl_name may be a folder substring (as used in the manifests) or an
+        element id.
+        """
+        self.load()
+        players = self._by_season.get(season)
+        if players is None:
+            return None
+        if str(fpl_name).isdigit():
+            hits = players[players['element'] == int(fpl_name)]
+            return hits.iloc[0] if len(hits) else None
+
+        hits = players[players['folder'].str.contains(fpl_name, regex=False)]
+        wanted = normalize_name(fpl_name)
+        if hits.empty:
+            # 'Martins Indi' never matched the 'Martins_Indi_123' folder
+            hits = players[players['name'].map(lambda name: f' {wanted} ' in f' {name} ')]
+        if len(hits) <= 1:
+            return hits.iloc[0] if len(hits) else None
+
+        exact = hits[hits['name'] == wanted]
+        if len(exact) == 1:
+            return exact.iloc[0]
+        words = hits[hits['name'].map(lambda name: f' {wanted} ' in f' {name} ')]
+        if len(words) == 1:
+            return words.iloc[0]
+        warnings.warn(f"'{fpl_name}' matches {len(hits)} FPL players in {season} "
+                      f"({', '.join(hits['folder'].head(4))}); using {hits['folder'].iloc[0]}")
+        return hits.iloc[0]
+
+    def active_seasons(self, fpl_name, seasons=FPL_SEASONS):
+        """FPL seasons (in the given order) in which fpl_name has a folder."""
+        return [season for season in seasons if self.match(season, fpl_name) is not None]
+
+    # -------------------------------------------------------------- gameweeks
+
+    def _gameweek_signature(self):
+        """Per season: file count, newest mtime and total size of its gw.csv files."""
+        stats = {}
+        players = self.load()
+        for season, path in zip(players['season'], players['path']):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            count, mtime, size = stats.get(season, (0, 0, 0))
+            stats[season] = (count + 1, max(mtime, st.st_mtime_ns), size + st.st_size)
+        return ','.join(f'{season}={count}:{mtime}:{size}' for season, (count, mtime, size) in sorted(stats.items()))
+
+    def gameweeks_stale(self):
+        """True when the gameweek table is missing or any gw.csv changed since it was built."""
+        signature_path = os.path.join(self.cache_dir, 'gameweeks_signature.txt')
+        if not (os.path.exists(self.gameweeks_path) and os.path.exists(signature_path)):
+            return True
+        with open(signature_path) as f:
+            return f.read() != self._gameweek_signature()
+
+    def build_gameweeks(self):
+        """Read every gw.csv once into a single Parquet table sorted by (season, folder)."""
+        players = self.load().sort_values(['season', 'folder'])
+        signature = self._gameweek_signature()
+        frames = []
+        for row in players.itertuples(index=False):
+            if not os.path.exists(row.path):
+                continue
+            gw = pd.read_csv(row.path)
+            gw.insert(0, 'folder', row.folder)
+            gw.insert(0, 'season', row.season)
+            frames.append(gw)
+        gameweeks = pd.concat(frames, ignore_index=True)
+        # Columns differ between seasons; remember each season's own set
+        columns = {season: [c for c in group.columns[group.notna().any()] if c not in ('season', 'folder')]
+                   for season, group in gameweeks.groupby('season')}
+        for column in gameweeks.columns:
+            if gameweeks[column].dtype == object:
+                gameweeks[column] = gameweeks[column].astype(str).where(gameweeks[column].notna())
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Each file is replaced atomically: worker processes may rebuild a stale table at the same time
+        tmp = f'.{os.getpid()}.tmp'
+        columns_path = os.path.join(self.cache_dir, 'gameweek_columns.json')
+        signature_path = os.path.join(self.cache_dir, 'gameweeks_signature.txt')
+        gameweeks.to_parquet(self.gameweeks_path + tmp, index=False)
+        pd.Series(columns).to_json(columns_path + tmp)
+        with open(signature_path + tmp, 'w') as f:
+            f.write(signature)
+        os.replace(self.gameweeks_path + tmp, self.gameweeks_path)
+        os.replace(columns_path + tmp, columns_path)
+        # Replaced last: a build interrupted before this point is redone
+        os.replace(signature_path + tmp, signature_path)
+        self._gameweeks = None
+        return gameweeks
+
+    def _load_gameweeks(self):
+        if self._gameweeks is None:
+            if self.gameweeks_stale():
+                warnings.warn(f"gw.csv files changed since {self.gameweeks_path} was built; rebuilding it")
+                self.build_gameweeks()
+            self._gameweeks = pd.read_parquet(self.gameweeks_path)
+            self._season_columns = pd.read_json(os.path.join(self.cache_dir, 'gameweek_columns.json'),
+                                                typ='series').to_dict()
+            # Rows are sorted by (season, folder), so each player-season is one contiguous slice
+            keys = self._gameweeks['season'] + '/' + self._gameweeks['folder']
+            starts = keys.ne(keys.shift()).to_numpy().nonzero()[0]
+            stops = list(starts[1:]) + [len(keys)]
+            self._slices = dict(zip(keys.iloc[starts], zip(starts, stops)))
+        return self._gameweeks
+
+    def gameweeks(self, season, fpl_name):
+        """
+        Return a player's gw.csv rows for a season (same columns as the file).
+
+        Served from the consolidated table when it has been built (rebuilt
+        first if any gw.csv changed since), otherwise read from the indexed
+        gw.csv path. Raises IndexError if the player has
+        no folder that season, as the old listdir lookup did.
+        """
+        row = self.match(season, fpl_name)
+        if row is None:
+            raise IndexError(f"No FPL data for '{fpl_name}' in {season}")
+        if os.path.exists(self.gameweeks_path):
+            gameweeks = self._load_gameweeks()
+            bounds = self._slices.get(f'{season}/{row["folder"]}')
+            if bounds is not None:
+                return gameweeks.iloc[bounds[0]:bounds[1]][self._season_columns[season]].reset_index(drop=True)
+        return pd.read_csv(row['path'])
+
+
+_default_index = None
+
+
+def get_fpl_index():
+    """Return the shared FplIndex for the default checkout location."""
+    global _default_index
+    if _default_index is None:
+        _default_index = FplIndex()
+    return _default_index
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Build the FPL player index (and gameweek table).')
+    parser.add_argument('--gameweeks', action='store_true', help='Also build the consolidated gameweek table')
+    args = parser.parse_args(argv)
+
+    index = get_fpl_index()
+    players = index.load(rebuild=True)
+    print(f"Indexed {len(players):,} player folders across {players['season'].nunique()} seasons "
+          f"-> {index.index_path}")
+    if args.gameweeks:
+        gameweeks = index.build_gameweeks()
+        print(f"Consolidated {len(gameweeks):,} gameweek rows -> {index.gameweeks_path}")
+
+
+if __name__ == "__main__":
+    main()
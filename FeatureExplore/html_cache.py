@@ -0,0 +1,219 @@
+"""
+Persistent on-disk cache for FBref HTML pages.
+
+Pages are stored content-addressed: the gzip-compressed body lives under
+objects/<sha256 of body>.html.gz and a small JSON index entry keyed by the
+sha256 of the URL points at it, so identical pages (e.g. empty match logs)
+are stored once. Each URL gets a time-to-live based on the page type:
+
+- pages for a finished season never expire
+- pages for the current season expire after CURRENT_SEASON_TTL
+- pages without a season in the URL (player summary pages) expire after
+  UNDATED_TTL
+
+Expired entries are revalidated with their stored ETag / Last-Modified, so a
+page that has not changed costs a 304 instead of a full download (an entry
+whose stored page has gone missing is fetched in full instead). In offline
+mode nothing is fetched; a URL that is not cached raises CacheMiss. Error
+responses are never returned as page HTML: they raise FetchError.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import date
+
+from http_client import conditional_headers, http_get
+
+
+CACHE_DIR = '.fbref_cache'
+
+CURRENT_SEASON_TTL = 12 * 60 * 60      # 12 hours
+UNDATED_TTL = 7 * 24 * 60 * 60         # 7 days
+
+SEASON_PATTERN = re.compile(r'/(\d{4})-(\d{4})(?:/|-)')
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a URL has no usable cache entry."""
+
+
+class FetchError(Exception):
+    """Raised when the server answers with neither a page (200) nor a usable 304."""
+
+
+def current_season_start(today=None):
+    """Return the starting year of the season in progress (seasons start in August)."""
+    today = today or date.today()
+    return today.year if today.month >= 8 else today.year - 1
+
+
+def page_ttl(url, today=None):
+    """Return the time-to-live in seconds for a URL, or None if it never expires."""
+    match = SEASON_PATTERN.search(url)
+    if match is None:
+        return UNDATED_TTL
+    if int(match.group(1)) < current_season_start(today):
+        return None
+    return CURRENT_SEASON_TTL
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path, data):
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    # A unique temp file: scheduler threads in one process may store the same object at once
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        # mkstemp creates 0600; cache files are as readable as open() would make them
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class HtmlCache:
+    """URL-indexed, content-addressed store of compressed HTML pages."""
+
+    def __init__(self, root=CACHE_DIR, offline=False, ttl_policy=page_ttl):
+        self.root = root
+        self.offline = offline
+        self.ttl_policy = ttl_policy
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.network_fetches = 0
+
+    def _index_path(self, url):
+        key = _sha256(url.encode('utf-8'))
+        return os.path.join(self.root, 'index', key[:2], f'{key}.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], f'{digest}.html.gz')
+
+    def entry(self, url):
+        """Return the index entry for a URL, or None if it was never cached."""
+        try:
+            with open(self._index_path(url), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_fresh(self, entry, now=None):
+        """Check an index entry against the TTL policy for its URL."""
+        ttl = self.ttl_policy(entry['url'])
+        if ttl is None:
+            return True
+        now = time.time() if now is None else now
+        return now - entry['fetched_at'] < ttl
+
+    def read(self, entry):
+        """Return the HTML an index entry points at, or None if the object is gone."""
+        try:
+            with open(self._object_path(entry['object']), 'rb') as f:
+                return gzip.decompress(f.read()).decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def get(self, url, allow_stale=False):
+        """Return the cached HTML for a URL, or None if missing or expired."""
+        entry = self.entry(url)
+        if entry is None or not (allow_stale or self.is_fresh(entry)):
+            return None
+        return self.read(entry)
+
+    def put(self, url, html, etag=None, last_modified=None):
+        """Store a page and point the URL's index entry at it."""
+        body = html.encode('utf-8')
+        digest = _sha256(body)
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            _atomic_write(object_path, gzip.compress(body))
+        entry = {'url': url, 'object': digest, 'fetched_at': time.time(), 'size': len(body),
+                 'etag': etag, 'last_modified': last_modified}
+        _atomic_write(self._index_path(url), json.dumps(entry).encode('utf-8'))
+        return digest
+
+    def put_response(self, url, response, entry=None):
+        """
+        Record a response: store a 200, or refresh the entry on a 304.
+
+        Returns the page HTML, or None if the response was neither.
+        """
+        if response.status_code == 304 and entry is not None:
+            html = self.read(entry)
+            if html is not None:
+                entry['fetched_at'] = time.time()
+                _atomic_write(self._index_path(url), json.dumps(entry).encode('utf-8'))
+                self.revalidated += 1
+                return html
+        if response.status_code == 200:
+            self.put(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return response.text
+        return None
+
+    def fetch(self, url):
+        """
+        Return the HTML for a URL, going to the network only on a cache miss.
+
+        In offline mode expired entries are still served, and a URL that was
+        never cached raises CacheMiss. Expired entries are revalidated with a
+        conditional request. Only 200 responses are stored, so a rate-limit
+        or error page is never replayed; any other status raises FetchError.
+        """
+        entry = self.entry(url)
+        html = self.read(entry) if entry is not None else None
+        if html is not None and (self.offline or self.is_fresh(entry)):
+            self.hits += 1
+            return html
+
+        self.misses += 1
+        if self.offline:
+            raise CacheMiss(f'Not in cache (offline mode): {url}')
+
+        # Revalidate only when the stored page can be served on a 304; otherwise fetch it in full
+        if html is None:
+            entry = None
+        response = http_get(url, headers=conditional_headers(entry))
+        self.network_fetches += 1
+        html = self.put_response(url, response, entry)
+        if html is None:
+            raise FetchError(f'HTTP {response.status_code} for {url}')
+        return html
+
+
+# ============================================================================
+# MODULE-LEVEL DEFAULT CACHE
+# ============================================================================
+
+_default_cache = HtmlCache()
+
+
+def configure_cache(root=CACHE_DIR, offline=False):
+    """Replace the default cache used by fetch_html."""
+    global _default_cache
+    _default_cache = HtmlCache(root=root, offline=offline)
+    return _default_cache
+
+
+def get_cache():
+    """Return the default cache."""
+    return _default_cache
+
+
+def fetch_html(url):
+    """Fetch a page through the default cache."""
+    return _default_cache.fetch(url)
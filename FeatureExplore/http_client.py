@@ -0,0 +1,127 @@
+"""
+Shared HTTP client for every scrape entry point.
+
+get_url_final, get_premgames and get_league_table used to call bare
+requests.get(url): a new TCP/TLS handshake per page, no keep-alive, no
+timeout. HttpClient wraps one pooled requests.Session instead:
+
+- keep-alive connection pool sized for the fetch scheduler's workers
+- Accept-Encoding negotiates gzip/deflate, plus brotli when the `brotli`
+  package is installed (urllib3 decodes it transparently)
+- (connect, read) timeouts on every request
+- If-None-Match / If-Modified-Since revalidation from cached ETag and
+  Last-Modified headers, so unchanged pages come back as 304
+- a record of bytes on the wire, decoded bytes and latency per request
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from instrumentation import stage
+
+
+DEFAULT_TIMEOUT = (10, 30)      # (connect, read) seconds
+DEFAULT_POOL_SIZE = 10
+USER_AGENT = 'Mozilla/5.0 (compatible; FbrefWebscraping/1.0)'
+
+
+def conditional_headers(entry):
+    """Build revalidation headers from an html_cache index entry (or None)."""
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+class HttpClient:
+    """Pooled session that records per-request size and latency."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': ACCEPT_ENCODING,
+        })
+        self.records = []
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        """GET a URL through the pool and record what it cost."""
+        with stage('http.fetch') as counters:
+            start = time.perf_counter()
+            response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+            latency = time.perf_counter() - start
+
+            # raw.tell() counts body bytes pulled off the socket (before decoding)
+            wire_bytes = response.raw.tell() if response.raw is not None else len(response.content)
+            counters.update(status=response.status_code, bytes=len(response.content), wire_bytes=wire_bytes)
+        record = {
+            'url': url,
+            'status': response.status_code,
+            'wire_bytes': wire_bytes,
+            'decoded_bytes': len(response.content),
+            'encoding': response.headers.get('Content-Encoding', 'identity'),
+            'latency': latency,
+        }
+        with self.lock:
+            self.records.append(record)
+        return response
+
+    def stats(self):
+        """Totals across every request made so far."""
+        with self.lock:
+            records = list(self.records)
+        latencies = sorted(r['latency'] for r in records)
+        n = len(records)
+        return {
+            'requests': n,
+            'not_modified': sum(1 for r in records if r['status'] == 304),
+            'errors': sum(1 for r in records if r['status'] >= 400),
+            'wire_bytes': sum(r['wire_bytes'] for r in records),
+            'decoded_bytes': sum(r['decoded_bytes'] for r in records),
+            'total_latency': sum(latencies),
+            'mean_latency': sum(latencies) / n if n else 0.0,
+            'p95_latency': latencies[int(0.95 * (n - 1))] if n else 0.0,
+        }
+
+    def report(self):
+        """Print a one-block summary of what the requests so far cost."""
+        stats = self.stats()
+        print(f"HTTP requests: {stats['requests']} ({stats['not_modified']} not modified, {stats['errors']} errors)")
+        print(f"  Transferred: {stats['wire_bytes'] / 1e6:.2f} MB on the wire, "
+              f"{stats['decoded_bytes'] / 1e6:.2f} MB decoded")
+        print(f"  Latency: {stats['mean_latency']:.2f}s mean, {stats['p95_latency']:.2f}s p95, "
+              f"{stats['total_latency']:.0f}s total")
+
+
+# ============================================================================
+# MODULE-LEVEL DEFAULT CLIENT
+# ============================================================================
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """Return the shared client, creating it on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def http_get(url, headers=None, timeout=None):
+    """GET through the shared client."""
+    return get_client().get(url, headers=headers, timeout=timeout)
@@ -0,0 +1,212 @@
+"""
+Incremental matchweek-level refresh of player and team files.
+
+A full refresh re-runs compile_dat over every season and overwrites the CSV,
+so picking up one new gameweek costs seven seasons of requests. This script
+instead reads the last match Date already stored in each
+Player_Data/.../<name>_finaldat.csv and Team_Data/<team>_teamdat.csv, scrapes
+only the current season, and appends the matches played since then. Finished
+seasons are never touched.
+
+Before any request is made, the current season's FPL fixtures.csv is checked;
+if no fixture has finished since a file's last stored match, that file is
+skipped without touching the network.
+
+Usage (from the repo root):
+    python FeatureExplore/incremental_refresh.py --manifest players.csv
+    python FeatureExplore/incremental_refresh.py --skip-players   # teams only
+"""
+
+import argparse
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from fbref_scrape import SQUADS, get_data_final, get_team_data
+from fpl_index import FPL_DATA_DIR, fpl_season
+from html_cache import CACHE_DIR, current_season_start, configure_cache
+from http_client import get_client
+from player_manifest import load_manifest
+
+
+TEAM_DIR = 'Team_Data'
+
+
+def current_season(today=None):
+    """FBref season label of the season in progress, e.g. '2024-2025'."""
+    start = current_season_start(today)
+    return f'{start}-{start + 1}'
+
+
+def last_stored_match(path):
+    """
+    Return (last Date, stored row count) for a player or team CSV.
+
+    Only the Date column is read. A missing or empty file gives (None, 0).
+    """
+    if not os.path.exists(path):
+        return None, 0
+    stored = pd.read_csv(path, usecols=['Date'])
+    if stored.empty:
+        return None, 0
+    return pd.to_datetime(stored['Date']).dt.date.max(), len(stored)
+
+
+def new_fixtures_played(season, last_date, fpl_dir=FPL_DATA_DIR):
+    """
+    Check FPL fixtures.csv for finished fixtures after last_date.
+
+    Returns True/False, or None when the season has no fixtures.csv (in which
+    case callers should scrape anyway).
+    """
+    path = os.path.join(fpl_dir, fpl_season(season), 'fixtures.csv')
+    if not os.path.exists(path):
+        return None
+    fixtures = pd.read_csv(path, usecols=['kickoff_time', 'finished'])
+    kickoff = pd.to_datetime(fixtures['kickoff_time'], utc=True).dt.date
+    finished = fixtures['finished'].astype(str).str.lower() == 'true'
+    if last_date is not None:
+        finished &= kickoff > last_date
+    return bool(finished.any())
+
+
+def append_rows(path, new_rows, stored_rows):
+    """
+    Append rows to an existing CSV in its own column order.
+
+    Files written by the notebooks carry an unnamed index column; the appended
+    rows continue its numbering.
+    """
+    if not os.path.exists(path):
+        new_rows.to_csv(path)
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    has_index = header[0].startswith('Unnamed')
+    data_columns = list(header[1:]) if has_index else list(header)
+
+    new_rows = new_rows.reindex(columns=data_columns)
+    if has_index:
+        new_rows.index = range(stored_rows, stored_rows + len(new_rows))
+    new_rows.to_csv(path, mode='a', header=False, index=has_index)
+
+
+def select_new(df, last_date):
+    """Rows of a freshly scraped season that are newer than last_date."""
+    if last_date is None:
+        return df
+    dates = pd.to_datetime(df['Date']).dt.date
+    return df[dates > last_date]
+
+
+# ============================================================================
+# REFRESH
+# ============================================================================
+
+def refresh_player(player, season):
+    """Append a player's matches played since the last stored one. Returns rows added."""
+    last_date, stored_rows = last_stored_match(player['output'])
+    if new_fixtures_played(season, last_date) is False:
+        return 0
+
+    df = get_data_final(player['code'], season, player['slug'], player['fpl_name'])
+    if df.empty:
+        return 0
+
+    new_rows = select_new(df, last_date)
+    if not new_rows.empty:
+        append_rows(player['output'], new_rows, stored_rows)
+    return len(new_rows)
+
+
+def refresh_team(squad, season, team_dir=TEAM_DIR):
+    """Append a squad's matches played since the last stored one. Returns rows added."""
+    path = os.path.join(team_dir, squad['filename'])
+    last_date, stored_rows = last_stored_match(path)
+    if new_fixtures_played(season, last_date) is False:
+        return 0
+
+    df = get_team_data(squad['code'], season, squad['slug'])
+    # The schedule lists upcoming fixtures too; keep only matches with a result
+    df = df[df['Result'] != '']
+    new_rows = select_new(df, last_date)
+    if not new_rows.empty:
+        append_rows(path, new_rows, stored_rows)
+    return len(new_rows)
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Append newly played matches to player and team files.')
+    parser.add_argument('--manifest', help='Player manifest CSV (see player_manifest.py)')
+    parser.add_argument('--season', default=current_season(),
+                        help='FBref season to refresh (default: the current season)')
+    parser.add_argument('--skip-players', action='store_true', help='Only refresh Team_Data')
+    parser.add_argument('--skip-teams', action='store_true', help='Only refresh player files')
+    parser.add_argument('--offline', action='store_true', help='Only serve pages from the HTML cache')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f'HTML cache directory (default: {CACHE_DIR})')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    configure_cache(args.cache_dir, offline=args.offline)
+
+    print("=" * 70, flush=True)
+    print("INCREMENTAL REFRESH", flush=True)
+    print("=" * 70, flush=True)
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
+    print(f"Season: {args.season}", flush=True)
+    print("=" * 70, flush=True)
+
+    failed = []
+    players_updated = 0
+    teams_updated = 0
+
+    if not args.skip_players:
+        players = load_manifest(args.manifest) if args.manifest else []
+        print(f"\nPlayers: {len(players)}", flush=True)
+        for idx, player in enumerate(players, 1):
+            try:
+                added = refresh_player(player, args.season)
+            except Exception as e:
+                print(f"  [{idx}/{len(players)}] {player['slug']}: FAILED - {str(e)}", flush=True)
+                failed.append(f"{player['slug']} ({str(e)[:50]})")
+                continue
+            if added:
+                players_updated += 1
+                print(f"  [{idx}/{len(players)}] {player['slug']}: +{added} rows", flush=True)
+
+    if not args.skip_teams:
+        print(f"\nTeams: {len(SQUADS)}", flush=True)
+        for squad in SQUADS:
+            try:
+                added = refresh_team(squad, args.season)
+            except Exception as e:
+                print(f"  {squad['team']}: FAILED - {str(e)}", flush=True)
+                failed.append(f"{squad['team']} ({str(e)[:50]})")
+                continue
+            if added:
+                teams_updated += 1
+                print(f"  {squad['team']}: +{added} rows", flush=True)
+
+    print("\n" + "=" * 70)
+    print("REFRESH COMPLETE")
+    print("=" * 70)
+    print(f"Players updated: {players_updated}")
+    print(f"Teams updated: {teams_updated}")
+    print(f"Failed: {len(failed)}")
+    for f in failed:
+        print(f"  - {f}")
+    get_client().report()
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Stage-level timing and counters for the scrape, compile and merge paths.
+
+The scripts only print progress, so there is no way to tell which step of a
+full refresh dominates. Code wraps each step in a named stage:
+
+    with stage('html.parse', bytes=len(html)) as record:
+        ...
+        record['rows'] = n
+
+and, when telemetry is enabled, every stage exit appends one JSON line:
+
+    {"ts": ..., "pid": ..., "stage": "html.parse", "wall_s": 0.0123, "depth": 0,
+     "bytes": 51234, "rows": 38, "maxrss_mb": 312.5, "peak_mb": 4.1}
+
+- wall_s: wall time of the stage (nested stages are included in their parent)
+- counters: whatever the call site records (rows, bytes, status, ...)
+- maxrss_mb: the process's resident-memory high-water mark at stage exit
+- peak_mb: peak traced allocation inside the stage (memory=True only; runs
+  tracemalloc, which slows everything down)
+
+Instrumented stages: http.fetch (http_client), page.fetch and html.parse
+(fbref_scrape.get_tbody), table.parse, fpl.merge and player.concat
+(fbref_scrape), typing (player_schema.apply_schema), compile.fragment and
+compile.write (compile_defender_data), player.write (batch_runner,
+reparse_pages) and features.read / features.team_merge / features.fdr_merge /
+features.write (feature_store, the FormFixtures merges).
+
+Telemetry is off unless FBREF_TELEMETRY names a file (or configure_telemetry
+is called); the environment is inherited by worker processes, which append
+to the same file. With FBREF_PROFILE_STAGE set, that stage also runs under a
+sampling profiler and its stacks are appended, in collapsed flame-graph
+format, to <file>.<stage>.<pid>.folded. When telemetry is off, stage() costs
+one global lookup.
+
+Usage (from the repo root):
+    FBREF_TELEMETRY=refresh.jsonl python FeatureExplore/regenerate_defenders.py --offline
+    FBREF_TELEMETRY=build.jsonl FBREF_PROFILE_STAGE=typing python FeatureExplore/feature_store.py --rebuild
+    python FeatureExplore/instrumentation.py refresh.jsonl       # per-stage totals
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+TELEMETRY_ENV = 'FBREF_TELEMETRY'
+MEMORY_ENV = 'FBREF_TELEMETRY_MEMORY'
+PROFILE_ENV = 'FBREF_PROFILE_STAGE'
+DEFAULT_INTERVAL = 0.005        # seconds between profiler samples
+
+
+def _maxrss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _json_default(value):
+    # numpy scalars from len()/sum() on frames
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+# ============================================================================
+# SAMPLING PROFILER
+# ============================================================================
+
+class StackSampler:
+    """Samples one thread's Python stack every interval seconds from a background thread."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self.active = False
+        self._stop = None
+        self._thread = None
+
+    def start(self, thread_id):
+        self.active = True
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(thread_id,), daemon=True)
+        self._thread.start()
+
+    def _run(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.active = False
+
+    def flush(self, path):
+        """Append the samples so far as 'frame;frame;... count' lines and reset."""
+        if self.counts:
+            with open(path, 'a') as f:
+                f.writelines(f'{stack} {n}\n' for stack, n in self.counts.items())
+            self.counts.clear()
+
+
+# ============================================================================
+# TELEMETRY
+# ============================================================================
+
+class Telemetry:
+    """Appends one JSON line per stage exit to a file shared by every process."""
+
+    def __init__(self, path, memory=False, profile_stage=None, interval=DEFAULT_INTERVAL):
+        self.path = path
+        self.memory = memory
+        self.profile_stage = profile_stage
+        self.sampler = StackSampler(interval) if profile_stage else None
+        self.local = threading.local()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def _stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def emit(self, record):
+        """Append a record with a single write, so lines from several processes do not interleave."""
+        line = (json.dumps(record, default=_json_default) + '\n').encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def stage(self, name, fields):
+        stack = self._stack()
+        frame = {'child_peak': 0}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # The parent's peak so far survives the reset below through child_peak
+            if stack:
+                stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+            tracemalloc.reset_peak()
+            frame['start'] = current
+        sampling = self.sampler is not None and name == self.profile_stage and not self.sampler.active
+        if sampling:
+            self.sampler.start(threading.get_ident())
+        stack.append(frame)
+        error = None
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            if sampling:
+                self.sampler.stop()
+                self.sampler.flush(f'{self.path}.{name}.{os.getpid()}.folded')
+            stack.pop()
+            record = {'ts': round(time.time(), 3), 'pid': os.getpid(), 'stage': name, 'wall_s': round(wall, 6),
+                      'depth': len(stack), **fields, 'maxrss_mb': round(_maxrss_mb(), 1)}
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1], frame['child_peak'])
+                record['peak_mb'] = round((peak - frame['start']) / 1e6, 3)
+                if stack:
+                    stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+            if error:
+                record['error'] = error
+            self.emit(record)
+
+
+_telemetry = None
+_configured = False
+
+
+def configure_telemetry(path, memory=False, profile_stage=None):
+    """Record stages to path from now on, in this process and in workers it starts."""
+    global _telemetry, _configured
+    os.environ[TELEMETRY_ENV] = path
+    os.environ[MEMORY_ENV] = '1' if memory else ''
+    if profile_stage:
+        os.environ[PROFILE_ENV] = profile_stage
+    else:
+        os.environ.pop(PROFILE_ENV, None)
+    _telemetry = Telemetry(path, memory=memory, profile_stage=profile_stage)
+    _configured = True
+    return _telemetry
+
+
+def get_telemetry():
+    """The process's Telemetry, set up from the environment on first use (None when disabled)."""
+    global _telemetry, _configured
+    if not _configured:
+        _configured = True
+        path = os.environ.get(TELEMETRY_ENV)
+        if path:
+            _telemetry = Telemetry(path, memory=os.environ.get(MEMORY_ENV) == '1',
+                                   profile_stage=os.environ.get(PROFILE_ENV) or None)
+    return _telemetry
+
+
+@contextmanager
+def stage(name, **fields):
+    """Time a block as stage name; the yielded dict takes counters (rows, bytes, ...)."""
+    telemetry = _telemetry if _configured else get_telemetry()
+    if telemetry is None:
+        yield fields
+        return
+    with telemetry.stage(name, fields) as record:
+        yield record
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def load_records(path):
+    """Telemetry lines as a DataFrame (a partial last line is skipped)."""
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return pd.DataFrame(records)
+
+
+def summarize(records):
+    """
+    Per-stage calls, total and mean wall time, share of the top-level wall
+    time, summed rows and bytes, throughput and memory high-water marks.
+    """
+    for column in ('rows', 'bytes', 'peak_mb'):
+        if column not in records:
+            records[column] = float('nan')
+    grouped = records.groupby('stage')
+    summary = pd.DataFrame({
+        'calls': grouped.size(),
+        'wall_s': grouped['wall_s'].sum(),
+        'mean_ms': grouped['wall_s'].mean() * 1000,
+        'depth': grouped['depth'].min(),
+        'rows': grouped['rows'].sum(min_count=1),
+        'MB': grouped['bytes'].sum(min_count=1) / 1e6,
+        'peak_mb': grouped['peak_mb'].max(),
+        'maxrss_mb': grouped['maxrss_mb'].max(),
+    })
+    # Share of the time spent in top-level stages per process, summed over processes
+    top_level = records.loc[records['depth'] == 0, 'wall_s'].sum()
+    summary['share'] = summary['wall_s'] / top_level if top_level else float('nan')
+    summary['rows_per_s'] = summary['rows'] / summary['wall_s']
+    return summary.sort_values('wall_s', ascending=False)
+
+
+def profile_hotspots(path, top=15):
+    """Leaf frames with the most samples across every <path>.*.folded file."""
+    leaves = Counter()
+    for folded in glob.glob(f'{glob.escape(path)}.*.folded'):
+        with open(folded) as f:
+            for line in f:
+                stack, _, n = line.rstrip('\n').rpartition(' ')
+                leaves[stack.rsplit(';', 1)[-1]] += int(n)
+    total = sum(leaves.values())
+    return [(frame, n / total) for frame, n in leaves.most_common(top)] if total else []
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description='Summarize a stage telemetry file.')
+    parser.add_argument('path', help=f'Telemetry JSON-lines file (as set in {TELEMETRY_ENV})')
+    parser.add_argument('--top', type=int, default=15, help='Profiler hotspots to list (default: 15)')
+    args = parser.parse_args(argv)
+
+    records = load_records(args.path)
+    if records.empty:
+        print(f"No records in {args.path}")
+        return
+    print("=" * 70)
+    print(f"STAGE TELEMETRY: {len(records):,} records from {records['pid'].nunique()} processes")
+    print("=" * 70)
+    print(summarize(records).round({'wall_s': 2, 'mean_ms': 2, 'MB': 2, 'share': 3, 'rows_per_s': 0,
+                                    'peak_mb': 1, 'maxrss_mb': 0}).to_string())
+
+    hotspots = profile_hotspots(args.path, args.top)
+    if hotspots:
+        print("\nProfiler hotspots (share of samples by innermost frame):")
+        for frame, share in hotspots:
+            print(f"  {share:6.1%}  {frame}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+Discover every Premier League player of a season from FBref squad pages and
+write a player manifest for batch_runner.
+
+GeneralScrape.ipynb grew one hand-written get_data('178ae8f8', '2023-2024',
+'Diogo-Jota', ...) cell per player, and DEFENDERS_TO_REGENERATE is another
+hand-kept list of FBref codes and FPL names. Discovery builds that list from
+the site instead:
+
+1. the season's league stats page gives the 20 squads (codes checked against
+   entity_registry.TEAMS, the Team_Scrape squads; a newly promoted squad is
+   reported so it can be added there)
+2. each squad's season stats page gives one row per player in the Standard
+   Stats table: FBref code, URL slug, name, position and appearances
+3. each player is matched to an FPL folder in the vaastav checkout
+   (fpl_index) by normalized name in the seasons it covers: the FPL name
+   already in the entity registry for the code first, then an exact name,
+   then a unique folder containing every word of the FBref name
+4. matched players become manifest rows (code, slug, fpl_name, output,
+   checkgames). The output file stem is the one registered for the code;
+   otherwise the existing Player_Data file of the same player, found by
+   the slug's surname stems (surname, initial + surname, full slug) and
+   confirmed by team and season: a file with rows at the player's team in
+   one of the player's seasons is the same player, one with rows for that
+   season at other teams only is someone else, and a file without a shared
+   season is the same player if its latest team is the player's first
+   team. Only when every such file is someone else's is a new stem minted
+   (the first of those stems not taken; defenders go to
+   Player_Data/Defenders). Players with an unconfirmed or contested
+   existing file, and unmatched or ambiguous FPL names, are written to
+   <manifest>_review.csv
+
+Pages go through the rate-limited FetchScheduler into the HTML cache (one
+league page plus 20 squad pages per season), so discovering a season takes
+a couple of minutes and re-runs are served from the cache. The manifest is
+then one batch_runner job:
+
+Usage (from the repo root):
+    python FeatureExplore/player_discovery.py --seasons 2024-2025 --output manifests/2024-25.csv
+    python FeatureExplore/player_discovery.py --seasons 2023-2024 2022-2023 --new-only
+    python FeatureExplore/batch_runner.py --job 2024-25 --manifest manifests/2024-25.csv
+"""
+
+import argparse
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import unquote
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from dataset_store import PLAYER_DIRS, season_labels
+from entity_registry import TEAMS, get_player_registry, team_ids
+from fbref_scrape import SEASON_LIST, league_stats_url, squad_stats_url
+from fetch_scheduler import DEFAULT_RATE, DEFAULT_WORKERS, FetchScheduler
+from fpl_index import fbref_season, fpl_season, get_fpl_index, normalize_name
+from html_cache import CACHE_DIR, CacheMiss, FetchError, configure_cache, fetch_html
+from instrumentation import stage
+from player_manifest import save_manifest
+from reparse_pages import player_output
+
+
+SQUAD_LINK = re.compile(r'^/en/squads/(?P<code>[0-9a-f]{8})/(?:\d{4}-\d{4}/)?(?P<slug>.+)-Stats$')
+PLAYER_LINK = re.compile(r'^/en/players/(?P<code>[0-9a-f]{8})/(?P<slug>[^/]+)$')
+
+# Premier League Standard Stats table on a squad's season page
+SQUAD_TABLE_ID = 'stats_standard_9'
+
+REVIEW_FIELDS = ['code', 'slug', 'name', 'position', 'seasons', 'teams', 'games', 'reason', 'candidates']
+
+
+# ============================================================================
+# PAGES
+# ============================================================================
+
+def _text_int(text):
+    digits = text.replace(',', '').strip()
+    return int(digits) if digits.isdigit() else 0
+
+
+def season_squads(year):
+    """[{code, slug, name}] for every squad in a season's league table."""
+    html = fetch_html(league_stats_url(year))
+    with stage('html.parse', bytes=len(html)):
+        table = BeautifulSoup(html, 'lxml').find('tbody')
+    squads = []
+    for cell in table.find_all('td', attrs={'data-stat': 'team'}) if table is not None else []:
+        link = cell.find('a')
+        match = SQUAD_LINK.match(unquote(link['href'])) if link is not None else None
+        if match:
+            squads.append({'code': match['code'], 'slug': match['slug'], 'name': cell.get_text().strip()})
+    return squads
+
+
+def squad_players(code, year, slug):
+    """One dict per player listed in a squad's Premier League Standard Stats table."""
+    html = fetch_html(squad_stats_url(code, year, slug))
+    with stage('html.parse', bytes=len(html)):
+        table = BeautifulSoup(html, 'lxml').find('table', id=SQUAD_TABLE_ID)
+    players = []
+    for row in table.find('tbody').find_all('tr') if table is not None else []:
+        # Spacer and repeated header rows carry a class
+        if row.attrs:
+            continue
+        cell = row.find(attrs={'data-stat': 'player'})
+        link = cell.find('a') if cell is not None else None
+        match = PLAYER_LINK.match(unquote(link['href'])) if link is not None else None
+        if not match:
+            continue
+        stats = {td['data-stat']: td.get_text() for td in row.find_all('td') if td.get('data-stat')}
+        players.append({'code': match['code'], 'slug': match['slug'], 'name': cell.get_text().strip(),
+                        'position': stats.get('position', '').strip(), 'games': _text_int(stats.get('games', '')),
+                        'minutes': _text_int(stats.get('minutes', '')), 'season': year, 'team': code})
+    return players
+
+
+def prefetch(urls, rate=DEFAULT_RATE, workers=DEFAULT_WORKERS):
+    """Warm the HTML cache for urls under the request rate; returns the scheduler summary."""
+    scheduler = FetchScheduler(rate=rate, workers=workers)
+    scheduler.submit_all(urls)
+    scheduler.run()
+    return scheduler.summary()
+
+
+# ============================================================================
+# FPL MATCHING
+# ============================================================================
+
+def _fpl_stub(folder):
+    """Folder name without the element id suffix ('Bukayo_Saka_7' -> 'Bukayo_Saka')."""
+    name, _, element = folder.rpartition('_')
+    return name if name and element.isdigit() else folder
+
+
+def fpl_candidates(name, seasons, index_rows):
+    """FPL folders (per FPL season) whose normalized name matches an FBref name."""
+    wanted = normalize_name(name)
+    words = set(wanted.split())
+    rows = index_rows[index_rows['season'].isin([fpl_season(year) for year in seasons])]
+    exact = rows[rows['name'] == wanted]
+    if len(exact):
+        return exact
+    return rows[rows['name'].map(lambda folder_name: words <= set(folder_name.split()))]
+
+
+def match_fpl_name(player, index, index_rows, registered):
+    """
+    (fpl_name, reason) for a discovered player; fpl_name is None when there
+    is no unambiguous FPL folder (reason says why).
+    """
+    if player['code'] in registered:
+        return registered[player['code']], 'registered'
+    candidates = fpl_candidates(player['name'], player['seasons'], index_rows)
+    stubs = sorted(set(candidates['folder'].map(_fpl_stub)))
+    if not stubs:
+        return None, 'no FPL match'
+    if len(stubs) > 1 or candidates['season'].duplicated().any():
+        return None, 'ambiguous: ' + '; '.join(sorted(set(candidates['folder']))[:4])
+    # The stub must find the same folder again wherever it is used as a substring
+    for season in candidates['season'].unique():
+        hit = index.match(season, stubs[0])
+        if hit is None or _fpl_stub(hit['folder']) != stubs[0]:
+            return None, f"'{stubs[0]}' also matches {hit['folder'] if hit is not None else 'nothing'} in {season}"
+    return stubs[0], 'matched'
+
+
+# ============================================================================
+# FILE STEMS
+# ============================================================================
+
+def _stem_parts(slug):
+    parts = [normalize_name(part).replace(' ', '') for part in slug.split('-')]
+    return [part for part in parts if part] or ['player']
+
+
+def file_stem(slug, taken):
+    """Player_Data stem for a new player: surname, else initial + surname, else the whole slug."""
+    parts = _stem_parts(slug)
+    for stem in (parts[-1], parts[0][0] + parts[-1], ''.join(parts)):
+        if stem not in taken:
+            return stem
+    n = 2
+    while f"{''.join(parts)}{n}" in taken:
+        n += 1
+    return f"{''.join(parts)}{n}"
+
+
+def candidate_stems(slug, on_disk):
+    """Stems in on_disk that file_stem could have given this slug, in file_stem's order."""
+    parts = _stem_parts(slug)
+    full = ''.join(parts)
+    stems = [parts[-1], parts[0][0] + parts[-1], full]
+    stems += sorted((stem for stem in on_disk if re.fullmatch(re.escape(full) + r'\d+', stem)),
+                    key=lambda stem: int(stem[len(full):]))
+    return [stem for stem in dict.fromkeys(stems) if stem in on_disk]
+
+
+def file_teams(path):
+    """(FBref season, team_id) pairs a player file has rows for, and the pair of its latest row."""
+    df = pd.read_csv(path, usecols=lambda column: column in ('Date', 'Team'))
+    if not {'Date', 'Team'} <= set(df.columns):
+        return set(), None
+    teams = pd.DataFrame({'date': pd.to_datetime(df['Date'], errors='coerce'),
+                          'team_id': team_ids(df['Team'], errors='warn')}).dropna()
+    if teams.empty:
+        return set(), None
+    # The same August cutoff as everywhere else (July 2020 restart games belong to 2019-20), as '2019-2020'
+    teams['season'] = season_labels(teams['date']).map(fbref_season)
+    latest = teams.loc[teams['date'].idxmax()]
+    return set(zip(teams['season'], teams['team_id'])), (latest['season'], latest['team_id'])
+
+
+def same_player(pairs, latest, player_pairs):
+    """'same', 'different' or 'unknown' for a file's team-seasons against a discovered player's."""
+    if pairs & player_pairs:
+        return 'same'
+    seasons = {season for season, _ in player_pairs}
+    if any(season in seasons for season, _ in pairs):
+        return 'different'
+    if latest is not None and player_pairs:
+        first = min(seasons)
+        if latest[1] in {team_id for season, team_id in player_pairs if season == first}:
+            return 'same'
+    return 'unknown'
+
+
+# ============================================================================
+# DISCOVERY
+# ============================================================================
+
+def discover(seasons, rate=DEFAULT_RATE, workers=DEFAULT_WORKERS, offline=False, keepers=False, min_games=1,
+             new_only=False):
+    """
+    Crawl the squads of each season and return (manifest rows, review rows,
+    summary dict).
+    """
+    summary = {'squads': 0, 'unknown_squads': [], 'fetch_failed': 0}
+    known_squads = {team['code'] for team in TEAMS}
+
+    if not offline:
+        stats = prefetch([league_stats_url(year) for year in seasons], rate, workers)
+        summary['fetch_failed'] += stats['failed']
+    squads = []
+    for year in seasons:
+        try:
+            listed = season_squads(year)
+        except (CacheMiss, FetchError):
+            listed = []
+        if not listed:
+            print(f"  {year}: no league table", flush=True)
+        for squad in listed:
+            if squad['code'] not in known_squads:
+                summary['unknown_squads'].append(f"{squad['name']} ({squad['code']})")
+            squads.append((squad['code'], year, squad['slug']))
+    summary['squads'] = len(squads)
+
+    if not offline:
+        stats = prefetch([squad_stats_url(*squad) for squad in squads], rate, workers)
+        summary['fetch_failed'] += stats['failed']
+        print(f"  Squad pages: {stats['fetched']} fetched, {stats['cached']} cached, {stats['failed']} failed",
+              flush=True)
+    rows = []
+    for squad in squads:
+        try:
+            rows += squad_players(*squad)
+        except (CacheMiss, FetchError):
+            summary['fetch_failed'] += 1
+
+    # One entry per FBref code across squads and seasons
+    players = {}
+    for row in rows:
+        player = players.setdefault(row['code'], {'code': row['code'], 'slug': row['slug'], 'name': row['name'],
+                                                  'positions': Counter(), 'seasons': set(), 'teams': set(),
+                                                  'pairs': set(), 'games': 0})
+        if row['position']:
+            player['positions'][row['position'].split(',')[0]] += row['games'] or 1
+        player['seasons'].add(row['season'])
+        player['teams'].add(row['team'])
+        player['pairs'].add((row['season'], row['team']))
+        player['games'] += row['games']
+    summary['players'] = len(players)
+    team_codes = sorted({row['team'] for row in rows})
+    team_id = dict(zip(team_codes, team_ids(pd.Series(team_codes, dtype='str'), errors='warn')))
+
+    registry = get_player_registry().load()
+    with_code = registry.dropna(subset=['code'])
+    registered_stems = dict(zip(with_code['code'], with_code['player_stem']))
+    owners = dict(zip(with_code['player_stem'], with_code['code']))
+    registered = dict(zip(with_code.dropna(subset=['fpl_name'])['code'],
+                          with_code.dropna(subset=['fpl_name'])['fpl_name']))
+    # Files on disk; most were scraped before manifests recorded FBref codes
+    on_disk = set()
+    for folder in PLAYER_DIRS.values():
+        if os.path.isdir(folder):
+            on_disk.update(file[:-len('_finaldat.csv')] for file in os.listdir(folder) if file.endswith('_finaldat.csv'))
+    taken = set(registry['player_stem']) | on_disk
+    index = get_fpl_index()
+    index_rows = index.load()
+
+    summary.update(keepers_skipped=0, below_min_games=0, existing=0)
+    candidates = []
+    for player in sorted(players.values(), key=lambda p: p['slug']):
+        position = player['positions'].most_common(1)[0][0] if player['positions'] else ''
+        if position == 'GK' and not keepers:
+            summary['keepers_skipped'] += 1
+            continue
+        if player['games'] < min_games:
+            summary['below_min_games'] += 1
+            continue
+        player['position'] = position
+        player['seasons'] = sorted(player['seasons'], reverse=True)
+        player['team_pairs'] = {(season, team_id[team]) for season, team in player['pairs']
+                                if not pd.isna(team_id[team])}
+        candidates.append(player)
+
+    # Link unregistered players to their existing files before any new stem is minted
+    teams_on_disk = {}
+    for player in candidates:
+        player['stem'] = registered_stems.get(player['code'])
+        if player['stem'] is not None:
+            continue
+        verdicts = {}
+        for stem in candidate_stems(player['slug'], on_disk):
+            if owners.get(stem, player['code']) != player['code']:
+                continue
+            if stem not in teams_on_disk:
+                teams_on_disk[stem] = file_teams(player_output(stem))
+            verdicts[stem] = same_player(*teams_on_disk[stem], player['team_pairs'])
+        same = [stem for stem, verdict in verdicts.items() if verdict == 'same']
+        unknown = [stem for stem, verdict in verdicts.items() if verdict == 'unknown']
+        if same:
+            player['stem'] = same[0]
+        elif unknown:
+            player['unresolved'] = 'unconfirmed existing file: ' + '; '.join(unknown)
+    claims = Counter(player['stem'] for player in candidates if player['stem'] is not None)
+    for player in candidates:
+        if player['stem'] is not None and claims[player['stem']] > 1 and player['code'] not in registered_stems:
+            player['unresolved'] = f"existing file claimed by {claims[player['stem']]} players: {player['stem']}"
+            player['stem'] = None
+
+    manifest, review = [], []
+    for player in candidates:
+        reason = player.get('unresolved')
+        if reason is None:
+            if player['stem'] is None:
+                player['stem'] = file_stem(player['slug'], taken)
+                taken.add(player['stem'])
+            output = player_output(player['stem'], 'def' if player['position'] == 'DF' else 'att')
+            if new_only and os.path.exists(output):
+                summary['existing'] += 1
+                continue
+            fpl_name, reason = match_fpl_name(player, index, index_rows, registered)
+            if fpl_name is not None:
+                manifest.append({'code': player['code'], 'slug': player['slug'], 'fpl_name': fpl_name,
+                                 'output': output, 'checkgames': True})
+                continue
+        review.append({'code': player['code'], 'slug': player['slug'], 'name': player['name'],
+                       'position': player['position'], 'seasons': ' '.join(player['seasons']),
+                       'teams': ' '.join(sorted(player['teams'])), 'games': player['games'],
+                       'reason': reason.split(':')[0], 'candidates': reason.partition(': ')[2]})
+    return manifest, review, summary
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Build a player manifest from FBref squad pages.')
+    parser.add_argument('--seasons', nargs='+', default=[SEASON_LIST[0]],
+                        help=f'FBref seasons to crawl (default: {SEASON_LIST[0]})')
+    parser.add_argument('--output', default='discovered_players.csv',
+                        help='Manifest CSV to write (default: discovered_players.csv)')
+    parser.add_argument('--new-only', action='store_true', help='Leave out players whose output file exists')
+    parser.add_argument('--keepers', action='store_true', help='Include goalkeepers')
+    parser.add_argument('--min-games', type=int, default=1, help='Minimum appearances (default: 1)')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE * 60,
+                        help=f'Maximum FBref requests per minute (default: {DEFAULT_RATE * 60:g})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent fetch threads (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--offline', action='store_true', help='Only serve pages from the HTML cache')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f'HTML cache directory (default: {CACHE_DIR})')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    configure_cache(args.cache_dir, offline=args.offline)
+
+    print("=" * 70, flush=True)
+    print(f"PLAYER DISCOVERY: {', '.join(args.seasons)}", flush=True)
+    print("=" * 70, flush=True)
+    print(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
+
+    start = time.time()
+    manifest, review, summary = discover(args.seasons, rate=args.rate / 60, workers=args.workers,
+                                         offline=args.offline, keepers=args.keepers, min_games=args.min_games,
+                                         new_only=args.new_only)
+    save_manifest(manifest, args.output)
+    review_path = f'{os.path.splitext(args.output)[0]}_review.csv'
+    if review:
+        pd.DataFrame(review, columns=REVIEW_FIELDS).to_csv(review_path, index=False)
+
+    print("\n" + "=" * 70)
+    print(f"DISCOVERY COMPLETE ({time.time() - start:.1f}s)")
+    print("=" * 70)
+    print(f"Squad-seasons: {summary['squads']}, players found: {summary['players']}")
+    if summary['unknown_squads']:
+        print(f"Squads not in entity_registry.TEAMS: {', '.join(sorted(set(summary['unknown_squads'])))}")
+    if summary['fetch_failed']:
+        print(f"Pages not fetched: {summary['fetch_failed']}")
+    print(f"Skipped: {summary['keepers_skipped']} goalkeepers, {summary['below_min_games']} below "
+          f"{args.min_games} games, {summary['existing']} with existing files")
+    print(f"✓ Manifest: {len(manifest)} players -> {args.output}")
+    if review:
+        reasons = Counter(row['reason'] for row in review)
+        print(f"  Needs review: {len(review)} ({', '.join(f'{r}: {n}' for r, n in reasons.items())}) -> {review_path}")
+    print(f"\nNext: python FeatureExplore/batch_runner.py --job <name> --manifest {args.output}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Player manifests: the list of players a scrape job should process.
+
+A manifest is a CSV with one row per player:
+
+    code,slug,fpl_name,output,checkgames
+    78803d03,Bruno-Saltor,Saltor,Player_Data/Defenders/saltor_finaldat.csv,True
+
+- code: FBref player code
+- slug: FBref URL name (e.g. 'Bukayo-Saka')
+- fpl_name: substring used to find the player's folder in the vaastav FPL data
+- output: CSV path, relative to the repo root
+- checkgames: verify the row count against get_premgames (optional, default True)
+
+The hand-maintained dict lists (DEFENDERS_TO_REGENERATE) convert with
+from_player_dicts.
+"""
+
+import csv
+import os
+
+
+MANIFEST_FIELDS = ['code', 'slug', 'fpl_name', 'output', 'checkgames']
+
+
+def _parse_bool(value, default=True):
+    """'False'/'0'/'no' -> False; an empty or missing cell gives the default."""
+    value = str(value or '').strip().lower()
+    if not value:
+        return default
+    return value not in ('false', '0', 'no')
+
+
+def load_manifest(path):
+    """Read a manifest CSV into a list of dicts."""
+    players = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            players.append({
+                'code': row['code'],
+                'slug': row['slug'],
+                'fpl_name': row['fpl_name'],
+                'output': row['output'],
+                'checkgames': _parse_bool(row.get('checkgames', 'True')),
+            })
+    return players
+
+
+def save_manifest(players, path):
+    """Write a list of manifest dicts to CSV."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for player in players:
+            writer.writerow(player)
+
+
+def from_player_dicts(players, folder):
+    """Convert DEFENDERS_TO_REGENERATE-style dicts (name, code, fpl_name, checkgames, filename)."""
+    return [{
+        'code': player['code'],
+        'slug': player['name'].replace(' ', '-'),
+        'fpl_name': player['fpl_name'],
+        'output': os.path.join(folder, player['filename']),
+        'checkgames': player.get('checkgames', True),
+    } for player in players]
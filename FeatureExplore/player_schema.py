@@ -0,0 +1,288 @@
+"""
+Canonical compact dtypes for the player and team frames.
+
+get_data_final used to store every count as int64 and every label as a Python
+object, so a merged 62,884 x 149 frame held mostly padding. PLAYER_SCHEMA and
+TEAM_SCHEMA list the smallest dtype each column needs:
+
+- counts as int8 (or int16 where a match can exceed 127, e.g. Touches)
+- rates and expected values as float32
+- repeated labels (Team, Opponent, Position, Venue, ...) as categoricals
+- dates as datetime64
+
+apply_schema converts a frame to these dtypes. An integer column whose values
+do not fit the declared type is widened rather than overflowed, and one with
+missing values becomes float32. Columns the schema does not list are left as
+they are. get_data_final, the compile step and the dataset_store writer apply
+it (so the Parquet loaders hand back compact dtypes), and read_player_csv /
+read_team_csv apply it to CSVs. memory_report prints the before/after footprint.
+
+Usage:
+    from player_schema import read_player_csv
+    att = read_player_csv('att_finaldat.csv')
+"""
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+
+
+DATE = 'datetime64[ns]'
+DATETIME_UTC = 'datetime64[ns, UTC]'
+CATEGORY = 'category'
+
+
+# ============================================================================
+# SCHEMAS
+# ============================================================================
+
+PLAYER_SCHEMA = {
+    # Summary
+    'Date': DATE,
+    'Day': CATEGORY,
+    'Matchweek': 'int8',
+    'Venue': CATEGORY,
+    'Result': CATEGORY,
+    'Team': CATEGORY,
+    'Opponent': CATEGORY,
+    'Start': CATEGORY,
+    'Position': CATEGORY,
+    'Minutes Played': 'int8',
+    'Goals': 'int8',
+    'Assists': 'int8',
+    'Penalties Scored': 'int8',
+    'Penalties Attempted': 'int8',
+    'Shots': 'int8',
+    'Shots on Target': 'int8',
+    'Yellow Cards': 'int8',
+    'Red Cards': 'int8',
+    'Touches': 'int16',
+    'Tackles': 'int8',
+    'Interceptions': 'int8',
+    'Blocks': 'int8',
+    'xG': 'float32',
+    'npxG': 'float32',
+    'xAG': 'float32',
+    'Shot Creating Actions': 'int8',
+    'Goal Creating Actions': 'int8',
+    'Passes Completed': 'int16',
+    'Passes Attempted': 'int16',
+    'Progressive Passes': 'int8',
+    'Carries': 'int16',
+    'Progressive Carries': 'int8',
+    'Take-ons Attempted': 'int8',
+    'Successful Take-ons': 'int8',
+
+    # Passing
+    'Passing Distance': 'int16',
+    'Progressive Passing Distance': 'int16',
+    'Short Passes Completed': 'int16',
+    'Short Passes Attempted': 'int16',
+    'Medium Passes Completed': 'int16',
+    'Medium Passes Attempted': 'int16',
+    'Long Passes Completed': 'int8',
+    'Long Passes Attempted': 'int8',
+    'Expected Assists': 'float32',
+    'Key Passes': 'int8',
+    'Passes into Final Third': 'int8',
+    'Passes into Penalty Area': 'int8',
+    'Crosses into Penalty Area': 'int8',
+
+    # Pass types
+    'Live Pass': 'int16',
+    'Dead Pass': 'int8',
+    'Free Kick Pass': 'int8',
+    'Through Balls': 'int8',
+    'Switches': 'int8',
+    'Crosses': 'int8',
+    'Throw Ins Taken': 'int8',
+    'Corners Taken': 'int8',
+    'Passes Offside': 'int8',
+
+    # Goal and shot creation
+    'Live SCA': 'int8',
+    'Deadball SCA': 'int8',
+    'Take-on SCA': 'int8',
+    'Shot SCA': 'int8',
+    'Foul SCA': 'int8',
+    'Defense SCA': 'int8',
+    'Live GCA': 'int8',
+    'Deadball GCA': 'int8',
+    'Take-on GCA': 'int8',
+    'Shot GCA': 'int8',
+    'Foul GCA': 'int8',
+    'Defense GCA': 'int8',
+
+    # Defense
+    'Tackles Won': 'int8',
+    'Defensive Third Tackles': 'int8',
+    'Middle Third Tackles': 'int8',
+    'Attacking Third Tackles': 'int8',
+    'Dribblers Tackled': 'int8',
+    'Dribblers Tackled Attempts': 'int8',
+    'Challenges Lost': 'int8',
+    'Shots Blocked': 'int8',
+    'Passes Blocked': 'int8',
+    'Clearances': 'int8',
+    'Defensive Errors': 'int8',
+
+    # Possession
+    'Defensive Penalty Area Touches': 'int8',
+    'Defensive Third Touches': 'int16',
+    'Middle Third Touches': 'int16',
+    'Attacking Third Touches': 'int16',
+    'Penalty Area Touches': 'int8',
+    'Carry Distance': 'float32',
+    'Progressive Carry Distance': 'float32',
+    'Final Third Carries': 'int8',
+    'Carries into Penalty Area': 'int8',
+    'Miscontrols': 'int8',
+    'Dispossessed': 'int8',
+    'Passes Received': 'int16',
+    'Progressive Passes Received': 'int8',
+
+    # FPL gameweek data
+    'bonus': 'int8',
+    'bps': 'int16',
+    'clean_sheets': 'int8',
+    'creativity': 'float32',
+    'ict_index': 'float32',
+    'influence': 'float32',
+    'kickoff_time': DATETIME_UTC,
+    'minutes': 'int8',
+    'own_goals': 'int8',
+    'round': 'int8',
+    'saves': 'int8',
+    'selected': 'int32',
+    'threat': 'float32',
+    'total_points': 'int8',
+    'transfers_balance': 'int32',
+    'transfers_in': 'int32',
+    'transfers_out': 'int32',
+    'value': 'int16',
+    'kickoff_date': DATE,
+}
+
+TEAM_SCHEMA = {
+    'Date': DATE,
+    'Time': CATEGORY,
+    'Matchweek': 'int8',
+    'Day': CATEGORY,
+    'Venue': CATEGORY,
+    'Result': CATEGORY,
+    'Goals Scored': 'int8',
+    'Goals Conceded': 'int8',
+    'Opponent': CATEGORY,
+    'xG': 'float32',
+    'xGA': 'float32',
+    'Possession': 'int8',
+    'Attendance': 'int32',
+    'Captain': CATEGORY,
+    'Formation': CATEGORY,
+    'Opposition Formation': CATEGORY,
+    'Referee': CATEGORY,
+    'Team': CATEGORY,
+}
+
+
+# ============================================================================
+# CONVERSION
+# ============================================================================
+
+def _fit_int(low, high, dtype):
+    """Return the declared integer dtype, or the next wider one that holds low..high."""
+    for candidate in ('int8', 'int16', 'int32', 'int64'):
+        if np.dtype(candidate).itemsize < np.dtype(dtype).itemsize:
+            continue
+        info = np.iinfo(candidate)
+        if info.min <= low and high <= info.max:
+            return candidate
+    return 'int64'
+
+
+def _parse_numeric(values):
+    """Scraped cells arrive as text; Attendance is written with thousands separators."""
+    return pd.to_numeric(values.astype(str).str.replace(',', '', regex=False).replace('', '0'))
+
+
+def convert_column(values, dtype):
+    """Convert one Series to a schema dtype."""
+    if dtype == DATE:
+        return pd.to_datetime(values)
+    if dtype == DATETIME_UTC:
+        return pd.to_datetime(values, utc=True)
+    if dtype == CATEGORY:
+        return values.astype(CATEGORY)
+
+    if not pd.api.types.is_numeric_dtype(values):
+        values = _parse_numeric(values)
+    if dtype.startswith('float'):
+        return values.astype(dtype)
+    if values.isna().any() or (values % 1 != 0).any():
+        return values.astype('float32')
+    return values.astype(_fit_int(values.min(), values.max(), dtype))
+
+
+def apply_schema(df, schema=PLAYER_SCHEMA):
+    """
+    Return df with every column listed in schema converted to its compact dtype.
+
+    Numeric columns are range-checked and cast a block of columns at a time
+    (one astype per target dtype rather than one per column), since a player
+    frame has ~100 of them.
+    """
+    with stage('typing', rows=len(df), columns=len(df.columns)):
+        blocks = []
+        numeric = {}
+        for column in df.columns:
+            dtype = schema.get(column)
+            if dtype is None:
+                blocks.append(df[[column]])
+            elif dtype in (DATE, DATETIME_UTC, CATEGORY):
+                blocks.append(convert_column(df[column], dtype).to_frame())
+            else:
+                values = df[column]
+                numeric[column] = (values if pd.api.types.is_numeric_dtype(values) else _parse_numeric(values), dtype)
+
+        if numeric:
+            frame = pd.DataFrame({column: values for column, (values, _) in numeric.items()}, index=df.index)
+            lows, highs = frame.min(), frame.max()
+            inexact = frame.isna().any() | (frame % 1 != 0).any()
+            targets = {}
+            for column, (_, dtype) in numeric.items():
+                if not dtype.startswith('float'):
+                    dtype = 'float32' if inexact[column] else _fit_int(lows[column], highs[column], dtype)
+                targets.setdefault(dtype, []).append(column)
+            blocks += [frame[columns].astype(dtype) for dtype, columns in targets.items()]
+
+        # Concatenating whole blocks keeps like dtypes consolidated
+        return pd.concat(blocks, axis=1)[list(df.columns)] if blocks else df.copy()
+
+
+def memory_mb(df):
+    """Deep memory usage of a frame in MB."""
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def memory_report(before, after, label='frame'):
+    """Print the memory footprint of a frame before and after apply_schema."""
+    old, new = memory_mb(before), memory_mb(after)
+    saved = 100 * (1 - new / old) if old else 0
+    print(f"  Memory ({label}): {old:.1f} MB -> {new:.1f} MB ({saved:.0f}% smaller)", flush=True)
+
+
+# ============================================================================
+# LOADERS
+# ============================================================================
+
+def read_player_csv(path, usecols=None, schema=PLAYER_SCHEMA):
+    """Read a player CSV (individual or compiled) straight into compact dtypes."""
+    df = pd.read_csv(path, usecols=usecols)
+    df = df.drop(columns=[c for c in df.columns if str(c).startswith('Unnamed')])
+    return apply_schema(df, schema)
+
+
+def read_team_csv(path='team_finaldat.csv', usecols=None):
+    """Read team_finaldat.csv into compact dtypes."""
+    return read_player_csv(path, usecols=usecols, schema=TEAM_SCHEMA)
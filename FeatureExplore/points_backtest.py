@@ -0,0 +1,280 @@
+"""
+Walk-forward backtest of the PointsModel goals regressor on the compiled data.
+
+The notebook scores the model with cross_val_score(cv=10) on one CSV, so
+every fold trains on matches played after the ones it predicts. Here the
+model is used the way it is week to week: for each FPL gameweek (round) of
+each season it is trained on every match kicked off before that gameweek's
+first match, predicts the gameweek, and is scored on
+
+- rmse: RMSE of the predicted goals over the gameweek's player-matches
+- baseline_rmse: RMSE of predicting the training mean, for reference
+- capture: FPL points of the top_n players by predicted goals, as a share
+  of the points of the gameweek's best top_n players
+
+The feature matrix is built once by points_pipeline.preprocess (cached on
+disk) and sorted by kickoff time, so each gameweek's training set is a
+prefix view of the same float32 array and no fold copies or recomputes
+features. Retraining is incremental by default: a random forest with
+warm_start grows update_trees new trees on the data to date each gameweek
+and keeps only its newest forest_size trees, which costs a tenth of a full
+refit per gameweek. refit_every=N with update_trees=0 refits from scratch
+every N gameweeks instead.
+
+The features are the notebook's, except for the two it computes from
+information not known before kickoff, which are replaced:
+
+- 'Designated Penalty Taker' (penalty shares over the whole file) comes
+  from the player's earlier seasons only
+- 'Minutes Played' in the predicted match becomes 'Previous Minutes
+  Played', the player's minutes in their previous match (0 for a first)
+
+Usage (from the repo root):
+    python FeatureExplore/points_backtest.py                          # att_finaldat, all seasons
+    python FeatureExplore/points_backtest.py --seasons 2022-2023 2023-2024 --output backtest.csv
+    python FeatureExplore/points_backtest.py --update-trees 0 --refit-every 5
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from points_pipeline import KEY_COLUMNS, POINTS_CACHE_DIR, preprocess
+
+
+TARGET = 'Goals'
+PLAYER_INPUT = 'att_finaldat'
+RANDOM_STATE = 66
+# Final random forest of the PointsModel notebook
+MODEL_PARAMS = {'n_estimators': 350, 'max_depth': 10, 'min_samples_split': 4}
+UPDATE_TREES = 35
+TOP_N = 10
+MIN_TRAIN_SEASONS = 1
+
+
+# ============================================================================
+# DATA
+# ============================================================================
+
+class BacktestData:
+    """Feature matrix sorted by kickoff time, with each row's season, gameweek and FPL points."""
+
+    def __init__(self, frame):
+        frame = frame.sort_values(['kickoff_time', 'Season', 'Gameweek'], kind='stable').reset_index(drop=True)
+        self.meta = frame[['Season', 'Gameweek', 'kickoff_time', 'Player ID', 'total_points']]
+        self.feature_columns = [c for c in frame.columns if c not in KEY_COLUMNS + [TARGET, 'Gameweek', 'total_points']]
+        self.X = np.ascontiguousarray(frame[self.feature_columns].to_numpy(dtype='float32'))
+        self.y = frame[TARGET].to_numpy(dtype='float64')
+        self.points = frame['total_points'].to_numpy(dtype='float64')
+        self.times = frame['kickoff_time'].to_numpy(dtype='datetime64[ns]')
+
+        steps = frame.groupby(['Season', 'Gameweek'], sort=True).indices
+        self.steps = [(season, int(gameweek), rows) for (season, gameweek), rows in steps.items()]
+        self.seasons = sorted(frame['Season'].unique())
+
+    def train_end(self, rows):
+        """Number of leading rows kicked off before the first match of a gameweek."""
+        return int(np.searchsorted(self.times, self.times[rows].min(), side='left'))
+
+
+def _season_start(kickoff_time):
+    # August cutoff, as points_pipeline.season_label
+    return kickoff_time.dt.year - (kickoff_time.dt.month < 8)
+
+
+def prior_penalty_takers(players):
+    """
+    Player ID, season start year and the player's share of their teams'
+    penalties over the team-seasons in which they took any, counting that
+    season and every earlier one (DesigPenTaker's share, accumulated).
+    """
+    df = pd.DataFrame({'Player ID': players['Player ID'].astype(str), 'Team': players['Team'],
+                       'start': _season_start(pd.to_datetime(players['kickoff_time'], utc=True)),
+                       'Penalties Attempted': pd.to_numeric(players['Penalties Attempted'], errors='coerce')})
+    team_penalties = df.groupby(['start', 'Team'])['Penalties Attempted'].sum().rename('Team Penalties')
+    taken = df[df['Penalties Attempted'] > 0]
+    taken = taken.groupby(['Player ID', 'start', 'Team'], as_index=False)['Penalties Attempted'].sum()
+    taken = taken.join(team_penalties, on=['start', 'Team'])
+    seasons = taken.groupby(['Player ID', 'start'], as_index=False)[['Penalties Attempted', 'Team Penalties']].sum()
+    totals = seasons.groupby('Player ID')[['Penalties Attempted', 'Team Penalties']].cumsum()
+    return seasons[['Player ID', 'start']].assign(share=totals['Penalties Attempted'] / totals['Team Penalties'])
+
+
+def previous_minutes(players):
+    """Player ID, kickoff_time and the minutes the player played in their previous match."""
+    df = pd.DataFrame({'Player ID': players['Player ID'].astype(str),
+                       'kickoff_time': pd.to_datetime(players['kickoff_time'], utc=True),
+                       'minutes': pd.to_numeric(players['Minutes Played'], errors='coerce')})
+    df = df.drop_duplicates(['Player ID', 'kickoff_time']).sort_values(['Player ID', 'kickoff_time'])
+    previous = df.groupby('Player ID')['minutes'].shift(1).fillna(0)
+    return df[['Player ID', 'kickoff_time']].assign(**{'Previous Minutes Played': previous})
+
+
+def without_lookahead(features, players):
+    """Replace the two features the pipeline computes with information from after kickoff."""
+    features = features.assign(start=_season_start(features['kickoff_time']))
+    takers = prior_penalty_takers(players).sort_values('start')
+    # The share from the player's seasons strictly before the row's
+    features = pd.merge_asof(features.sort_values('start'), takers, on='start', by='Player ID',
+                             allow_exact_matches=False)
+    features['Designated Penalty Taker'] = (features['share'] > 0.5).astype(int)
+    features = features.drop(columns=['Minutes Played', 'start', 'share'])
+    return features.merge(previous_minutes(players), on=['Player ID', 'kickoff_time'], how='left')
+
+
+def load_data(players_path=None, team_path=None, cache_dir=POINTS_CACHE_DIR):
+    """Build (or load from the cache) the backtest matrix for a compiled player file."""
+    if players_path is None:
+        players_path = next((p for p in (f'{PLAYER_INPUT}.parquet', f'{PLAYER_INPUT}.csv') if os.path.exists(p)), None)
+        if players_path is None:
+            raise FileNotFoundError(f"{PLAYER_INPUT}.parquet/.csv not found; run "
+                                    f"python FeatureExplore/compile_defender_data.py --role att")
+    players = pd.read_parquet(players_path) if players_path.endswith('.parquet') else pd.read_csv(players_path)
+    players = players.drop(columns=[c for c in players.columns if str(c).startswith('Unnamed')])
+    kwargs = {'team_path': team_path} if team_path else {}
+    features = preprocess(players, cache_dir=cache_dir, keep_keys=True, **kwargs)
+
+    # FPL gameweek and points for each player-match, joined back on (player, kickoff)
+    gameweek = 'round' if 'round' in players.columns else 'Matchweek'
+    extras = players[['Player ID', 'kickoff_time', gameweek, 'total_points']].rename(columns={gameweek: 'Gameweek'})
+    extras = extras.assign(**{'Player ID': extras['Player ID'].astype(str),
+                              'kickoff_time': pd.to_datetime(extras['kickoff_time'], utc=True)})
+    features = features.assign(**{'Player ID': features['Player ID'].astype(str),
+                                  'kickoff_time': pd.to_datetime(features['kickoff_time'], utc=True)})
+    features = without_lookahead(features, players)
+    frame = features.merge(extras.drop_duplicates(['Player ID', 'kickoff_time']),
+                           on=['Player ID', 'kickoff_time'], how='left')
+    return BacktestData(frame.dropna(subset=['Gameweek']))
+
+
+# ============================================================================
+# WALK-FORWARD
+# ============================================================================
+
+def make_model(params=None, update_trees=UPDATE_TREES, n_jobs=-1):
+    """The notebook's random forest; warm-started when update_trees > 0."""
+    params = {**MODEL_PARAMS, **(params or {})}
+    return RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=n_jobs, warm_start=update_trees > 0, **params)
+
+
+def _update(model, X, y, update_trees, forest_size, step):
+    """Grow update_trees trees on (X, y) and keep the newest forest_size."""
+    if not hasattr(model, 'estimators_'):
+        return model.fit(X, y)
+    # A fresh seed per step: the trimmed forest always has forest_size trees, so
+    # warm_start alone would hand every batch of new trees the same seeds
+    model.random_state = RANDOM_STATE + step
+    model.n_estimators = len(model.estimators_) + update_trees
+    model.fit(X, y)
+    model.estimators_ = model.estimators_[-forest_size:]
+    model.n_estimators = len(model.estimators_)
+    return model
+
+
+def capture(predicted, points, top_n=TOP_N):
+    """Points of the top_n players by prediction over the points of the best top_n."""
+    top_n = min(top_n, len(points))
+    picked = points[np.argsort(-predicted, kind='stable')[:top_n]].sum()
+    best = np.sort(points)[::-1][:top_n].sum()
+    return picked / best if best > 0 else np.nan
+
+
+def walk_forward(data, params=None, seasons=None, min_train_seasons=MIN_TRAIN_SEASONS, update_trees=UPDATE_TREES,
+                 refit_every=1, top_n=TOP_N, n_jobs=-1, verbose=True):
+    """
+    Score every gameweek of seasons (default: all after the first
+    min_train_seasons) with a model trained on the matches before it.
+    Returns one row per gameweek.
+    """
+    first_season = data.seasons[min_train_seasons] if len(data.seasons) > min_train_seasons else None
+    seasons = seasons or [s for s in data.seasons if first_season is not None and s >= first_season]
+    model = make_model(params, update_trees, n_jobs)
+    forest_size = model.n_estimators
+    rows_out = []
+    since_fit = None
+    for step, (season, gameweek, rows) in enumerate(data.steps):
+        if season not in seasons:
+            continue
+        end = data.train_end(rows)
+        start = time.time()
+        if update_trees:
+            model = _update(model, data.X[:end], data.y[:end], update_trees, forest_size, step)
+        elif since_fit is None or since_fit >= refit_every:
+            model = make_model(params, 0, n_jobs).fit(data.X[:end], data.y[:end])
+            since_fit = 0
+        if not update_trees:
+            since_fit += 1
+        fit_seconds = time.time() - start
+
+        predicted = model.predict(data.X[rows])
+        actual = data.y[rows]
+        rows_out.append({
+            'season': season, 'gameweek': gameweek, 'train_rows': end, 'test_rows': len(rows),
+            'rmse': float(np.sqrt(np.mean((predicted - actual) ** 2))),
+            'baseline_rmse': float(np.sqrt(np.mean((data.y[:end].mean() - actual) ** 2))),
+            'capture': capture(predicted, data.points[rows], top_n),
+            'fit_seconds': round(fit_seconds, 2),
+        })
+        if verbose:
+            r = rows_out[-1]
+            print(f"  {season} GW{gameweek:>2}: RMSE {r['rmse']:.3f} (baseline {r['baseline_rmse']:.3f}), "
+                  f"capture {r['capture']:.0%}  [{r['train_rows']:,} train rows, {fit_seconds:.1f}s]", flush=True)
+    return pd.DataFrame(rows_out)
+
+
+def summarize(results):
+    """Per-season means of the gameweek scores."""
+    return results.groupby('season').agg(gameweeks=('gameweek', 'count'), rmse=('rmse', 'mean'),
+                                         baseline_rmse=('baseline_rmse', 'mean'), capture=('capture', 'mean'),
+                                         fit_seconds=('fit_seconds', 'sum'))
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Walk-forward backtest of the points model by gameweek.')
+    parser.add_argument('--players', default=None, help=f'Compiled player file (default: {PLAYER_INPUT}.parquet/.csv)')
+    parser.add_argument('--team-data', default=None, help='Team match data (default: team_finaldat.csv)')
+    parser.add_argument('--seasons', nargs='+', default=None, help="Seasons to score, e.g. 2023-2024 (default: all "
+                        f"but the first {MIN_TRAIN_SEASONS})")
+    parser.add_argument('--update-trees', type=int, default=UPDATE_TREES,
+                        help=f'Trees added per gameweek; 0 refits from scratch (default: {UPDATE_TREES})')
+    parser.add_argument('--refit-every', type=int, default=1, help='Gameweeks between full refits with --update-trees 0')
+    parser.add_argument('--top-n', type=int, default=TOP_N, help=f'Players picked per gameweek for capture (default: {TOP_N})')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel workers for fitting (default: all cores)')
+    parser.add_argument('--output', default=None, help='Write the per-gameweek results to this CSV')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    start = time.time()
+    data = load_data(args.players, args.team_data)
+    print("=" * 70)
+    print(f"WALK-FORWARD BACKTEST ({len(data.y):,} player-matches, {len(data.steps)} gameweeks, "
+          f"{time.time() - start:.1f}s to load)")
+    print("=" * 70)
+
+    results = walk_forward(data, seasons=args.seasons, update_trees=args.update_trees,
+                           refit_every=args.refit_every, top_n=args.top_n, n_jobs=args.jobs)
+    if results.empty:
+        print("No gameweeks to score")
+        return
+    print()
+    print(summarize(results).round(3).to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\n✓ Saved per-gameweek results to: {args.output}")
+    print(f"\nTotal: {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Feature pipeline for the PointsModel goals regressor.
+
+The transformers used to live in PointsModel/Data Processing and Model
+Training.ipynb, where RollingxG, RollingSOT and RollingPAT filtered the whole
+frame once per row (df.apply over ~40k player-matches) and
+RollingxG_Matchup looked up every fixture's opponent in a Python loop, so
+building the training matrix took longer than fitting the models. The
+classes below keep the notebook's names and step order, and compute the same
+features with vectorized group operations:
+
+- Rolling xG / Shots on Target / Penalty Area Touches: mean per match over
+  the player's matches kicked off between 365 days and 1 day before, found
+  with two searchsorted calls on the (player, kickoff_time) order
+- Designated Penalty Taker: players who took more than half of their teams'
+  penalties in the seasons they took any
+- Team Rolling xG Matchup: team's minus opponent's season-to-date xG
+  difference, from team_finaldat.csv
+
+All steps are stateless (fit returns self), so the transformed matrix only
+depends on the input frame. preprocess caches it in .points_cache/, keyed by
+a hash of the input rows, team_finaldat.csv and PIPELINE_VERSION, and every
+CV fold, grid point and Optuna trial in points_training reuses it.
+
+Usage:
+    from points_pipeline import make_pipeline, preprocess
+    att_train_processed = preprocess(att_train)           # cached
+    att_train_processed = make_pipeline().fit_transform(att_train)
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.pipeline import FunctionTransformer, Pipeline
+
+from dataset_store import TEAM_FILE
+
+
+POINTS_CACHE_DIR = '.points_cache'
+PIPELINE_VERSION = 2
+
+SELECTED_COLUMNS = ['Player ID', 'Team', 'Opponent', 'Venue', 'Goals', 'Minutes Played', 'Position',
+                    'kickoff_time', 'Penalties Attempted', 'Shots on Target', 'npxG', 'Penalty Area Touches']
+POSITION_GROUPS = {
+    'Defender': ['RB', 'LB', 'CB'],
+    'Midfielder': ['DM', 'CM', 'LM', 'RM', 'AM'],
+    'Attacker': ['LW', 'RW', 'FW'],
+}
+KEY_COLUMNS = ['Player ID', 'Team', 'Opponent', 'kickoff_time', 'Season']
+DROPPED_POSITIONS = ['RB', 'LB', 'CB', 'DM', 'CM', 'LM', 'RM', 'LW', 'RW', 'AM', 'FW', 'WB']
+ROLLING_DAYS = 365
+
+
+def select_columns(dataframe):
+    """Select the columns the pipeline needs."""
+    return dataframe[SELECTED_COLUMNS].copy()
+
+
+def season_label(kickoff_time):
+    """'YYYY-YYYY' season (August cutoff) for a datetime Series, as in the notebook."""
+    start = kickoff_time.dt.year - (kickoff_time.dt.month < 8)
+    return start.astype(str) + '-' + (start + 1).astype(str)
+
+
+def trailing_mean(X, column, group='Player ID', time='kickoff_time', days=ROLLING_DAYS):
+    """
+    Mean of column over each row's group matches with time in
+    [time - days, time - 1 day], NaN when there are none. NaNs count as
+    matches but add nothing to the sum, as in the notebook's
+    player_data[column].sum() / player_data.shape[0].
+
+    X must be sorted by (group, time).
+    """
+    groups = pd.factorize(X[group])[0].astype('int64')
+    seconds = X[time].to_numpy(dtype='datetime64[s]').astype('int64')
+    span = int(seconds.max() - seconds.min()) + 2 * days * 86400 + 1 if len(X) else 1
+    keys = groups * span + (seconds - (seconds.min() if len(X) else 0))
+    lo = np.searchsorted(keys, keys - days * 86400, side='left')
+    hi = np.searchsorted(keys, keys - 86400, side='right')
+    values = pd.to_numeric(X[column], errors='coerce').to_numpy(dtype='float64')
+    totals = np.r_[0.0, np.cumsum(np.nan_to_num(values))]
+    counts = hi - lo
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, (totals[hi] - totals[lo]) / np.maximum(counts, 1), np.nan)
+
+
+# ============================================================================
+# TRANSFORMERS
+# ============================================================================
+
+class DropEmptyPositions(BaseEstimator, TransformerMixin):
+    """Drop rows with empty 'Position' ('0' in the CSVs, missing in the compiled Parquet)."""
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return X[(X['Position'] != '0') & X['Position'].notna()]
+
+
+class PositionEncoder(BaseEstimator, TransformerMixin):
+    """One-hot encode 'Position' into Defender / Midfielder / Attacker."""
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        positions_encode = X['Position'].str.get_dummies(sep=',')
+        for group, positions in POSITION_GROUPS.items():
+            present = [p for p in positions if p in positions_encode.columns]
+            positions_encode[group] = positions_encode[present].any(axis=1).astype(int)
+        positions_encode = positions_encode.drop(columns=DROPPED_POSITIONS, errors='ignore')
+        X = X.drop('Position', axis=1)
+        return pd.concat([X.reset_index(drop=True), positions_encode.reset_index(drop=True)], axis=1)
+
+
+class SeasonDeterminer(BaseEstimator, TransformerMixin):
+    """Parse 'kickoff_time' and add 'Season'."""
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        X['kickoff_time'] = pd.to_datetime(X['kickoff_time'])
+        X['Season'] = season_label(X['kickoff_time'])
+        return X
+
+
+class DesigPenTaker(BaseEstimator, TransformerMixin):
+    """
+    'Designated Penalty Taker': 1 for players who took more than half of the
+    penalties of the team-seasons in which they took any.
+    """
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        team_penalties = X.groupby(['Season', 'Team'])['Penalties Attempted'].sum().rename('Team Penalties')
+        taken = X[X['Penalties Attempted'] > 0]
+        taken = taken.groupby(['Team', 'Season', 'Player ID'], as_index=False)['Penalties Attempted'].sum()
+        taken = taken.join(team_penalties, on=['Season', 'Team'])
+        summary = taken.groupby('Player ID')[['Penalties Attempted', 'Team Penalties']].sum()
+        takers = summary.index[summary['Penalties Attempted'] / summary['Team Penalties'] > 0.5]
+        X['Designated Penalty Taker'] = X['Player ID'].isin(takers).astype(int)
+        return X.drop('Penalties Attempted', axis=1)
+
+
+class RollingFeature(BaseEstimator, TransformerMixin):
+    """Replace column with its 365-day trailing per-player mean, named output."""
+
+    column = None
+    output = None
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        X.sort_values(by=['Player ID', 'kickoff_time'], inplace=True)
+        X.reset_index(drop=True, inplace=True)
+        X[self.output] = trailing_mean(X, self.column)
+        return X.drop(self.column, axis=1)
+
+
+class RollingxG(RollingFeature):
+    """'Rolling xG' from npxG."""
+    column, output = 'npxG', 'Rolling xG'
+
+
+class RollingSOT(RollingFeature):
+    """'Rolling Shots on Target'."""
+    column, output = 'Shots on Target', 'Rolling Shots on Target'
+
+
+class RollingPAT(RollingFeature):
+    """'Rolling Penalty Area Touches'."""
+    column, output = 'Penalty Area Touches', 'Rolling Penalty Area Touches'
+
+
+class RollingxG_Matchup(BaseEstimator, TransformerMixin):
+    """
+    'Team Rolling xG' and 'Team Rolling xG Matchup': the team's season-to-date
+    xG difference minus the opponent's in the reverse fixture's rows.
+    """
+
+    def __init__(self, team_path=TEAM_FILE):
+        self.team_path = team_path
+
+    def fit(self, X, y=None):
+        return self
+
+    def team_form(self):
+        """Season-to-date (previous matches) xG, xGA and xG difference per team."""
+        team_finaldat = pd.read_csv(self.team_path, index_col=0)
+        team_finaldat['Date'] = pd.to_datetime(team_finaldat['Date'])
+        team_finaldat['Season'] = season_label(team_finaldat['Date'])
+        team_finaldat = team_finaldat.sort_values(by=['Team', 'Date']).reset_index(drop=True)
+        team_finaldat['Team xG Difference'] = team_finaldat['xG'] - team_finaldat['xGA']
+        grouped = team_finaldat.groupby(['Team', 'Season'], sort=False)
+        count = grouped.cumcount() + 1
+        for column, output in (('xG', 'Team Rolling xG'), ('xGA', 'Team Rolling xGA'),
+                               ('Team xG Difference', 'Team Rolling xG Difference')):
+            cumulative = grouped[column].cumsum()
+            team_finaldat[output] = (cumulative.groupby([team_finaldat['Team'], team_finaldat['Season']]).shift(1)
+                                     / count.groupby([team_finaldat['Team'], team_finaldat['Season']]).shift(1))
+        return team_finaldat
+
+    def transform(self, X):
+        keys = ['Season', 'Venue', 'Team', 'Opponent']
+        columns = ['Team Rolling xG', 'Team Rolling xGA', 'Team Rolling xG Difference']
+        merged_df = X.merge(self.team_form()[keys + columns], on=keys, how='left')
+        for column in columns:
+            X[column] = merged_df[column]
+
+        # Each fixture side takes its value if its rows agree on one, then the reverse fixture's
+        fixture = ['Team', 'Opponent', 'Season', 'Venue']
+        sides = X.groupby(fixture, sort=False)['Team Rolling xG Difference'].nunique().to_frame('nunique')
+        firsts = X.drop_duplicates(fixture).set_index(fixture)['Team Rolling xG Difference']
+        sides['value'] = firsts.reindex(sides.index).where(sides['nunique'] == 1)
+        sides = sides.reset_index()
+        opposite = sides.assign(Team=sides['Opponent'], Opponent=sides['Team'],
+                                Venue=sides['Venue'].map({'Home': 'Away', 'Away': 'Home'}))
+        sides = sides.merge(opposite[fixture + ['value']].rename(columns={'value': 'opponent_value'}),
+                            on=fixture, how='left')
+        sides['Team Rolling xG Matchup'] = sides['value'] - sides['opponent_value']
+        X['Team Rolling xG Matchup'] = X[fixture].merge(sides[fixture + ['Team Rolling xG Matchup']],
+                                                        on=fixture, how='left')['Team Rolling xG Matchup'].to_numpy()
+        return X.drop(['Team Rolling xGA', 'Team Rolling xG Difference'], axis=1)
+
+
+class encodeVenue(BaseEstimator, TransformerMixin):
+    """'Venue': Home -> 0, Away -> 1."""
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        if 'Venue' in X.columns:
+            X['Venue'] = X['Venue'].astype(str).map({'Home': 0, 'Away': 1})
+        return X
+
+
+class DropFinal(BaseEstimator, TransformerMixin):
+    """Drop the columns only needed to build features."""
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return X.drop(KEY_COLUMNS, axis=1)
+
+
+class DropRow(BaseEstimator, TransformerMixin):
+    """Drop rows with NaNs."""
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return X.dropna()
+
+
+def make_pipeline(team_path=TEAM_FILE, keep_keys=False):
+    """
+    The notebook's preprocessing Pipeline. With keep_keys=True the KEY_COLUMNS
+    (player, match and season) stay in the output instead of being dropped.
+    """
+    steps = [
+        ('select', FunctionTransformer(select_columns)),
+        ('drop_empty_pos', DropEmptyPositions()),
+        ('encode_positions', PositionEncoder()),
+        ('determine_season', SeasonDeterminer()),
+        ('desig_pen_taker', DesigPenTaker()),
+        ('rolling_xg', RollingxG()),
+        ('rolling_sot', RollingSOT()),
+        ('rolling_pat', RollingPAT()),
+        ('rolling_xg_matchup', RollingxG_Matchup(team_path)),
+        ('encodeVenue', encodeVenue()),
+        ('drop_final', DropFinal()),
+        ('droprow', DropRow()),
+    ]
+    return Pipeline(steps=[step for step in steps if not (keep_keys and step[0] == 'drop_final')])
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def _cache_key(df, team_path, keep_keys):
+    digest = hashlib.sha256(f'version={PIPELINE_VERSION},keep_keys={keep_keys}'.encode())
+    digest.update(pd.util.hash_pandas_object(df[SELECTED_COLUMNS], index=False).to_numpy().tobytes())
+    with open(team_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def preprocess(df, team_path=TEAM_FILE, cache_dir=POINTS_CACHE_DIR, rebuild=False, keep_keys=False):
+    """make_pipeline(team_path, keep_keys).fit_transform(df), cached on disk by input content."""
+    path = os.path.join(cache_dir, f'features_{_cache_key(df, team_path, keep_keys)}.parquet')
+    if not rebuild and os.path.exists(path):
+        return pd.read_parquet(path)
+    processed = make_pipeline(team_path, keep_keys).fit_transform(df)
+    os.makedirs(cache_dir, exist_ok=True)
+    processed.to_parquet(f'{path}.tmp', index=False)
+    os.replace(f'{path}.tmp', path)
+    return processed
@@ -0,0 +1,359 @@
+"""
+Monte Carlo FPL points simulator for players and squads.
+
+The points model gives one number per player-match. For squad planning we
+want the spread: how often a player blanks, hauls, or beats another. This
+module samples whole gameweeks per player from their underlying rates:
+
+- minutes: no appearance / sub (<60) / 60+, from how often the player
+  played and completed 60 minutes recently
+- goals and assists: Poisson with the player's npxG and xAG per 90, scaled
+  by the expected minutes and by the fixture's FDR (FDR_FACTORS)
+- goals conceded: Poisson with the team's recent xGA scaled by FDR, drawn
+  once per team-match so teammates share clean sheets
+
+and turns each sample into FPL points (appearance, goals and assists by
+position, clean sheets, -1 per 2 goals conceded for GK/DEF; no bonus).
+
+All draws are NumPy batches of shape (n_sims, rows): counts are sampled by
+comparing one uniform per draw against precomputed Poisson CDFs, and
+per-row distributions are exact histograms from one bincount. 20,000
+simulations of a season's ~7,500 player fixtures take about 10s on one
+core (~30s for 600 players x 38 gameweeks). With group=...
+samples are also summed per group (a player's season, a squad) for every
+simulation, giving the distribution of the total rather than a sum of
+means.
+
+Usage:
+    from points_simulator import build_inputs, player_rates, season_fixtures, simulate
+    features = load_features()
+    inputs = build_inputs(player_rates(features, before='2023-08-01'), season_fixtures(features, '2023-24'))
+    sim = simulate(inputs, n_sims=20000, group='player_stem')
+    sim.rows       # per player-gameweek: mean, std, P(>=6), q10/q50/q90
+    sim.groups     # per player season total: mean, std, quantiles
+    sim.group_quantiles(['saka', 'salah'])   # a squad's combined distribution (by player_stem)
+
+    python FeatureExplore/points_simulator.py --season 2023-24 --sims 20000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_SIMS = 20000
+QUANTILES = (0.1, 0.5, 0.9)
+HAUL_POINTS = 6
+MAX_EVENTS = 8
+CHUNK_CELLS = 1 << 23
+ASSIST_POINTS = 3
+
+# FPL scoring by position: points per goal, per clean sheet, and whether
+# goals conceded cost points
+POSITION_POINTS = {
+    'GK': {'goal': 6, 'clean_sheet': 4, 'conceded': True},
+    'DEF': {'goal': 6, 'clean_sheet': 4, 'conceded': True},
+    'MID': {'goal': 5, 'clean_sheet': 1, 'conceded': False},
+    'FWD': {'goal': 4, 'clean_sheet': 0, 'conceded': False},
+}
+POSITIONS = list(POSITION_POINTS)
+
+# FBref position (first listed) -> FPL position
+FPL_POSITIONS = {
+    'GK': 'GK',
+    'CB': 'DEF', 'RB': 'DEF', 'LB': 'DEF', 'WB': 'DEF',
+    'DM': 'MID', 'CM': 'MID', 'LM': 'MID', 'RM': 'MID', 'AM': 'MID', 'LW': 'MID', 'RW': 'MID',
+    'FW': 'FWD',
+}
+
+# Rate multipliers by FDR relative to a player's average fixture: npxG and
+# xAG per 90 for the player's team, goals conceded for the team. Estimated
+# from the feature table (FDR 1 uses FDR 2); re-estimate with fdr_factors().
+FDR_FACTORS = pd.DataFrame({
+    'npxG': [1.0, 1.0, 0.96, 0.70, 0.48],
+    'xAG': [1.0, 1.0, 0.91, 0.62, 0.54],
+    'conceded': [0.77, 0.77, 1.02, 1.33, 1.93],
+}, index=pd.Index([1, 2, 3, 4, 5], name='FDR'))
+
+INPUT_COLUMNS = ['Player ID', 'player_stem', 'Gameweek', 'Team', 'position', 'FDR', 'npxG90', 'xAG90', 'p_play', 'p60',
+                 'sub_minutes', 'full_minutes', 'team_xGA']
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def fpl_position(positions):
+    """FPL position (GK/DEF/MID/FWD) from FBref 'Position' strings like 'LW,RW'."""
+    first = positions.astype(str).str.split(',').str[0].str.strip()
+    return first.map(FPL_POSITIONS).fillna('MID')
+
+
+def fdr_factors(features):
+    """FDR_FACTORS re-estimated from a feature table (feature_store.load_features)."""
+    played = features[features['Minutes Played'] > 0]
+    sums = played.groupby('FDR', observed=True)[['npxG', 'xAG', 'Minutes Played']].sum()
+    overall = played[['npxG', 'xAG']].sum() / played['Minutes Played'].sum()
+    factors = sums[['npxG', 'xAG']].div(sums['Minutes Played'], axis=0) / overall
+    teams = features.drop_duplicates(['Date', 'Team'])
+    factors['conceded'] = teams.groupby('FDR', observed=True)['Goals Conceded'].mean() / teams['Goals Conceded'].mean()
+    factors.index = factors.index.astype(int)
+    return factors.reindex(range(1, 6)).bfill().ffill().round(2)
+
+
+def player_rates(features, before=None, last_n=10):
+    """
+    Per-player rates from each player's last_n matches (before a date):
+    npxG90, xAG90, p_play, p60, sub_minutes, full_minutes, position, Team
+    and the team's mean xGA over its last_n matches.
+    """
+    history = features if before is None else features[features['Date'] < pd.Timestamp(before)]
+    history = history.sort_values('Date', kind='stable')
+    recent = history.groupby('Player ID', observed=True).tail(last_n)
+    minutes = recent['Minutes Played'].astype('float64')
+    recent = recent.assign(played=minutes > 0, full=minutes >= 60,
+                           sub=(minutes > 0) & (minutes < 60), minutes=minutes,
+                           sub_min=minutes.where((minutes > 0) & (minutes < 60)),
+                           full_min=minutes.where(minutes >= 60))
+    grouped = recent.groupby('Player ID', observed=True)
+    rates = pd.DataFrame({
+        'Team': grouped['Team'].last().astype(str),
+        'position': fpl_position(grouped['Position'].agg(lambda p: p.astype(str).mode().iloc[0])),
+        'npxG90': grouped['npxG'].sum() / grouped['minutes'].sum().clip(lower=1) * 90,
+        'xAG90': grouped['xAG'].sum() / grouped['minutes'].sum().clip(lower=1) * 90,
+        'p_play': grouped['played'].mean(),
+        'p60': grouped['full'].mean(),
+        'sub_minutes': grouped['sub_min'].mean().fillna(20),
+        'full_minutes': grouped['full_min'].mean().fillna(90),
+    })
+    teams = history.drop_duplicates(['Date', 'Team']).groupby('Team', observed=True).tail(last_n)
+    team_xga = teams.groupby('Team', observed=True)['xGA'].mean()
+    team_xga.index = team_xga.index.astype(str)
+    rates['team_xGA'] = rates['Team'].map(team_xga).astype('float64')
+    return rates.reset_index()
+
+
+def season_fixtures(features, season):
+    """Each player's matches in a season (FPL label) with player_stem, Gameweek, Team and FDR."""
+    rows = features[features['Season'].astype(str) == season]
+    fixtures = rows[['Player ID', 'player_stem', 'Matchweek', 'Team', 'FDR']].rename(columns={'Matchweek': 'Gameweek'})
+    return fixtures.assign(**{'Player ID': fixtures['Player ID'].astype(str),
+                              'player_stem': fixtures['player_stem'].astype(str), 'Team': fixtures['Team'].astype(str)})
+
+
+def build_inputs(rates, fixtures):
+    """One simulation row per player fixture: rates joined to (Player ID, player_stem, Gameweek, Team, FDR)."""
+    rates = rates.assign(**{'Player ID': rates['Player ID'].astype(str)})
+    inputs = fixtures.merge(rates.drop(columns=['Team']), on='Player ID', how='inner')
+    return inputs[INPUT_COLUMNS].reset_index(drop=True)
+
+
+# ============================================================================
+# SAMPLING
+# ============================================================================
+
+def poisson_cdf(lam, max_events=MAX_EVENTS):
+    """P(X <= k) for k = 0..max_events-1, one row per rate, as float32."""
+    lam = np.asarray(lam, dtype='float64')[:, None]
+    k = np.arange(max_events)
+    log_pmf = -lam + k * np.log(np.maximum(lam, 1e-300)) - np.cumsum(np.log(np.maximum(k, 1)))
+    return np.cumsum(np.exp(log_pmf), axis=1).astype('float32')
+
+
+def sample_counts(uniforms, cdf):
+    """Inverse-CDF Poisson counts: for each column j, #{k : u > cdf[j, k]}."""
+    counts = np.zeros(uniforms.shape, dtype='int8')
+    for k in range(cdf.shape[1]):
+        counts += uniforms > cdf[:, k]
+    return counts
+
+
+class Simulation:
+    """Per-row and per-group outcome distributions of one simulate() call."""
+
+    def __init__(self, rows, groups, totals, group_labels, quantiles):
+        self.rows = rows
+        self.groups = groups
+        self.totals = totals
+        self.group_labels = group_labels
+        self.quantiles = quantiles
+
+    def group_quantiles(self, labels, quantiles=None):
+        """Quantiles of the combined total of several groups (e.g. a squad), per simulation."""
+        columns = pd.Index(self.group_labels).get_indexer(labels)
+        if (columns < 0).any():
+            raise KeyError(f"Unknown groups: {[l for l, c in zip(labels, columns) if c < 0]}")
+        combined = self.totals[:, columns].sum(axis=1)
+        return pd.Series(np.quantile(combined, quantiles or self.quantiles), index=quantiles or self.quantiles)
+
+
+def _row_parameters(inputs, fdr_table):
+    fdr = inputs['FDR'].fillna(3).clip(1, 5).astype(int)
+    factors = fdr_table.reindex(fdr.to_numpy()).to_numpy()
+    positions = inputs['position'].map({p: i for i, p in enumerate(POSITIONS)}).fillna(POSITIONS.index('MID'))
+    points = pd.DataFrame(POSITION_POINTS).T.loc[POSITIONS]
+    position = positions.astype(int).to_numpy()
+    p_play = inputs['p_play'].to_numpy(dtype='float64')
+    return {
+        'p_play': p_play.astype('float32'),
+        'p60': np.minimum(inputs['p60'].to_numpy(dtype='float64'), p_play).astype('float32'),
+        'goal_sub': poisson_cdf(inputs['npxG90'] * factors[:, 0] * inputs['sub_minutes'] / 90),
+        'goal_full': poisson_cdf(inputs['npxG90'] * factors[:, 0] * inputs['full_minutes'] / 90),
+        'assist_sub': poisson_cdf(inputs['xAG90'] * factors[:, 1] * inputs['sub_minutes'] / 90),
+        'assist_full': poisson_cdf(inputs['xAG90'] * factors[:, 1] * inputs['full_minutes'] / 90),
+        'goal_points': points['goal'].to_numpy(dtype='int16')[position],
+        'clean_sheet_points': points['clean_sheet'].to_numpy(dtype='int16')[position],
+        'concede_penalty': points['conceded'].to_numpy(dtype=bool)[position],
+        'conceded_rate': inputs['team_xGA'].fillna(inputs['team_xGA'].mean()).to_numpy() * factors[:, 2],
+    }
+
+
+def _sample_points(rng, params, rows, n_sims, team_index, team_cdf):
+    """FPL points for n_sims simulations of the given rows, shape (n_sims, len(rows))."""
+    shape = (n_sims, len(rows))
+    minutes = rng.random(shape, dtype='float32')
+    played = minutes < params['p_play'][rows]
+    full = minutes < params['p60'][rows]
+
+    def events(sub_cdf, full_cdf):
+        # Most draws are 0, so only draws past P(X = 0) walk the rest of the CDF
+        cdf = np.stack([sub_cdf[rows], full_cdf[rows]])
+        u = rng.random(shape, dtype='float32')
+        first = np.where(full, cdf[1, :, 0], cdf[0, :, 0])
+        hits = np.flatnonzero((u > first) & played)
+        columns, state, u = hits % shape[1], full.ravel()[hits].astype(int), u.ravel()[hits]
+        found = np.ones(len(hits), dtype='int16')
+        for k in range(1, cdf.shape[2]):
+            found += u > cdf[state, columns, k]
+        counts = np.zeros(shape, dtype='int16')
+        counts.ravel()[hits] = found
+        return counts
+
+    goals = events(params['goal_sub'], params['goal_full'])
+    assists = events(params['assist_sub'], params['assist_full'])
+
+    # One goals-conceded draw per team-match, shared by its players
+    teams, local = np.unique(team_index[rows], return_inverse=True)
+    conceded = sample_counts(rng.random((n_sims, len(teams)), dtype='float32'), team_cdf[teams])[:, local]
+
+    points = played.astype('int16') + full
+    points += goals * params['goal_points'][rows] + assists * ASSIST_POINTS
+    points += (full & (conceded == 0)) * params['clean_sheet_points'][rows]
+    points -= (full & params['concede_penalty'][rows]) * (conceded // 2)
+    return points
+
+
+def simulate(inputs, n_sims=DEFAULT_SIMS, seed=None, quantiles=QUANTILES, group=None, fdr_table=FDR_FACTORS,
+             chunk_cells=CHUNK_CELLS):
+    """
+    Simulate every row of inputs (build_inputs) n_sims times.
+
+    Returns a Simulation with .rows (mean, std, P(points >= HAUL_POINTS)
+    and quantiles per row) and, with group set to an inputs column, .groups
+    (the same for each group's summed points) and .totals (n_sims x groups).
+    Rows are processed in chunks of about chunk_cells samples.
+    """
+    rng = np.random.default_rng(seed)
+    inputs = inputs.reset_index(drop=True)
+    params = _row_parameters(inputs, fdr_table)
+    team_keys = inputs['Team'].astype(str) + '|' + inputs['Gameweek'].astype(str)
+    team_index, team_labels = pd.factorize(team_keys)
+    team_rates = pd.Series(params['conceded_rate']).groupby(team_index).first().to_numpy()
+    team_cdf = poisson_cdf(team_rates)
+
+    # Rows sorted by group so each chunk's group sums are contiguous slices
+    if group is not None:
+        group_index, group_labels = pd.factorize(inputs[group].astype(str), sort=True)
+        order = np.argsort(group_index, kind='stable')
+        totals = np.zeros((n_sims, len(group_labels)), dtype='int32')
+    else:
+        group_labels, order, totals = None, np.arange(len(inputs)), None
+
+    # Histogram bins cover every reachable score: -MAX_EVENTS // 2 to 2 + goals + assists + clean sheet
+    offset = MAX_EVENTS // 2
+    most = max(p['goal'] + p['clean_sheet'] for p in POSITION_POINTS.values())
+    bins = offset + 2 + MAX_EVENTS * (most + ASSIST_POINTS) + 1
+    histogram = np.zeros((len(inputs), bins), dtype='int64')
+    chunk = max(1, chunk_cells // n_sims)
+    for start in range(0, len(order), chunk):
+        rows = order[start:start + chunk]
+        points = _sample_points(rng, params, rows, n_sims, team_index, team_cdf)
+        flat = (np.arange(len(rows)) * bins)[None, :] + np.clip(points + offset, 0, bins - 1)
+        histogram[rows] += np.bincount(flat.ravel(), minlength=len(rows) * bins).reshape(len(rows), bins)
+        if totals is not None:
+            ids = group_index[rows]
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            totals[:, ids[starts]] += np.add.reduceat(points, starts, axis=1, dtype='int32')
+
+    rows_summary = _histogram_summary(histogram, np.arange(bins) - offset, n_sims, quantiles)
+    rows_summary = pd.concat([inputs[['Player ID', 'player_stem', 'Gameweek', 'Team', 'position', 'FDR']],
+                              rows_summary], axis=1)
+    groups_summary = None
+    if totals is not None:
+        groups_summary = pd.DataFrame({'mean': totals.mean(axis=0), 'std': totals.std(axis=0)},
+                                      index=pd.Index(group_labels, name=group))
+        for q, values in zip(quantiles, np.quantile(totals, quantiles, axis=0)):
+            groups_summary[f'q{round(q * 100)}'] = values
+        groups_summary = groups_summary.reset_index()
+    return Simulation(rows_summary, groups_summary, totals, group_labels, quantiles)
+
+
+def _histogram_summary(histogram, values, n_sims, quantiles):
+    """Mean, std, P(>= HAUL_POINTS) and quantiles per row from per-row point histograms."""
+    probabilities = histogram / n_sims
+    mean = probabilities @ values
+    std = np.sqrt(np.maximum(probabilities @ values.astype('float64') ** 2 - mean ** 2, 0))
+    cumulative = np.cumsum(probabilities, axis=1)
+    summary = pd.DataFrame({'mean': mean, 'std': std, f'p_{HAUL_POINTS}plus': probabilities[:, values >= HAUL_POINTS].sum(axis=1)})
+    for q in quantiles:
+        summary[f'q{round(q * 100)}'] = values[np.argmax(cumulative >= q - 1e-12, axis=1)]
+    return summary
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Simulate FPL points for every player fixture of a season.')
+    parser.add_argument('--season', required=True, help="FPL season label, e.g. '2023-24'")
+    parser.add_argument('--sims', type=int, default=DEFAULT_SIMS, help=f'Simulations (default: {DEFAULT_SIMS})')
+    parser.add_argument('--last-n', type=int, default=10, help='Matches used for player rates (default: 10)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    parser.add_argument('--top', type=int, default=20, help='Players to list (default: 20)')
+    parser.add_argument('--output', default=None, help='Write the per-player season totals to this CSV')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    from feature_store import load_features
+
+    args = parse_args(argv)
+    features = load_features()
+    season_start = features.loc[features['Season'].astype(str) == args.season, 'Date'].min()
+    if pd.isna(season_start):
+        print(f"No {args.season} matches in the feature table")
+        return
+    inputs = build_inputs(player_rates(features, before=season_start, last_n=args.last_n),
+                          season_fixtures(features, args.season))
+
+    start = time.time()
+    # Grouped and labelled by file stem ('saka'); 'Player ID' is an opaque numeric id
+    sim = simulate(inputs, n_sims=args.sims, seed=args.seed, group='player_stem')
+    elapsed = time.time() - start
+    print("=" * 70)
+    print(f"SIMULATED {args.season}: {inputs['player_stem'].nunique()} players, {len(inputs):,} player fixtures "
+          f"x {args.sims:,} simulations in {elapsed:.1f}s")
+    print("=" * 70)
+    print(sim.groups.sort_values('q50', ascending=False).head(args.top).round(1).to_string(index=False))
+    if args.output:
+        sim.groups.to_csv(args.output, index=False)
+        print(f"\n✓ Saved per-player season totals to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
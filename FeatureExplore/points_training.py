@@ -0,0 +1,220 @@
+"""
+Parallel, resumable training and tuning for the PointsModel goals regressor.
+
+PointsModel/Data Processing and Model Training.ipynb ran 10-fold
+cross_val_score for each candidate model, two GridSearchCV sweeps and a
+20-trial Optuna study, all in one process, with every Optuna trial running
+all 10 folds of a 300-500 tree random forest even when its first folds were
+already worse than the best trial. This script runs the same searches:
+
+- the feature matrix is built once by points_pipeline.preprocess (cached on
+  disk by input content) and shared by every fold, grid point and trial
+- CV folds and grid points run in parallel (n_jobs, default all cores)
+- each Optuna trial scores its folds in parallel batches (n_jobs folds, but
+  never more than a third of them) and reports the running mean RMSE after
+  each batch, so MedianPruner stops a trial whose first batches are worse
+  than the median of earlier trials
+- the study lives in .points_cache/optuna.db (SQLite), so re-running with
+  the same --study name continues the search with the trials already done
+
+Folds are KFold(10) without shuffling and models use random_state=66, as in
+the notebook, so scores are comparable with it. Needs optuna for --trials
+and xgboost for the XGBRegressor baseline (skipped when missing).
+
+Usage (from the repo root):
+    python FeatureExplore/points_training.py --train PointsModel/att_explore_original.csv --compare
+    python FeatureExplore/points_training.py --train PointsModel/att_explore_original.csv --grid
+    python FeatureExplore/points_training.py --train PointsModel/att_explore_original.csv --trials 40 \\
+        --test PointsModel/att_test.csv
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import root_mean_squared_error
+from sklearn.model_selection import GridSearchCV, KFold, cross_val_score
+
+from points_pipeline import POINTS_CACHE_DIR, preprocess
+
+
+TARGET = 'Goals'
+CV_FOLDS = 10
+RANDOM_STATE = 66
+SCORING = 'neg_root_mean_squared_error'
+STUDY_NAME = 'points_rf'
+# Reports per Optuna trial at least; one batch of every fold would leave nothing to prune
+MIN_PRUNE_STEPS = 3
+
+# Search spaces from the notebook
+GRID_SEARCHES = [
+    {'n_estimators': [50, 100, 200, 300], 'max_depth': [None, 10, 20], 'min_samples_split': [2, 5]},
+    {'n_estimators': [300, 400, 500], 'max_depth': [10], 'min_samples_split': [2]},
+]
+OPTUNA_SPACE = {
+    'n_estimators': (300, 500, 50),
+    'max_depth': (1, 21, 5),
+    'min_samples_split': (2, 5, 1),
+}
+
+
+# ============================================================================
+# DATA
+# ============================================================================
+
+def load_xy(path, team_path=None):
+    """Read a player CSV and return (features, goals) from the cached pipeline output."""
+    kwargs = {'team_path': team_path} if team_path else {}
+    processed = preprocess(pd.read_csv(path, index_col=0), **kwargs)
+    return processed.drop(TARGET, axis=1), processed[TARGET]
+
+
+def baseline_models():
+    """Candidate regressors from the notebook; XGBRegressor only if xgboost is installed."""
+    models = {
+        'linear_regression': LinearRegression(),
+        'random_forest': RandomForestRegressor(n_estimators=100, random_state=RANDOM_STATE),
+    }
+    try:
+        from xgboost import XGBRegressor
+        models['xgboost'] = XGBRegressor(random_state=RANDOM_STATE)
+    except ImportError:
+        print("  (xgboost not installed, skipping XGBRegressor)")
+    return models
+
+
+# ============================================================================
+# CROSS-VALIDATION AND GRID SEARCH
+# ============================================================================
+
+def compare_models(X, y, models=None, cv=CV_FOLDS, n_jobs=-1):
+    """Mean and std of the 10-fold RMSE per model, folds in parallel."""
+    results = {}
+    for name, model in (models or baseline_models()).items():
+        start = time.time()
+        scores = -cross_val_score(model, X, y, cv=cv, scoring=SCORING, n_jobs=n_jobs)
+        results[name] = {'rmse': scores.mean(), 'std': scores.std(), 'seconds': time.time() - start}
+        print(f"  {name:20s} RMSE {scores.mean():.4f} (+/- {scores.std():.4f})  [{time.time() - start:.1f}s]")
+    return results
+
+
+def grid_search(X, y, param_grid, cv=CV_FOLDS, n_jobs=-1):
+    """GridSearchCV over a random forest with every (grid point, fold) fit in parallel."""
+    search = GridSearchCV(RandomForestRegressor(random_state=RANDOM_STATE), param_grid, cv=cv, scoring=SCORING,
+                          return_train_score=True, n_jobs=n_jobs)
+    search.fit(X, y)
+    return search
+
+
+# ============================================================================
+# OPTUNA
+# ============================================================================
+
+def _fold_rmse(model, X, y, train, test):
+    fitted = clone(model).fit(X.iloc[train], y.iloc[train])
+    return root_mean_squared_error(y.iloc[test], fitted.predict(X.iloc[test]))
+
+
+def objective(trial, X, y, folds, parallel, batch_size):
+    """Mean CV RMSE of one random forest trial, pruned between fold batches."""
+    import optuna
+
+    params = {name: trial.suggest_int(name, low, high, step=step)
+              for name, (low, high, step) in OPTUNA_SPACE.items()}
+    model = RandomForestRegressor(random_state=RANDOM_STATE, **params)
+    scores = []
+    for step, first in enumerate(range(0, len(folds), batch_size)):
+        batch = folds[first:first + batch_size]
+        scores += parallel(delayed(_fold_rmse)(model, X, y, train, test) for train, test in batch)
+        trial.report(float(np.mean(scores)), step)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+    return float(np.mean(scores))
+
+
+def tune(X, y, n_trials=20, study_name=STUDY_NAME, cache_dir=POINTS_CACHE_DIR, n_jobs=-1, cv=CV_FOLDS,
+         timeout=None):
+    """
+    Run (or resume) the persisted Optuna study for n_trials more trials.
+
+    Trials run one after another, each fitting up to n_jobs folds at a time
+    (capped so every trial reports at least MIN_PRUNE_STEPS times), so
+    pruning decisions always see the completed trials.
+    """
+    import optuna
+    from joblib import effective_n_jobs
+
+    os.makedirs(cache_dir, exist_ok=True)
+    study = optuna.create_study(study_name=study_name, direction='minimize',
+                                storage=f"sqlite:///{os.path.join(cache_dir, 'optuna.db')}", load_if_exists=True,
+                                sampler=optuna.samplers.TPESampler(seed=RANDOM_STATE),
+                                pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=0))
+    folds = list(KFold(n_splits=cv).split(X))
+    batch_size = max(1, min(effective_n_jobs(n_jobs), len(folds) // MIN_PRUNE_STEPS))
+    with Parallel(n_jobs=n_jobs) as parallel:
+        study.optimize(lambda trial: objective(trial, X, y, folds, parallel, batch_size),
+                       n_trials=n_trials, timeout=timeout)
+    return study
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Cross-validate and tune the PointsModel goals regressor.')
+    parser.add_argument('--train', required=True, help='Training player CSV (e.g. PointsModel/att_explore_original.csv)')
+    parser.add_argument('--test', help='Held-out player CSV to score the best model on')
+    parser.add_argument('--team-data', default=None, help='Team match data (default: team_finaldat.csv)')
+    parser.add_argument('--compare', action='store_true', help='Cross-validate the baseline models')
+    parser.add_argument('--grid', action='store_true', help='Run the notebook\'s two random forest grid searches')
+    parser.add_argument('--trials', type=int, default=0, help='Optuna trials to add to the study (default: 0)')
+    parser.add_argument('--study', default=STUDY_NAME, help=f'Optuna study name (default: {STUDY_NAME})')
+    parser.add_argument('--timeout', type=float, default=None, help='Stop the Optuna search after this many seconds')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel workers (default: all cores)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    start = time.time()
+    X, y = load_xy(args.train, args.team_data)
+    print("=" * 70)
+    print(f"POINTS MODEL TRAINING ({len(X):,} rows x {X.shape[1]} features, {time.time() - start:.1f}s to load)")
+    print("=" * 70)
+
+    best_params = None
+    if args.compare:
+        print(f"\n{CV_FOLDS}-fold CV:")
+        compare_models(X, y, n_jobs=args.jobs)
+    if args.grid:
+        for param_grid in GRID_SEARCHES:
+            search = grid_search(X, y, param_grid, n_jobs=args.jobs)
+            best_params = search.best_params_
+            print(f"\n✓ Grid search over {len(search.cv_results_['params'])} settings: "
+                  f"best RMSE {-search.best_score_:.4f} with {best_params}")
+    if args.trials:
+        study = tune(X, y, n_trials=args.trials, study_name=args.study, n_jobs=args.jobs, timeout=args.timeout)
+        states = pd.Series([t.state.name for t in study.trials]).value_counts()
+        best_params = study.best_params
+        print(f"\n✓ Study '{args.study}': {len(study.trials)} trials "
+              f"({states.get('COMPLETE', 0)} complete, {states.get('PRUNED', 0)} pruned)")
+        print(f"✓ Best RMSE {study.best_value:.4f} with {best_params}")
+
+    if args.test and best_params is not None:
+        X_test, y_test = load_xy(args.test, args.team_data)
+        model = RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=args.jobs, **best_params).fit(X, y)
+        print(f"✓ Test RMSE: {root_mean_squared_error(y_test, model.predict(X_test)):.4f} ({len(X_test):,} rows)")
+    print(f"\nTotal: {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Rebuild player files from cached FBref pages, parsing in a process pool.
+
+regenerate_defenders.py goes back through compile_dat (one player at a time,
+fetch path and all) even when every page is already in the HTML cache and
+only the derived columns changed, as when the 29 defenders only needed
+their deprecated FPL columns dropped. This command never touches the
+network. It reads each player's six match-log pages per season from the
+cache (offline) and fans the players out over a process pool:
+
+- each worker parses its player's pages (BeautifulSoup/lxml + parse_table),
+  types them and merges the FPL gameweeks (fbref_scrape.build_player_season)
+  and sends the finished, typed frame back
+- the parent is the only writer: it checks each frame's columns against
+  the schema registry and writes the player file atomically; a frame that
+  fails the check goes to <stem>_finaldat.csv.rejected (skipped by the
+  compile and validate folder scans) and the original file is left alone
+
+With every page cached, rebuilding all player files after a schema or type
+change is bound by the number of cores, not by the FBref rate limit.
+
+Players come from player manifests (--manifest, --job), by default
+DEFENDERS_TO_REGENERATE, or with --from-cache from every match-log URL in
+the cache whose FBref code is in the entity registry.
+
+Usage (from the repo root):
+    python FeatureExplore/reparse_pages.py                          # DEFENDERS_TO_REGENERATE
+    python FeatureExplore/reparse_pages.py --manifest att.csv --processes 8
+    python FeatureExplore/reparse_pages.py --from-cache --output-dir rebuilt
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import unquote, urlsplit
+
+import pandas as pd
+
+from batch_runner import JOBS_DIR
+from dataset_store import PLAYER_DIRS
+from entity_registry import get_player_registry
+from fbref_scrape import build_player_season, get_active_years, get_premgames, get_url_final
+from fbref_tables import MATCHLOG_CATEGORIES
+from fpl_index import get_fpl_index
+from html_cache import CACHE_DIR, CacheMiss, configure_cache
+from instrumentation import stage
+from player_manifest import from_player_dicts, load_manifest
+from schema_registry import CURRENT_VERSION, validate_frame
+
+
+MATCHLOG_PATH = re.compile(r'^/en/players/(?P<code>[^/]+)/matchlogs/(?P<season>\d{4}-\d{4})/c9/'
+                           r'(?P<category>[^/]*)/(?P<slug>.+)-Match-Logs$')
+
+
+# ============================================================================
+# PLAYERS
+# ============================================================================
+
+def player_output(stem, role='att'):
+    """Existing file for a player_stem (defenders first), else a new file in role's folder."""
+    for folder in (PLAYER_DIRS['def'], PLAYER_DIRS['att']):
+        path = os.path.join(folder, f'{stem}_finaldat.csv')
+        if os.path.exists(path):
+            return path
+    return os.path.join(PLAYER_DIRS[role], f'{stem}_finaldat.csv')
+
+
+def cached_players(cache_dir=CACHE_DIR):
+    """
+    Manifest entries for every player with match-log pages in the cache and
+    an FBref code in the entity registry (which supplies player_stem and
+    fpl_name).
+    """
+    slugs = {}
+    for folder, _, files in os.walk(os.path.join(cache_dir, 'index')):
+        for file in files:
+            try:
+                with open(os.path.join(folder, file)) as f:
+                    url = json.load(f)['url']
+            except (OSError, ValueError, KeyError):
+                continue
+            match = MATCHLOG_PATH.match(unquote(urlsplit(url).path))
+            if match:
+                slugs.setdefault(match['code'], match['slug'])
+
+    registry = get_player_registry().load().dropna(subset=['code', 'fpl_name'])
+    players = []
+    for stem, code, fpl_name in zip(registry['player_stem'], registry['code'], registry['fpl_name']):
+        if code in slugs:
+            players.append({'code': code, 'slug': slugs[code], 'fpl_name': fpl_name,
+                            'output': player_output(stem), 'checkgames': True})
+    return players
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+def _init_worker(cache_dir):
+    configure_cache(cache_dir, offline=True)
+
+
+def rebuild_player(player):
+    """
+    Parse every cached season of a player into one frame, as compile_dat
+    builds it. Runs in a worker; returns (frame or None, get_premgames count
+    or None). A missing match-log page raises CacheMiss.
+    """
+    frames = []
+    for season in get_active_years(player['fpl_name']):
+        summary = get_url_final(player['code'], season, '', player['slug'])
+        # No summary table: the player has no match log that season
+        if not summary:
+            continue
+        pages = {'': summary}
+        for category in MATCHLOG_CATEGORIES[1:]:
+            pages[category] = get_url_final(player['code'], season, category, player['slug'])
+        frames.append(build_player_season(pages, season, player['fpl_name']))
+    if not frames:
+        return None, None
+
+    games = None
+    if player['checkgames']:
+        try:
+            games = int(get_premgames(player['code'], player['slug']))
+        except CacheMiss:
+            pass
+    with stage('player.concat') as counters:
+        finaldf = pd.concat(frames, join="inner", ignore_index=True)
+        counters['rows'] = len(finaldf)
+    return finaldf, games
+
+
+# ============================================================================
+# WRITER
+# ============================================================================
+
+def write_player(df, path):
+    """Write a player file atomically."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with stage('player.write', rows=len(df)):
+        df.to_csv(f'{path}.tmp', index=False)
+        os.replace(f'{path}.tmp', path)
+
+
+def rebuild(players, processes=None, cache_dir=CACHE_DIR, output_dir=None):
+    """
+    Rebuild every player's file from the cache, parsing in a process pool.
+
+    Returns {'written': [...], 'empty': [...], 'failed': [(slug, reason), ...],
+    'rows': n}. With output_dir set, files are written there (keeping their
+    relative paths) instead of over the originals.
+    """
+    # Scan the FPL checkout (and refresh a stale gameweek table) once here so forked workers inherit them
+    index = get_fpl_index()
+    index.load()
+    if os.path.exists(index.gameweeks_path) and index.gameweeks_stale():
+        index.build_gameweeks()
+
+    summary = {'written': [], 'empty': [], 'failed': [], 'rows': 0}
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(cache_dir,)) as pool:
+        futures = {pool.submit(rebuild_player, player): player for player in players}
+        for done, future in enumerate(as_completed(futures), 1):
+            player = futures[future]
+            prefix = f"  [{done}/{len(players)}] {player['slug']}"
+            try:
+                df, games = future.result()
+            except CacheMiss as e:
+                summary['failed'].append((player['slug'], 'not cached'))
+                print(f"{prefix}: FAILED - {e}", flush=True)
+                continue
+            except Exception as e:
+                summary['failed'].append((player['slug'], str(e)[:50]))
+                print(f"{prefix}: FAILED - {e}", flush=True)
+                continue
+            if df is None:
+                summary['empty'].append(player['slug'])
+                print(f"{prefix}: no cached match logs", flush=True)
+                continue
+
+            path = os.path.join(output_dir, player['output']) if output_dir else player['output']
+            version = validate_frame(df)
+            if version != CURRENT_VERSION:
+                # Never replace a player file with a frame that fails the schema check
+                path = f'{path}.rejected'
+                summary['failed'].append((player['slug'], f'{len(df.columns)} cols'))
+                status = f"SCHEMA {version} ({len(df.columns)} cols), original kept"
+            else:
+                summary['written'].append(player['slug'])
+                summary['rows'] += len(df)
+                status = "OK"
+            if games is not None and games != len(df):
+                status += f", expected {games} games"
+            write_player(df, path)
+            print(f"{prefix}: {len(df)} rows, {status} -> {path}", flush=True)
+    return summary
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Rebuild player files from cached FBref pages in parallel.')
+    parser.add_argument('--manifest', action='append', default=[], help='Player manifest CSV (repeatable)')
+    parser.add_argument('--job', action='append', default=[], help=f'Use the manifest saved for a {JOBS_DIR} job')
+    parser.add_argument('--from-cache', action='store_true',
+                        help='Every registered player with match logs in the cache')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f'HTML cache directory (default: {CACHE_DIR})')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--output-dir', default=None, help='Write files under this directory instead of in place')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    players = []
+    for path in args.manifest:
+        players += load_manifest(path)
+    for job in args.job:
+        players += load_manifest(os.path.join(JOBS_DIR, job, 'manifest.csv'))
+    if args.from_cache:
+        players += cached_players(args.cache_dir)
+    if not (args.manifest or args.job or args.from_cache):
+        from regenerate_defenders import DEFENDERS_TO_REGENERATE
+        players = from_player_dicts(DEFENDERS_TO_REGENERATE, PLAYER_DIRS['def'])
+    # One entry per output file; the first source listing it wins
+    unique = {}
+    for player in players:
+        unique.setdefault(player['output'], player)
+    players = list(unique.values())
+
+    print("=" * 70, flush=True)
+    print(f"REBUILD FROM CACHED PAGES: {len(players)} players, "
+          f"{args.processes or os.cpu_count()} processes, cache {args.cache_dir}", flush=True)
+    print("=" * 70, flush=True)
+
+    start = time.time()
+    summary = rebuild(players, processes=args.processes, cache_dir=args.cache_dir, output_dir=args.output_dir)
+    elapsed = time.time() - start
+
+    print("\n" + "=" * 70)
+    print("REBUILD COMPLETE")
+    print("=" * 70)
+    print(f"Elapsed: {elapsed:.1f}s ({len(players) / elapsed:.1f} players/s, {summary['rows'] / elapsed:,.0f} rows/s)")
+    print(f"Written: {len(summary['written'])}/{len(players)} ({summary['rows']:,} rows)")
+    if summary['empty']:
+        print(f"No cached match logs: {len(summary['empty'])}")
+    if summary['failed']:
+        print(f"\nFailed ({len(summary['failed'])}):")
+        for slug, reason in summary['failed']:
+            print(f"  - {slug} ({reason})")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
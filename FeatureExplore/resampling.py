@@ -0,0 +1,270 @@
+"""
+Bootstrap and permutation tests for the FDR effect analyses.
+
+FormFixtures compares npxG between FDR 2 and 3 (and FDR 2-3 against 4-5)
+with one stats.mannwhitneyu / stats.ks_2samp call and hand-built ECDFs
+(np.sort plus arange), with no confidence intervals anywhere. This module
+gives intervals and resampled p-values for any two groups of the feature
+table, selected with where-dicts as in aggregate_cube ({'FDR': [2, 3],
+'Position Group': 'FWD'}).
+
+Resampling rows one at a time would mean 10,000 x 50,000 index draws per
+comparison. The metrics here take a few dozen distinct values (FBref reports
+expected stats to 0.1, goals and points are integers), so each group is
+compressed to its distinct values and their counts, and a resample is a
+vector of counts over those values:
+
+- bootstrap: a resample of n rows with replacement has multinomial(n, counts / n)
+  counts, so all resamples are one rng.multinomial call (resamples x values)
+- permutation: relabelling the pooled rows into groups of n_a and n_b draws
+  group A's counts from a multivariate hypergeometric; B gets the rest
+
+Means, ratios, ECDFs, the KS statistic and the Mann-Whitney AUC are then
+matrix operations on the count matrix. Both are exact resampling
+distributions, not approximations, and a fixed seed (SEED) makes every
+result reproducible.
+
+Usage:
+    from resampling import compare, ecdf_band, overperformance, suite
+    compare(frame, {'FDR': [2, 3]}, {'FDR': [4, 5]}, 'npxG')   # diff CI, permutation p-values
+    overperformance(frame, {'FDR': 2})                         # NPG - npxG and NPG/npxG with CIs
+    ecdf_band(frame, {'FDR': 2}, 'npxG')                       # ECDF with a bootstrap band
+
+    python FeatureExplore/resampling.py                        # all FDR / position pairs
+    python FeatureExplore/resampling.py --metrics npxG "Goal Difference" --resamples 20000
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+
+SEED = 0
+RESAMPLES = 10000
+CONFIDENCE = 0.95
+
+# FormFixtures' comparisons plus every pair of single FDR values
+FDR_SPLITS = [('FDR 2', [2], 'FDR 3', [3]), ('FDR 2-3', [2, 3], 'FDR 4-5', [4, 5]),
+              ('FDR 2', [2], 'FDR 3-5', [3, 4, 5])]
+FDR_SPLITS += [(f'FDR {a}', [a], f'FDR {b}', [b]) for a, b in itertools.combinations(range(2, 6), 2)
+               if (a, b) != (2, 3)]
+POSITION_GROUPS = [None, 'DEF', 'MID', 'FWD']
+
+
+# ============================================================================
+# COUNTS
+# ============================================================================
+
+def select(frame, where=None):
+    """Rows of frame matching where ({column: value or list of values})."""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, wanted in (where or {}).items():
+        if isinstance(wanted, (list, tuple, set)):
+            mask &= frame[column].isin(list(wanted)).to_numpy()
+        else:
+            mask &= (frame[column] == wanted).fillna(False).to_numpy()
+    return frame[mask]
+
+
+def compress(values):
+    """Distinct rows of a (n,) or (n, d) array and how often each occurs."""
+    values = np.asarray(values, dtype='float64')
+    if values.ndim == 1:
+        distinct, counts = np.unique(values, return_counts=True)
+    else:
+        distinct, counts = np.unique(values, axis=0, return_counts=True)
+    return distinct, counts
+
+
+def pooled_counts(a, b):
+    """Sorted pooled support of two 1-d samples with each sample's counts on it."""
+    support = np.unique(np.concatenate([a, b]))
+    counts_a = np.bincount(np.searchsorted(support, a), minlength=len(support))
+    counts_b = np.bincount(np.searchsorted(support, b), minlength=len(support))
+    return support, counts_a, counts_b
+
+
+def bootstrap_counts(counts, resamples=RESAMPLES, rng=None):
+    """Counts over the same support for resamples bootstrap resamples (resamples x values)."""
+    rng = rng if rng is not None else np.random.default_rng(SEED)
+    return rng.multinomial(counts.sum(), counts / counts.sum(), size=resamples)
+
+
+def permutation_counts(counts_a, counts_b, resamples=RESAMPLES, rng=None):
+    """Group A's counts under resamples random relabellings of the pooled rows (B has the rest)."""
+    rng = rng if rng is not None else np.random.default_rng(SEED)
+    return rng.multivariate_hypergeometric(counts_a + counts_b, counts_a.sum(), size=resamples)
+
+
+def interval(samples, confidence=CONFIDENCE):
+    """Percentile interval of resampled statistics (along the first axis)."""
+    tail = (1 - confidence) / 2
+    return np.quantile(samples, [tail, 1 - tail], axis=0)
+
+
+def _p_value(observed, permuted):
+    """Two-sided permutation p-value, counting the observed labelling."""
+    return (1 + np.sum(np.abs(permuted) >= np.abs(observed) - 1e-12)) / (1 + len(permuted))
+
+
+# ============================================================================
+# STATISTICS ON COUNT MATRICES
+# ============================================================================
+
+def _means(counts, support):
+    return counts @ support / counts.sum(axis=-1)
+
+
+def _ecdf(counts):
+    return np.cumsum(counts, axis=-1) / counts.sum(axis=-1, keepdims=True)
+
+
+def _ks(counts_a, counts_b):
+    return np.abs(_ecdf(counts_a) - _ecdf(counts_b)).max(axis=-1)
+
+
+def _auc(counts_a, counts_b):
+    """P(A > B) + P(A = B) / 2, i.e. Mann-Whitney U / (n_a * n_b)."""
+    below = np.cumsum(counts_b, axis=-1) - counts_b
+    return (counts_a * (below + counts_b / 2)).sum(axis=-1) / (counts_a.sum(axis=-1) * counts_b.sum(axis=-1))
+
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+def compare(frame, where_a, where_b, metric, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """
+    Compare metric between the rows matching where_a and where_b.
+
+    Returns a dict with both group sizes and means, the mean difference (A - B)
+    with a bootstrap interval, and permutation p-values for the mean
+    difference, the KS statistic and the Mann-Whitney AUC.
+    """
+    a = select(frame, where_a)[metric].dropna().to_numpy(dtype='float64')
+    b = select(frame, where_b)[metric].dropna().to_numpy(dtype='float64')
+    if not len(a) or not len(b):
+        return {'n_a': len(a), 'n_b': len(b)}
+    rng = np.random.default_rng(seed)
+    support, counts_a, counts_b = pooled_counts(a, b)
+
+    # Each group resamples only the values it has (draw cost grows with the support)
+    seen_a, seen_b = counts_a > 0, counts_b > 0
+    boot_diff = (_means(bootstrap_counts(counts_a[seen_a], resamples, rng), support[seen_a])
+                 - _means(bootstrap_counts(counts_b[seen_b], resamples, rng), support[seen_b]))
+    perm_a = permutation_counts(counts_a, counts_b, resamples, rng)
+    perm_b = (counts_a + counts_b) - perm_a
+
+    diff = a.mean() - b.mean()
+    low, high = interval(boot_diff, confidence)
+    ks, auc = _ks(counts_a, counts_b), _auc(counts_a, counts_b)
+    return {
+        'n_a': len(a), 'n_b': len(b), 'mean_a': a.mean(), 'mean_b': b.mean(),
+        'diff': diff, 'diff_low': low, 'diff_high': high,
+        'diff_p': _p_value(diff, _means(perm_a, support) - _means(perm_b, support)),
+        'ks': ks, 'ks_p': _p_value(ks, _ks(perm_a, perm_b)),
+        'auc': auc, 'auc_p': _p_value(auc - 0.5, _auc(perm_a, perm_b) - 0.5),
+    }
+
+
+def overperformance(frame, where=None, goals='Non-Penalty Goals', expected='npxG',
+                    resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """
+    Mean overperformance (goals - expected per match) and the conversion rate
+    (total goals / total expected) for the matching rows, with bootstrap
+    intervals. Rows are resampled as (goals, expected) pairs.
+    """
+    rows = select(frame, where)[[goals, expected]].dropna().to_numpy(dtype='float64')
+    if not len(rows):
+        return {'n': 0}
+    pairs, counts = compress(rows)
+    boot = bootstrap_counts(counts, resamples, np.random.default_rng(seed))
+    totals = boot @ pairs                           # resamples x (goals, expected)
+    boot_over = (totals[:, 0] - totals[:, 1]) / len(rows)
+    boot_rate = np.divide(totals[:, 0], totals[:, 1], out=np.full(resamples, np.nan), where=totals[:, 1] > 0)
+
+    over_low, over_high = interval(boot_over, confidence)
+    rate_low, rate_high = np.nanquantile(boot_rate, [(1 - confidence) / 2, (1 + confidence) / 2])
+    total_goals, total_expected = rows.sum(axis=0)
+    return {
+        'n': len(rows), 'overperformance': (total_goals - total_expected) / len(rows),
+        'overperformance_low': over_low, 'overperformance_high': over_high,
+        'conversion': total_goals / total_expected if total_expected > 0 else np.nan,
+        'conversion_low': rate_low, 'conversion_high': rate_high,
+    }
+
+
+def ecdf_band(frame, where, metric, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """
+    ECDF of metric for the matching rows with a pointwise bootstrap band,
+    indexed by the distinct values (plot with drawstyle='steps-post').
+    """
+    support, counts = compress(select(frame, where)[metric].dropna())
+    boot = _ecdf(bootstrap_counts(counts, resamples, np.random.default_rng(seed)))
+    low, high = interval(boot, confidence)
+    return pd.DataFrame({'ecdf': _ecdf(counts), 'low': low, 'high': high},
+                        index=pd.Index(support, name=metric))
+
+
+def suite(frame, metrics=('npxG', 'Goal Difference'), splits=FDR_SPLITS, positions=POSITION_GROUPS,
+          resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """compare() for every FDR split x position group x metric, one row each."""
+    results = []
+    for position in positions:
+        rows = frame if position is None else select(frame, {'Position Group': position})
+        for label_a, fdr_a, label_b, fdr_b in splits:
+            for metric in metrics:
+                result = compare(rows, {'FDR': fdr_a}, {'FDR': fdr_b}, metric, resamples, confidence, seed)
+                results.append({'position': position or 'ALL', 'a': label_a, 'b': label_b, 'metric': metric,
+                                **result})
+    return pd.DataFrame(results)
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def main(argv=None):
+    """Main execution function."""
+    from aggregate_cube import cube_frame
+    from feature_store import load_features
+
+    parser = argparse.ArgumentParser(description='Bootstrap / permutation tests of FDR effects.')
+    parser.add_argument('--metrics', nargs='+', default=['npxG', 'Goal Difference'], help='Metrics to compare')
+    parser.add_argument('--resamples', type=int, default=RESAMPLES, help=f'Resamples per test (default: {RESAMPLES})')
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE, help=f'Interval level (default: {CONFIDENCE})')
+    parser.add_argument('--seed', type=int, default=SEED, help=f'Random seed (default: {SEED})')
+    parser.add_argument('--output', default=None, help='Save the results table to this CSV')
+    args = parser.parse_args(argv)
+
+    frame = cube_frame(load_features())
+    start = time.time()
+    results = suite(frame, args.metrics, resamples=args.resamples, confidence=args.confidence, seed=args.seed)
+    elapsed = time.time() - start
+
+    print("=" * 70)
+    print(f"FDR EFFECTS: {len(results)} comparisons x {args.resamples:,} resamples ({elapsed:.1f}s, seed {args.seed})")
+    print("=" * 70)
+    columns = ['position', 'a', 'b', 'metric', 'n_a', 'n_b', 'diff', 'diff_low', 'diff_high', 'diff_p', 'ks_p', 'auc']
+    print(results[columns].round(4).to_string(index=False))
+
+    print("\nOverperformance (Non-Penalty Goals - npxG):")
+    for fdr in range(2, 6):
+        over = overperformance(frame, {'FDR': fdr}, resamples=args.resamples, confidence=args.confidence,
+                               seed=args.seed)
+        if over['n']:
+            print(f"  FDR {fdr}: {over['overperformance']:+.4f} per match "
+                  f"[{over['overperformance_low']:+.4f}, {over['overperformance_high']:+.4f}], "
+                  f"conversion {over['conversion']:.3f} [{over['conversion_low']:.3f}, {over['conversion_high']:.3f}]"
+                  f" (n={over['n']:,})")
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\n✓ Saved results to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
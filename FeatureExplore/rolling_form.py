@@ -0,0 +1,253 @@
+"""
+Rolling form features for teams and players, computed on the whole frame.
+
+calculate_overall_rolling_metrics and calculate_home_away_rolling_metrics in
+FDR_Imputation_Model.ipynb looped over every team, copied its rows, ran
+shift(1).rolling(...) on the copy and concatenated the pieces; the player
+notebooks did the same per Player ID with groupby().apply. Here the frame is
+sorted once by (group, Date) and every window is computed for every column
+at once with lagged numpy arrays, so recomputing form for all ~60k
+player-matches after a refresh takes milliseconds.
+
+For every metric and window w the engine produces:
+
+- rolling{w}_<metric>: mean of the previous w matches in the group (the
+  match itself is excluded, min_periods=1), i.e. shift(1).rolling(w).mean()
+- season_<metric> (window None): mean of all previous matches in the group
+- ewm{span}_<metric>: exponentially weighted mean of previous matches
+- home_/away_ variants: the same over the group's previous home (away)
+  matches only, carried forward to the matches in between, as the FDR
+  notebook's home/away form
+
+Usage:
+    from rolling_form import team_form, player_form
+    team_df = team_form(read_team_csv())                      # windows 3/5/6/10, home/away
+    att = player_form(read_player_csv('att_finaldat.csv'), ewm_spans=(5,))
+"""
+
+import numpy as np
+import pandas as pd
+
+
+WINDOWS = (3, 5, 6, 10)
+VENUES = ('Home', 'Away')
+POINTS = {'W': 3, 'D': 1, 'L': 0}
+
+# Feature name -> source column
+TEAM_METRICS = {
+    'xG': 'xG',
+    'xGA': 'xGA',
+    'goals_scored': 'Goals Scored',
+    'goals_conceded': 'Goals Conceded',
+    'points': 'Points',
+    'possession': 'Possession',
+}
+
+PLAYER_METRICS = {
+    'minutes': 'Minutes Played',
+    'goals': 'Goals',
+    'assists': 'Assists',
+    'shots': 'Shots',
+    'shots_on_target': 'Shots on Target',
+    'xG': 'xG',
+    'npxG': 'npxG',
+    'xAG': 'xAG',
+    'sca': 'Shot Creating Actions',
+    'gca': 'Goal Creating Actions',
+    'key_passes': 'Key Passes',
+    'touches': 'Touches',
+    'penalty_area_touches': 'Penalty Area Touches',
+    'progressive_carries': 'Progressive Carries',
+    'total_points': 'total_points',
+    'bps': 'bps',
+}
+
+
+# ============================================================================
+# WINDOW KERNELS
+# ============================================================================
+
+def _group_ids(df, by):
+    """Integer id per row for the (already sorted) grouping columns."""
+    return df.groupby(list(by), sort=False, observed=True, dropna=False).ngroup().to_numpy()
+
+
+def _previous(values, groups):
+    """values shifted down one row within each group (NaN at each group's first row)."""
+    previous = np.full_like(values, np.nan)
+    same = groups[1:] == groups[:-1]
+    previous[1:][same] = values[:-1][same]
+    return previous
+
+
+def lagged_means(values, groups, windows):
+    """
+    Means over the previous w rows of the same group, for each w in windows.
+
+    values is an (n, k) float array sorted by group and date; NaNs are
+    skipped as in pandas rolling. Window None is the expanding mean of all
+    previous rows in the group. Returns {window: (n, k) array}.
+    """
+    n = len(values)
+    out = {}
+    sums = np.zeros_like(values)
+    counts = np.zeros_like(values)
+    fixed = sorted(w for w in windows if w is not None)
+    for lag in range(1, (fixed[-1] if fixed else 0) + 1):
+        if lag < n:
+            same = groups[lag:] == groups[:-lag]
+            lagged = values[:-lag]
+            present = same[:, None] & ~np.isnan(lagged)
+            sums[lag:] += np.where(present, lagged, 0.0)
+            counts[lag:] += present
+        if lag in fixed:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[lag] = sums / np.where(counts > 0, counts, np.nan)
+
+    if None in windows:
+        # Expanding: cumulative sums of the previous rows, restarted at each group
+        previous = _previous(values, groups)
+        present = ~np.isnan(previous)
+        totals = np.cumsum(np.where(present, previous, 0.0), axis=0)
+        seen = np.cumsum(present, axis=0)
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        first = np.repeat(starts, np.diff(np.r_[starts, n]))
+        totals -= totals[first] - np.where(present[first], previous[first], 0.0)
+        seen -= seen[first] - present[first]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[None] = totals / np.where(seen > 0, seen, np.nan)
+    return out
+
+
+def lagged_ewm(values, groups, span):
+    """
+    Exponentially weighted mean (pandas ewm(span).mean(), adjust=True) of
+    the previous rows in each group.
+
+    The recursion runs over match number within the group, so each step
+    updates the k-th match of every group and column at once.
+    """
+    decay = 1 - 2 / (span + 1)
+    previous = _previous(values, groups)
+    present = ~np.isnan(previous)
+    weighted = np.where(present, previous, 0.0)
+    n = len(values)
+    starts = np.r_[True, groups[1:] != groups[:-1]]
+    position = np.arange(n) - np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+    numerator = weighted.copy()
+    denominator = present.astype('float64')
+    by_position = np.argsort(position, kind='stable')
+    bounds = np.searchsorted(position[by_position], np.arange(1, position.max() + 2 if n else 1))
+    for rows in np.split(by_position, bounds)[1:]:
+        numerator[rows] += decay * numerator[rows - 1]
+        denominator[rows] += decay * denominator[rows - 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return numerator / np.where(denominator > 0, denominator, np.nan)
+
+
+def _features(values, groups, names, windows, ewm_spans, prefix=''):
+    """All window and EWM features for one block of rows, as (column names, 2-D array)."""
+    columns, blocks = [], []
+    for window, block in lagged_means(values, groups, windows).items():
+        label = 'season' if window is None else f'rolling{window}'
+        columns += [f'{prefix}{label}_{name}' for name in names]
+        blocks.append(block)
+    for span in ewm_spans:
+        columns += [f'{prefix}ewm{span}_{name}' for name in names]
+        blocks.append(lagged_ewm(values, groups, span))
+    return columns, np.hstack(blocks)
+
+
+def _carry_forward(rows, block, groups):
+    """
+    Spread a block computed on a subset of rows (e.g. home matches) to all
+    rows: each row gets the value of the latest subset row at or before it
+    in the same group, NaN before the group's first subset row.
+    """
+    n = len(groups)
+    marked = np.full(n, -1)
+    marked[rows] = rows
+    latest = np.maximum.accumulate(marked)
+    valid = (latest >= 0) & (groups[np.maximum(latest, 0)] == groups)
+    slot = np.searchsorted(rows, latest)
+    out = np.full((n, block.shape[1]), np.nan)
+    out[valid] = block[slot[valid]]
+    return out
+
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+def rolling_form(df, metrics, by, date='Date', windows=WINDOWS, ewm_spans=(), venue=None):
+    """
+    Return a frame of form features aligned to df's index.
+
+    metrics maps feature names to source columns; by lists the grouping
+    columns (e.g. ['Team'] or ['Player ID', 'season']). When venue names a
+    column holding 'Home'/'Away', home_ and away_ variants are added.
+    """
+    # Work on row positions so duplicate index labels (e.g. concatenated att/def frames) are fine
+    keys = list(by) + [date]
+    order = df[keys].reset_index(drop=True).sort_values(keys, kind='stable').index.to_numpy()
+    needed = keys + list(dict.fromkeys(metrics.values())) + ([venue] if venue is not None else [])
+    data = df[list(dict.fromkeys(needed))].iloc[order]
+    groups = _group_ids(data, by)
+    names = list(metrics)
+    values = np.column_stack([pd.to_numeric(data[metrics[name]], errors='coerce').to_numpy(dtype='float64')
+                              for name in names])
+
+    columns, block = _features(values, groups, names, windows, ewm_spans)
+    blocks = [block]
+    if venue is not None:
+        for side in VENUES:
+            rows = np.flatnonzero((data[venue] == side).to_numpy())
+            side_columns, side_block = _features(values[rows], groups[rows], names, windows, ewm_spans,
+                                                 f'{side.lower()}_')
+            columns += side_columns
+            blocks.append(_carry_forward(rows, side_block, groups))
+
+    unsorted = np.empty_like(order)
+    unsorted[order] = np.arange(len(order))
+    return pd.DataFrame(np.hstack(blocks)[unsorted], index=df.index, columns=columns)
+
+
+def team_form(team_df, windows=WINDOWS, ewm_spans=(), by=('Team',), venue=True, metrics=TEAM_METRICS):
+    """team_df with Points (3/1/0 from Result) and form features added, sorted by team and date."""
+    team_df = team_df.assign(Points=team_df['Result'].astype(str).map(POINTS))
+    features = rolling_form(team_df, metrics, by, windows=windows, ewm_spans=ewm_spans,
+                            venue='Venue' if venue else None)
+    combined = pd.concat([team_df, features], axis=1)
+    return combined.sort_values(list(by) + ['Date'], kind='stable').reset_index(drop=True)
+
+
+def player_form(player_df, windows=WINDOWS, ewm_spans=(), by=('Player ID',), venue=False, metrics=None):
+    """
+    player_df (compiled att/def frame with 'Player ID') with form features added.
+
+    metrics defaults to the PLAYER_METRICS columns present in the frame; pass
+    by=('Player ID', 'season') for form that resets every season.
+    """
+    if metrics is None:
+        metrics = {name: column for name, column in PLAYER_METRICS.items() if column in player_df.columns}
+    features = rolling_form(player_df, metrics, by, windows=windows, ewm_spans=ewm_spans,
+                            venue='Venue' if venue else None)
+    return pd.concat([player_df, features], axis=1)
+
+
+# ============================================================================
+# NOTEBOOK COMPATIBILITY
+# ============================================================================
+
+def calculate_overall_rolling_metrics(df, window=5):
+    """Calculate overall rolling metrics (no home/away split), as rolling_<metric>."""
+    form = team_form(df, windows=(window,), venue=False)
+    return form.rename(columns={f'rolling{window}_{name}': f'rolling_{name}' for name in TEAM_METRICS})
+
+
+def calculate_home_away_rolling_metrics(df, window=6):
+    """Calculate separate home and away rolling metrics, as home_rolling_<metric> / away_rolling_<metric>."""
+    form = team_form(df, windows=(window,), venue=True)
+    renames = {f'{side}_rolling{window}_{name}': f'{side}_rolling_{name}'
+               for side in ('home', 'away') for name in TEAM_METRICS}
+    return form.drop(columns=[f'rolling{window}_{name}' for name in TEAM_METRICS]).rename(columns=renames)
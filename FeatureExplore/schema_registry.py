@@ -0,0 +1,344 @@
+"""
+Versioned schema registry and fast validator for the player CSV files.
+
+fix_csv_schemas.py used to hard-code the broken filenames and the deprecated
+FPL columns, and both it and regenerate_defenders.py only checked
+len(df.columns) == 112. Here each schema version lists its column names and
+order, dtypes (from player_schema.PLAYER_SCHEMA) and nullable columns, and
+migrations between versions are declarative rules (drop / rename / add).
+
+    version 1: FBref columns + the full FPL gw.csv of older vaastav dumps (134)
+    version 2: FBref columns + the current FPL columns (111)   <- CURRENT_VERSION
+
+Counts exclude the unnamed index column the notebooks write; it is optional.
+
+The validator reads only each file's header plus the first few rows for a
+dtype/nullability check, and scans files in a process pool, so all 872 player
+files are checked in a few seconds. --migrate rewrites old-version files in
+place, row by row, without re-parsing their values.
+
+Usage (from the repo root):
+    python FeatureExplore/schema_registry.py             # report
+    python FeatureExplore/schema_registry.py --migrate   # upgrade old files in place
+"""
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fbref_tables import MATCHLOG_COLUMNS
+from player_schema import CATEGORY, DATE, DATETIME_UTC, PLAYER_SCHEMA
+
+
+PLAYER_DIRS = ('Player_Data', os.path.join('Player_Data', 'Defenders'))
+DEFAULT_SAMPLE_ROWS = 50
+
+
+# ============================================================================
+# SCHEMA VERSIONS
+# ============================================================================
+
+FBREF_COLUMNS = [name for columns in MATCHLOG_COLUMNS.values() for name, _ in columns]
+
+# FPL gw.csv columns kept after get_data_final drops the duplicates (alphabetical, as in gw.csv)
+FPL_COLUMNS = ['bonus', 'bps', 'clean_sheets', 'creativity', 'ict_index', 'influence', 'kickoff_time',
+               'minutes', 'own_goals', 'round', 'saves', 'selected', 'threat', 'total_points',
+               'transfers_balance', 'transfers_in', 'transfers_out', 'value']
+
+# Columns that older vaastav gw.csv dumps carried and FPL no longer publishes
+DEPRECATED_FPL_COLUMNS = ['attempted_passes', 'big_chances_created', 'big_chances_missed',
+                          'clearances_blocks_interceptions', 'completed_passes', 'dribbles',
+                          'ea_index', 'errors_leading_to_goal', 'errors_leading_to_goal_attempt',
+                          'fouls', 'id', 'key_passes', 'kickoff_time_formatted', 'loaned_in',
+                          'loaned_out', 'offside', 'open_play_crosses', 'penalties_conceded',
+                          'recoveries', 'tackled', 'tackles', 'target_missed', 'winning_goals']
+
+SCHEMA_VERSIONS = {
+    1: {
+        'description': 'FBref + FPL columns including deprecated gw.csv fields',
+        'columns': FBREF_COLUMNS + sorted(FPL_COLUMNS + DEPRECATED_FPL_COLUMNS) + ['kickoff_date'],
+        'dtypes': {**PLAYER_SCHEMA, **{column: 'float32' for column in DEPRECATED_FPL_COLUMNS},
+                   'kickoff_time_formatted': CATEGORY},
+        'nullable': {'Position', *DEPRECATED_FPL_COLUMNS},
+    },
+    2: {
+        'description': 'FBref + current FPL columns',
+        'columns': FBREF_COLUMNS + FPL_COLUMNS + ['kickoff_date'],
+        'dtypes': PLAYER_SCHEMA,
+        'nullable': {'Position'},
+    },
+}
+
+CURRENT_VERSION = 2
+
+MIGRATIONS = [
+    {'from': 1, 'to': 2, 'drop': DEPRECATED_FPL_COLUMNS},
+]
+
+
+def schema_version(columns):
+    """Return the version whose column list matches exactly (index column ignored), or None."""
+    columns = [c for c in columns if c and not str(c).startswith('Unnamed')]
+    for version, schema in SCHEMA_VERSIONS.items():
+        if columns == schema['columns']:
+            return version
+    return None
+
+
+def column_drift(columns, version=CURRENT_VERSION):
+    """Describe how a column list differs from a schema version."""
+    expected = SCHEMA_VERSIONS[version]['columns']
+    columns = [c for c in columns if c and not str(c).startswith('Unnamed')]
+    missing = [c for c in expected if c not in columns]
+    extra = [c for c in columns if c not in expected]
+    shared = [c for c in columns if c in expected]
+    return {'missing': missing, 'extra': extra,
+            'reordered': shared != [c for c in expected if c in columns]}
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+def read_header(path):
+    """Return (has_index, columns) from the first line of a CSV."""
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    has_index = bool(header) and (header[0] == '' or header[0].startswith('Unnamed'))
+    return has_index, header[1:] if has_index else header
+
+
+def read_sample(path, has_index, sample_rows=DEFAULT_SAMPLE_ROWS):
+    """Return the first sample_rows data rows of a CSV as a 2-D array of strings."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        rows = [row[1:] if has_index else row for row, _ in zip(reader, range(sample_rows))]
+    return np.array(rows, dtype=object).reshape(len(rows), -1)
+
+
+def _column_kinds(version):
+    """Column positions of a version grouped into int / float / date checks (cached)."""
+    kinds = _KIND_CACHE.get(version)
+    if kinds is None:
+        schema = SCHEMA_VERSIONS[version]
+        kinds = {'int': [], 'float': [], 'date': []}
+        for i, column in enumerate(schema['columns']):
+            dtype = schema['dtypes'].get(column, CATEGORY)
+            if dtype in (DATE, DATETIME_UTC):
+                kinds['date'].append(i)
+            elif dtype.startswith('int'):
+                kinds['int'].append(i)
+            elif dtype.startswith('float'):
+                kinds['float'].append(i)
+        not_null = [i for i, c in enumerate(schema['columns']) if c not in schema['nullable']]
+        kinds = _KIND_CACHE[version] = (kinds, not_null)
+    return kinds
+
+
+_KIND_CACHE = {}
+
+
+def check_sample(path, version, sample_rows=DEFAULT_SAMPLE_ROWS, has_index=True):
+    """
+    Check the first sample_rows rows against a version's dtypes and nullability.
+
+    All numeric columns are converted in one vectorized cast rather than one
+    call per column, which is what keeps a full scan at a few seconds.
+    """
+    columns = SCHEMA_VERSIONS[version]['columns']
+    sample = read_sample(path, has_index, sample_rows)
+    if sample.size == 0:
+        return []
+    if sample.shape[1] != len(columns):
+        return [f'rows have {sample.shape[1]} cells, header has {len(columns)}']
+    kinds, not_null = _column_kinds(version)
+    empty = sample == ''
+    problems = [f'{columns[i]}: {int(empty[:, i].sum())} empty values'
+                for i in not_null if empty[:, i].any()]
+
+    # numpy's C-level string->float cast is far cheaper than pd.to_numeric per
+    # column; only when it fails do we fall back to finding the offending cells
+    numeric = kinds['int'] + kinds['float']
+    cells = np.where(empty[:, numeric], 'nan', sample[:, numeric])
+    try:
+        numbers = cells.astype(float)
+    except ValueError:
+        numbers = pd.to_numeric(pd.Series(cells.ravel()), errors='coerce').to_numpy().reshape(cells.shape)
+    bad = np.isnan(numbers) & ~empty[:, numeric]
+    bad[:, :len(kinds['int'])] |= numbers[:, :len(kinds['int'])] % 1 != 0
+    for j in np.flatnonzero(bad.any(axis=0)):
+        i = numeric[j]
+        problems.append(f'{columns[i]}: {sample[bad[:, j], i][0]!r} is not {SCHEMA_VERSIONS[version]["dtypes"][columns[i]]}')
+
+    for i in kinds['date']:
+        values = [v for v in sample[:, i] if v]
+        try:
+            # 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS+00:00'; the offset is always UTC
+            np.array([v[:19] for v in values], dtype='datetime64[s]')
+        except ValueError:
+            bad_dates = pd.to_datetime(pd.Series(values), errors='coerce', format='ISO8601').isna()
+            problems.append(f'{columns[i]}: {values[int(np.flatnonzero(bad_dates)[0])]!r} is not a date')
+    return problems
+
+
+def validate_file(path, sample_rows=DEFAULT_SAMPLE_ROWS):
+    """Validate one player CSV; returns a report dict."""
+    has_index, columns = read_header(path)
+    version = schema_version(columns)
+    report = {'path': path, 'version': version, 'has_index': has_index, 'columns': len(columns),
+              'drift': None, 'problems': []}
+    if version is None:
+        report['drift'] = column_drift(columns)
+    elif sample_rows:
+        report['problems'] = check_sample(path, version, sample_rows, has_index)
+    return report
+
+
+def _validate_one(args):
+    return validate_file(*args)
+
+
+def validate_files(paths, sample_rows=DEFAULT_SAMPLE_ROWS, workers=None):
+    """Validate many files in a process pool."""
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_validate_one, [(path, sample_rows) for path in paths], chunksize=16))
+
+
+def player_files(dirs=PLAYER_DIRS):
+    """Every *_finaldat.csv directly inside the player folders."""
+    return [os.path.join(folder, file) for folder in dirs
+            for file in sorted(os.listdir(folder)) if file.endswith('.csv')]
+
+
+# ============================================================================
+# MIGRATION
+# ============================================================================
+
+def migration_path(version, target=CURRENT_VERSION):
+    """Return the list of rules that take `version` to `target`, or None if there is none."""
+    path = []
+    while version != target:
+        rule = next((m for m in MIGRATIONS if m['from'] == version), None)
+        if rule is None:
+            return None
+        path.append(rule)
+        version = rule['to']
+    return path
+
+
+def migrate_file(path, target=CURRENT_VERSION):
+    """
+    Rewrite a CSV in place at the target schema version.
+
+    Cells are copied as text, so untouched columns are byte-for-byte the same;
+    the index column, if any, is kept. Returns (old version, new version).
+    """
+    has_index, columns = read_header(path)
+    version = schema_version(columns)
+    if version is None:
+        raise ValueError(f'{path}: columns match no schema version')
+    rules = migration_path(version, target)
+    if rules is None:
+        raise ValueError(f'{path}: no migration from version {version} to {target}')
+    if not rules:
+        return version, version
+
+    # Work out where each target column comes from: a source position (after
+    # renames; dropped columns are simply never picked) or an added default
+    defaults = {name: value for rule in rules for name, value in rule.get('add', {}).items()}
+    position = {}
+    for i, name in enumerate(columns):
+        for rule in rules:
+            if name in rule.get('drop', ()):
+                break
+            name = rule.get('rename', {}).get(name, name)
+        else:
+            position[name] = i + has_index
+    sources = [position.get(name) for name in SCHEMA_VERSIONS[target]['columns']]
+    fill = [defaults.get(name, '') for name in SCHEMA_VERSIONS[target]['columns']]
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(path, newline='', encoding='utf-8') as src, \
+            open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst, lineterminator='\n')
+        header = next(reader)
+        writer.writerow(([header[0]] if has_index else []) + SCHEMA_VERSIONS[target]['columns'])
+        for row in reader:
+            out = [row[i] if i is not None else default for i, default in zip(sources, fill)]
+            writer.writerow(([row[0]] if has_index else []) + out)
+    os.replace(tmp_path, path)
+    return version, target
+
+
+def validate_frame(df):
+    """Return the schema version of a DataFrame's columns (None if it matches none)."""
+    return schema_version(list(df.columns))
+
+
+# ============================================================================
+# MAIN EXECUTION
+# ============================================================================
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Validate (and optionally migrate) all player CSV files.')
+    parser.add_argument('--migrate', action='store_true', help='Upgrade old-version files in place')
+    parser.add_argument('--sample', type=int, default=DEFAULT_SAMPLE_ROWS,
+                        help=f'Rows per file to dtype-check, 0 for headers only (default: {DEFAULT_SAMPLE_ROWS})')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function."""
+    args = parse_args(argv)
+    start = time.time()
+    paths = player_files()
+    reports = validate_files(paths, args.sample, args.workers)
+
+    print("=" * 70)
+    print("PLAYER CSV SCHEMA REPORT")
+    print("=" * 70)
+    print(f"Files scanned: {len(reports)} in {time.time() - start:.1f}s")
+    for version in sorted(SCHEMA_VERSIONS):
+        count = sum(1 for r in reports if r['version'] == version)
+        current = ' (current)' if version == CURRENT_VERSION else ''
+        print(f"  Version {version}{current}: {count} files - {SCHEMA_VERSIONS[version]['description']}")
+
+    drifted = [r for r in reports if r['version'] is None]
+    print(f"  Unknown schema: {len(drifted)} files")
+    for r in drifted:
+        drift = r['drift']
+        print(f"    - {r['path']}: {len(drift['missing'])} missing, {len(drift['extra'])} extra"
+              f"{', reordered' if drift['reordered'] else ''}")
+        for column in drift['missing'][:5]:
+            print(f"        missing: {column}")
+        for column in drift['extra'][:5]:
+            print(f"        extra: {column}")
+
+    with_problems = [r for r in reports if r['problems']]
+    print(f"  Dtype/nullability problems: {len(with_problems)} files")
+    for r in with_problems:
+        print(f"    - {r['path']}: {'; '.join(r['problems'][:3])}")
+
+    outdated = [r for r in reports if r['version'] is not None and r['version'] != CURRENT_VERSION]
+    if args.migrate and outdated:
+        print(f"\nMigrating {len(outdated)} files to version {CURRENT_VERSION}...")
+        for r in outdated:
+            old, new = migrate_file(r['path'])
+            print(f"  {r['path']}: version {old} -> {new}")
+    elif outdated:
+        print(f"\n{len(outdated)} files can be upgraded with --migrate")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
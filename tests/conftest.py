@@ -0,0 +1,39 @@
+"""Shared fixtures: the FeatureExplore scripts import each other as top-level modules."""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'FeatureExplore'))
+
+import html_cache  # noqa: E402
+from benchmarks import FixtureServer, FixtureWriter, render_page  # noqa: E402
+
+
+SITE_PAGES = {
+    f'/en/players/0000000{i}/matchlogs/2022-2023/c9/Player-{i}-Match-Logs': f'Player {i}' for i in range(6)
+}
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A local stand-in FBref server with a few recorded pages (FixtureServer from benchmarks.py)."""
+    fixture_dir = tmp_path / 'fixtures'
+    os.makedirs(fixture_dir / 'pages')
+    writer = FixtureWriter(str(fixture_dir))
+    for path, title in SITE_PAGES.items():
+        writer.add(path, render_page(title, '<table class="stats_table"><tbody><tr></tr></tbody></table>'))
+    with open(fixture_dir / 'pages.json', 'w') as f:
+        json.dump(writer.pages, f)
+    with FixtureServer(str(fixture_dir)) as server:
+        server.urls = [server.url + path for path in SITE_PAGES]
+        yield server
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """A fresh default HTML cache in tmp_path; the module default is restored afterwards."""
+    monkeypatch.setattr(html_cache, '_default_cache', html_cache.HtmlCache(root=str(tmp_path / 'cache')))
+    return html_cache.get_cache()
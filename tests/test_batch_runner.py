@@ -0,0 +1,80 @@
+"""Job journal and resuming a batch job where it stopped."""
+
+import os
+
+import pandas as pd
+
+import batch_runner
+from batch_runner import JobJournal, part_path, player_key, run_job, unit_key
+
+
+SEASONS = ['2022-2023', '2023-2024']
+
+
+def test_last_record_wins_and_partial_lines_are_ignored(tmp_path):
+    journal = JobJournal(str(tmp_path))
+    journal.record(unit_key('abc', '2022-2023'), 'failed', error='boom')
+    journal.record(unit_key('abc', '2022-2023'), 'done', rows=3)
+    journal.record(player_key('abc'), 'done', kind='player', rows=3)
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"unit": "abc/2023-2024", "sta')   # crash mid-write
+
+    reloaded = JobJournal(str(tmp_path))
+    assert reloaded.status(unit_key('abc', '2022-2023')) == 'done'
+    assert reloaded.status(unit_key('abc', '2023-2024')) == 'pending'
+    assert reloaded.counts() == {'done': 1} and reloaded.counts('player') == {'done': 1}
+
+
+def fake_run_unit(job_dir, player, season):
+    """Stands in for the scrape (runs in the forked workers); fails while a 'fail-<season>' file exists."""
+    if os.path.exists(os.path.join(job_dir, f'fail-{season}')):
+        raise RuntimeError(f'{season} unavailable')
+    df = pd.DataFrame({'Date': [f'{season[:4]}-09-01'], 'Goals': [1]})
+    path = part_path(job_dir, player['code'], season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_pickle(path)
+    return len(df)
+
+
+def unit_records(journal_path, unit):
+    with open(journal_path, encoding='utf-8') as f:
+        return sum(f'"unit": "{unit}"' in line for line in f)
+
+
+def test_job_resumes_from_the_last_completed_unit(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_runner, 'run_unit', fake_run_unit)
+    monkeypatch.setattr(batch_runner, 'get_active_years', lambda fpl_name: SEASONS)
+    job_dir = str(tmp_path / 'job')
+    output = str(tmp_path / 'Player_Data' / 'saka_finaldat.csv')
+    players = [{'code': 'bc7dc64d', 'slug': 'Bukayo-Saka', 'fpl_name': 'Bukayo_Saka', 'output': output,
+                'checkgames': False}]
+    os.makedirs(job_dir)
+    open(os.path.join(job_dir, 'fail-2023-2024'), 'w').close()
+
+    def run():
+        return run_job(job_dir, players, processes=1, cache_dir=str(tmp_path / 'cache'), offline=True)
+
+    # First run: one season fails, so the player is not written
+    written, incomplete, journal = run()
+    assert written == [] and incomplete == ['Bukayo-Saka']
+    assert journal.status(unit_key('bc7dc64d', '2023-2024')) == 'failed'
+    assert not os.path.exists(output)
+
+    # Second run: only the failed unit is scraped again, then the player is assembled
+    os.remove(os.path.join(job_dir, 'fail-2023-2024'))
+    written, incomplete, journal = run()
+    assert written == ['Bukayo-Saka'] and incomplete == []
+    assert unit_records(journal.path, unit_key('bc7dc64d', '2022-2023')) == 1
+    assert unit_records(journal.path, unit_key('bc7dc64d', '2023-2024')) == 2
+    assert len(pd.read_csv(output)) == 2
+
+    # Third run: nothing to scrape and the file is not written again
+    written, _, journal = run()
+    assert written == []
+    assert unit_records(journal.path, player_key('bc7dc64d')) == 1
+
+    # A finished unit whose part file is gone is scraped again
+    os.remove(part_path(job_dir, 'bc7dc64d', '2022-2023'))
+    written, _, journal = run()
+    assert written == ['Bukayo-Saka']
+    assert unit_records(journal.path, unit_key('bc7dc64d', '2022-2023')) == 2
@@ -0,0 +1,58 @@
+"""Team aliases and player ids derived from file stems (stable across machines, order and rebuilds)."""
+
+import pandas as pd
+import pytest
+
+import entity_registry
+from entity_registry import MAX_PLAYER_ID, PlayerRegistry, assign_player_ids, stable_player_id, team_ids
+
+
+def test_stable_player_id_is_a_fixed_hash():
+    # Pinned: compiled files and feature tables on other machines store these ids
+    assert stable_player_id('saka') == 439259347
+    assert stable_player_id('salah') == 89543914
+    assert all(1 <= stable_player_id(f'player{i}') <= MAX_PLAYER_ID for i in range(1000))
+
+
+def test_ids_do_not_depend_on_registration_order(tmp_path):
+    stems = ['saka', 'salah', 'haaland', 'son', 'watkins']
+    first = PlayerRegistry(str(tmp_path / 'a'))
+    first.register(stems)
+    second = PlayerRegistry(str(tmp_path / 'b'))
+    for stem in reversed(stems):
+        second.register([stem])
+
+    assert first.ids(stems).tolist() == second.ids(stems).tolist()
+    # and survive a reload from disk
+    assert PlayerRegistry(str(tmp_path / 'b')).ids(stems).tolist() == first.ids(stems).tolist()
+
+
+def test_collisions_are_probed_in_sorted_order(monkeypatch):
+    monkeypatch.setattr(entity_registry, 'stable_player_id', lambda stem: 7)
+    with pytest.warns(UserWarning, match='collides'):
+        ids = assign_player_ids(['c', 'a', 'b'])
+    assert ids == {'a': 7, 'b': 8, 'c': 9}
+    with pytest.warns(UserWarning):
+        assert assign_player_ids(['b', 'c', 'a']) == ids
+
+
+def test_old_registries_are_upgraded_on_load(tmp_path):
+    # Written before ids came from the stem, with the key column still called 'Player ID'
+    folder = tmp_path / '.entity_registry'
+    folder.mkdir()
+    pd.DataFrame({'player_id': [1, 2], 'Player ID': ['saka', 'salah'], 'code': ['bc7dc64d', None],
+                  'fpl_name': ['Saka', None]}).to_csv(folder / 'players.csv', index=False)
+
+    with pytest.warns(UserWarning, match='Re-derived'):
+        players = PlayerRegistry(str(folder)).load()
+    assert players.columns.tolist() == PlayerRegistry.COLUMNS
+    assert players['player_id'].tolist() == [stable_player_id('saka'), stable_player_id('salah')]
+    assert players.loc[0, 'code'] == 'bc7dc64d'
+    assert pd.read_csv(folder / 'players.csv').columns.tolist() == PlayerRegistry.COLUMNS
+
+
+def test_team_aliases_map_to_one_id():
+    ids = team_ids(pd.Series(['Manchester Utd', 'Man Utd', 'Manchester United']))
+    assert ids.nunique() == 1 and str(ids.dtype) == 'int16'
+    with pytest.raises(ValueError, match='Unknown team names'):
+        team_ids(pd.Series(['Not A Team']))
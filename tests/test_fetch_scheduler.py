@@ -0,0 +1,122 @@
+"""FetchScheduler and the HTML cache against a local stand-in server."""
+
+import os
+import time
+
+import pytest
+
+import html_cache
+from fetch_scheduler import FetchScheduler, TokenBucket
+from html_cache import CacheMiss, HtmlCache, fetch_html
+
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = headers or {}
+
+
+def test_token_bucket_holds_the_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # One saved-up token, then ten at 20 per second
+    assert time.monotonic() - start >= 0.45
+
+
+def test_scheduler_fetches_under_the_rate_limit(site, cache):
+    scheduler = FetchScheduler(rate=10, burst=1, workers=4, cache=cache)
+    scheduler.submit_all(site.urls)
+    start = time.monotonic()
+    results = scheduler.run()
+    elapsed = time.monotonic() - start
+
+    assert {result['status'] for result in results.values()} == {200}
+    assert site.requests == len(site.urls)
+    # Six requests at 10/s with a burst of one: five waits of 0.1s, however many workers
+    assert elapsed >= 0.45
+    assert scheduler.summary()['fetched'] == len(site.urls)
+
+
+def test_scheduler_skips_cached_pages(site, cache):
+    first = FetchScheduler(rate=100, cache=cache)
+    first.submit_all(site.urls)
+    first.run()
+    requests = site.requests
+
+    second = FetchScheduler(rate=100, cache=cache)
+    second.submit_all(site.urls)
+    second.run()
+    assert second.summary()['cached'] == len(site.urls)
+    assert second.requests_made == 0
+    assert site.requests == requests
+
+    html = fetch_html(site.urls[0])
+    assert 'Player 0' in html
+    assert cache.hits == 1 and cache.network_fetches == 0
+
+
+def test_expired_pages_are_revalidated(site, tmp_path):
+    cache = HtmlCache(root=str(tmp_path / 'cache'), ttl_policy=lambda url: 0)
+    scheduler = FetchScheduler(rate=100, cache=cache)
+    scheduler.submit(site.urls[0])
+    scheduler.run()
+
+    again = FetchScheduler(rate=100, cache=cache)
+    again.submit(site.urls[0])
+    assert again.run()[site.urls[0]]['status'] == 304
+    assert 'Player 0' in cache.get(site.urls[0], allow_stale=True)
+
+
+def test_offline_mode_never_touches_the_network(site, cache, monkeypatch):
+    fetch_html(site.urls[0])
+    requests = site.requests
+
+    offline = html_cache.configure_cache(cache.root, offline=True)
+    monkeypatch.setattr(html_cache, '_default_cache', offline)
+    assert 'Player 0' in fetch_html(site.urls[0])
+    with pytest.raises(CacheMiss):
+        fetch_html(site.urls[1])
+    assert site.requests == requests
+    assert offline.hits == 1 and offline.misses == 1
+
+
+def test_rate_limited_responses_are_retried(cache):
+    responses = [FakeResponse(429, headers={'Retry-After': '0.05'}), FakeResponse(503),
+                 FakeResponse(200, '<html>ok</html>')]
+    scheduler = FetchScheduler(rate=100, backoff=0.01, cache=cache, get=lambda url, **kwargs: responses.pop(0))
+    scheduler.submit('http://127.0.0.1:9/en/players/retry')
+    result = scheduler.run()['http://127.0.0.1:9/en/players/retry']
+    assert result['status'] == 200 and result['attempts'] == 3
+    assert cache.get('http://127.0.0.1:9/en/players/retry') == '<html>ok</html>'
+
+
+def test_failures_are_reported_not_raised(site, cache):
+    scheduler = FetchScheduler(rate=100, cache=cache)
+    scheduler.submit(site.url + '/en/players/missing')
+    scheduler.run()
+    summary = scheduler.summary()
+    assert summary['failed'] == 1 and summary['failures'][0]['status'] == 404
+    assert cache.entry(site.url + '/en/players/missing') is None
+
+
+def test_missing_cached_page_is_fetched_in_full(site, tmp_path):
+    cache = HtmlCache(root=str(tmp_path / 'cache'), ttl_policy=lambda url: 0)
+    cache.fetch(site.urls[0])
+    os.remove(cache._object_path(cache.entry(site.urls[0])['object']))
+
+    scheduler = FetchScheduler(rate=100, cache=cache)
+    scheduler.submit(site.urls[0])
+    assert scheduler.run()[site.urls[0]]['status'] == 200
+    assert 'Player 0' in cache.get(site.urls[0], allow_stale=True)
+
+
+def test_304_without_a_cached_page_counts_as_failed(cache):
+    scheduler = FetchScheduler(rate=100, cache=cache, get=lambda url, **kwargs: FakeResponse(304))
+    scheduler.submit('http://127.0.0.1:9/en/players/gone')
+    scheduler.run()
+    summary = scheduler.summary()
+    assert summary['failed'] == 1 and summary['revalidated'] == 0
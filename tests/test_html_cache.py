@@ -0,0 +1,75 @@
+"""HtmlCache TTLs, offline mode and revalidation."""
+
+import os
+from datetime import date
+
+import pytest
+
+from html_cache import (CURRENT_SEASON_TTL, UNDATED_TTL, CacheMiss, FetchError, HtmlCache, current_season_start,
+                        page_ttl)
+
+
+def test_page_ttl_by_season():
+    today = date(2024, 3, 1)
+    assert current_season_start(today) == 2023
+    assert current_season_start(date(2024, 8, 1)) == 2024
+    assert page_ttl('https://fbref.com/en/players/x/matchlogs/2022-2023/c9/A-Match-Logs', today) is None
+    assert page_ttl('https://fbref.com/en/players/x/matchlogs/2023-2024/c9/A-Match-Logs', today) == CURRENT_SEASON_TTL
+    assert page_ttl('https://fbref.com/en/players/x/A', today) == UNDATED_TTL
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = HtmlCache(root=str(tmp_path), ttl_policy=lambda url: 60)
+    cache.put('http://example/a', '<html>a</html>')
+    entry = cache.entry('http://example/a')
+    assert cache.is_fresh(entry, now=entry['fetched_at'] + 59)
+    assert not cache.is_fresh(entry, now=entry['fetched_at'] + 61)
+
+    never = HtmlCache(root=str(tmp_path), ttl_policy=lambda url: None)
+    assert never.is_fresh(entry, now=entry['fetched_at'] + 10 ** 9)
+
+
+def test_identical_pages_share_one_object(tmp_path):
+    cache = HtmlCache(root=str(tmp_path))
+    assert cache.put('http://example/a', '<html></html>') == cache.put('http://example/b', '<html></html>')
+    objects = [file for _, _, files in os.walk(os.path.join(str(tmp_path), 'objects')) for file in files]
+    assert len(objects) == 1
+
+
+def test_offline_serves_expired_pages_and_raises_on_misses(site, tmp_path):
+    online = HtmlCache(root=str(tmp_path), ttl_policy=lambda url: 0)
+    html = online.fetch(site.urls[0])
+    requests = site.requests
+
+    offline = HtmlCache(root=str(tmp_path), offline=True, ttl_policy=lambda url: 0)
+    assert offline.fetch(site.urls[0]) == html
+    with pytest.raises(CacheMiss):
+        offline.fetch(site.urls[1])
+    assert site.requests == requests
+
+
+def test_expired_pages_are_revalidated_with_their_etag(site, tmp_path):
+    cache = HtmlCache(root=str(tmp_path), ttl_policy=lambda url: 0)
+    html = cache.fetch(site.urls[0])
+    assert cache.entry(site.urls[0])['etag']
+
+    assert cache.fetch(site.urls[0]) == html
+    assert cache.revalidated == 1 and cache.network_fetches == 2
+
+
+def test_entry_without_its_page_is_fetched_again(site, tmp_path):
+    cache = HtmlCache(root=str(tmp_path), ttl_policy=lambda url: 0)
+    html = cache.fetch(site.urls[0])
+    os.remove(cache._object_path(cache.entry(site.urls[0])['object']))
+
+    # A conditional request would get a 304 with nothing left to serve
+    assert cache.fetch(site.urls[0]) == html
+    assert cache.fetch(site.urls[0]) == html
+    assert cache.revalidated == 1
+
+
+def test_error_responses_raise_and_are_not_cached(site, tmp_path):
+    cache = HtmlCache(root=str(tmp_path))
+    with pytest.raises(FetchError):
+        cache.fetch(site.url + '/en/players/missing')
+    assert cache.entry(site.url + '/en/players/missing') is None
@@ -0,0 +1,85 @@
+"""Schema version detection, validation and migration of player CSVs."""
+
+import csv
+
+import pytest
+
+from player_schema import DATE, DATETIME_UTC
+from schema_registry import (CURRENT_VERSION, DEPRECATED_FPL_COLUMNS, SCHEMA_VERSIONS, migrate_file, read_header,
+                             schema_version, validate_file)
+
+
+def sample_value(version, column):
+    dtype = SCHEMA_VERSIONS[version]['dtypes'].get(column)
+    if dtype == DATE:
+        return '2023-08-12'
+    if dtype == DATETIME_UTC:
+        return '2023-08-12 14:00:00+00:00'
+    return '1'
+
+
+def write_player_csv(path, version, index=True, rows=3):
+    columns = SCHEMA_VERSIONS[version]['columns']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(([''] if index else []) + columns)
+        for i in range(rows):
+            writer.writerow(([str(i)] if index else []) + [sample_value(version, c) for c in columns])
+    return path
+
+
+def test_versions_are_detected_with_or_without_an_index():
+    for version, schema in SCHEMA_VERSIONS.items():
+        assert schema_version(schema['columns']) == version
+        assert schema_version(['Unnamed: 0'] + schema['columns']) == version
+    current = SCHEMA_VERSIONS[CURRENT_VERSION]['columns']
+    assert schema_version(current[:-1]) is None
+    assert schema_version(current[1:] + current[:1]) is None
+
+
+def test_validate_file_reports_version_and_bad_values(tmp_path):
+    path = write_player_csv(tmp_path / 'good.csv', CURRENT_VERSION, index=False)
+    report = validate_file(str(path))
+    assert report['version'] == CURRENT_VERSION and not report['has_index'] and report['problems'] == []
+
+    bad = tmp_path / 'bad.csv'
+    text = path.read_text(encoding='utf-8').splitlines()
+    columns = text[0].split(',')
+    cells = text[1].split(',')
+    cells[columns.index('Goals')] = 'abc'
+    bad.write_text('\n'.join([text[0], ','.join(cells)]) + '\n', encoding='utf-8')
+    problems = validate_file(str(bad))['problems']
+    assert len(problems) == 1 and problems[0].startswith('Goals:')
+
+
+def test_unknown_columns_report_drift(tmp_path):
+    path = tmp_path / 'drift.csv'
+    path.write_text(','.join(SCHEMA_VERSIONS[CURRENT_VERSION]['columns'][:-1] + ['extra']) + '\n', encoding='utf-8')
+    report = validate_file(str(path))
+    assert report['version'] is None
+    assert report['drift']['missing'] == ['kickoff_date'] and report['drift']['extra'] == ['extra']
+
+
+def test_migration_drops_deprecated_columns_and_keeps_the_index(tmp_path):
+    path = write_player_csv(tmp_path / 'old.csv', 1)
+    with open(path, newline='', encoding='utf-8') as f:
+        old = list(csv.DictReader(f))
+
+    assert migrate_file(str(path)) == (1, CURRENT_VERSION)
+    has_index, columns = read_header(str(path))
+    assert has_index and columns == SCHEMA_VERSIONS[CURRENT_VERSION]['columns']
+    assert not set(DEPRECATED_FPL_COLUMNS) & set(columns)
+    with open(path, newline='', encoding='utf-8') as f:
+        new = list(csv.DictReader(f))
+    assert [row[''] for row in new] == [row[''] for row in old]
+    assert all(new_row[c] == old_row[c] for new_row, old_row in zip(new, old) for c in columns)
+
+    # Already current: nothing to do
+    assert migrate_file(str(path)) == (CURRENT_VERSION, CURRENT_VERSION)
+
+
+def test_migrating_an_unknown_layout_raises(tmp_path):
+    path = tmp_path / 'unknown.csv'
+    path.write_text('a,b\n1,2\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        migrate_file(str(path))